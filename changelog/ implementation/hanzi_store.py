@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Make Me a Hanzi 笔画数据存储 (hanzi_store.bin)
+把 graphics.txt（每行一个 JSON）流式转换为按码位索引的二进制文件，
+读取时用 mmap 打开，取单个汉字的笔画只读取该字的记录，不需要解析整个 JSON 文件
+
+文件格式（小端）:
+    头部   16 字节  magic "HZS1" | version u16 | reserved u16 | count u32 | index_offset u32
+    记录   每个汉字一条:
+               stroke_count u16
+               stroke_count 个  path_len u16 + SVG path（ASCII）
+               stroke_count 个  point_count u16 + point_count 对 int16 (x, y)（中线）
+    索引   count 条，按码位排序: codepoint u32 | offset u32 | length u32
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+MAGIC = b"HZS1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+INDEX_ENTRY = struct.Struct("<III")
+U16 = struct.Struct("<H")
+
+# array 使用本机字节序，文件固定为小端
+_SWAP = sys.byteorder == 'big'
+
+
+def _le_array(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if _SWAP:
+        values.byteswap()
+    return values
+
+
+class HanziGraphics(NamedTuple):
+    """单个汉字的笔画数据（坐标系与 Make Me a Hanzi 相同: 1024 x 1024，y 轴向上）"""
+    char: str
+    strokes: List[str]
+    medians: List[List[Tuple[int, int]]]
+
+
+# ============================================================================
+# 编码 / 解码
+# ============================================================================
+
+def encode_record(strokes: List[str], medians: List[List[List[int]]]) -> bytes:
+    parts = [U16.pack(len(strokes))]
+    for path in strokes:
+        data = path.encode('ascii')
+        parts.append(U16.pack(len(data)))
+        parts.append(data)
+    for points in medians:
+        values = array('h', [v for point in points for v in point[:2]])
+        if _SWAP:
+            values.byteswap()
+        parts.append(U16.pack(len(points)))
+        parts.append(values.tobytes())
+    return b"".join(parts)
+
+
+def decode_record(char: str, buffer, offset: int = 0) -> HanziGraphics:
+    (stroke_count,) = U16.unpack_from(buffer, offset)
+    offset += 2
+
+    strokes = []
+    for _ in range(stroke_count):
+        (length,) = U16.unpack_from(buffer, offset)
+        offset += 2
+        strokes.append(bytes(buffer[offset:offset + length]).decode('ascii'))
+        offset += length
+
+    medians = []
+    for _ in range(stroke_count):
+        (count,) = U16.unpack_from(buffer, offset)
+        offset += 2
+        values = _le_array('h', buffer[offset:offset + count * 4])
+        offset += count * 4
+        medians.append(list(zip(values[0::2], values[1::2])))
+
+    return HanziGraphics(char, strokes, medians)
+
+
+# ============================================================================
+# 写入（流式）
+# ============================================================================
+
+def ingest_graphics(graphics_file, store_file, chars: Optional[Iterable[str]] = None) -> dict:
+    """
+    流式读取 graphics.txt，写入二进制存储
+
+    内存中只保留索引（每个汉字 12 字节），记录直接追加到文件
+
+    Args:
+        graphics_file: Make Me a Hanzi 的 graphics.txt
+        store_file: 输出文件
+        chars: 只保留这些汉字（集合判断，O(1)），None 表示全部
+
+    Returns:
+        {'lines', 'stored', 'bytes'}
+    """
+    wanted = frozenset(chars) if chars is not None else None
+    store_file = Path(store_file)
+    tmp_file = store_file.with_name(store_file.name + '.tmp')
+
+    index = {}
+    lines = 0
+    with open(graphics_file, 'r', encoding='utf-8') as src, open(tmp_file, 'wb') as out:
+        out.write(b"\0" * HEADER.size)
+        offset = HEADER.size
+
+        for line in src:
+            if not line.strip():
+                continue
+            lines += 1
+            data = json.loads(line)
+            char = data.get('character')
+            if not char or len(char) != 1 or (wanted is not None and char not in wanted):
+                continue
+
+            record = encode_record(data.get('strokes', []), data.get('medians', []))
+            out.write(record)
+            index[ord(char)] = (offset, len(record))  # 重复的字以最后一条为准
+            offset += len(record)
+
+        index_offset = offset
+        for codepoint in sorted(index):
+            out.write(INDEX_ENTRY.pack(codepoint, *index[codepoint]))
+
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, VERSION, 0, len(index), index_offset))
+
+    os.replace(tmp_file, store_file)
+    return {'lines': lines, 'stored': len(index), 'bytes': store_file.stat().st_size}
+
+
+# ============================================================================
+# 读取（mmap）
+# ============================================================================
+
+class HanziStore:
+    """只读笔画存储（mmap，按码位二分查找）"""
+
+    def __init__(self, store_file):
+        self.store_file = Path(store_file)
+        self._file = open(self.store_file, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, index_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a hanzi store (v{VERSION}): {self.store_file}")
+
+        entries = _le_array('I', self._mm[index_offset:index_offset + count * INDEX_ENTRY.size])
+        self._codepoints = entries[0::3]
+        self._offsets = entries[1::3]
+
+    def __len__(self) -> int:
+        return len(self._codepoints)
+
+    def _find(self, char: str) -> int:
+        codepoint = ord(char)
+        i = bisect_left(self._codepoints, codepoint)
+        return i if i < len(self._codepoints) and self._codepoints[i] == codepoint else -1
+
+    def __contains__(self, char: str) -> bool:
+        return len(char) == 1 and self._find(char) >= 0
+
+    def get(self, char: str) -> Optional[HanziGraphics]:
+        """单个汉字的笔画数据，不存在时返回 None"""
+        i = self._find(char) if len(char) == 1 else -1
+        if i < 0:
+            return None
+        return decode_record(char, self._mm, self._offsets[i])
+
+    def chars(self) -> Iterator[str]:
+        return (chr(cp) for cp in self._codepoints)
+
+    def __iter__(self) -> Iterator[HanziGraphics]:
+        for i, codepoint in enumerate(self._codepoints):
+            yield decode_record(chr(codepoint), self._mm, self._offsets[i])
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Make Me a Hanzi 笔画数据存储')
+    parser.add_argument('--graphics', default='./makemeahanzi_data/graphics.txt', help='graphics.txt')
+    parser.add_argument('--store', default='./makemeahanzi_data/hanzi_store.bin', help='存储文件')
+    parser.add_argument('--all', action='store_true', help='保存全部汉字（默认只保存常用字）')
+    parser.add_argument('--tier', type=int, default=1, choices=(1, 2, 3), help='常用字范围：一级到 N 级字表')
+    parser.add_argument('--show', help='显示指定汉字的笔画数据')
+    args = parser.parse_args()
+
+    if args.show:
+        with HanziStore(args.store) as store:
+            for char in args.show:
+                graphics = store.get(char)
+                if graphics is None:
+                    print(f"❌ {char}: 不在存储中")
+                    continue
+                print(f"{char}: {len(graphics.strokes)} 笔")
+                for i, (path, median) in enumerate(zip(graphics.strokes, graphics.medians), 1):
+                    print(f"  {i:>2}. {path[:60]}{'...' if len(path) > 60 else ''}  中线 {len(median)} 点")
+        return
+
+    from opensource_chars import load_common_chars
+
+    chars = None if args.all else load_common_chars(args.tier)
+    print("=" * 70)
+    print("📦 生成笔画数据存储")
+    print("=" * 70)
+    started = time.perf_counter()
+    stats = ingest_graphics(args.graphics, args.store, chars)
+    print(f"📄 读取 {stats['lines']} 行，保存 {stats['stored']} 个汉字")
+    print(f"💾 {args.store} ({stats['bytes'] / 1024:.0f} KB, {time.perf_counter() - started:.2f}s)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 下载 Make Me a Hanzi 后生成存储（opensource_chars.py 方案1 会自动生成）
+python3 hanzi_store.py
+python3 hanzi_store.py --tier 3       # 通用规范汉字表全部 8105 字
+python3 hanzi_store.py --all          # 全部 9000+ 字
+
+# 查看某个字
+python3 hanzi_store.py --show 永
+
+# 在代码中使用
+from hanzi_store import HanziStore
+
+with HanziStore('./makemeahanzi_data/hanzi_store.bin') as store:
+    if '永' in store:
+        graphics = store.get('永')
+        print(graphics.strokes, graphics.medians)
+"""
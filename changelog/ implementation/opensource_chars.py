@@ -4,15 +4,24 @@
 免费、合法、即刻可用
 """
 
-import requests
+import bisect
+import io
 import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+import requests
+
 # ============================================================================
 # 方案1: Make Me a Hanzi (开源，MIT许可)
 # ============================================================================
 
-def download_makemeahanzi():
+def download_makemeahanzi(max_tier=1):
     """
     下载 Make Me a Hanzi 数据集
     - 9000+ 汉字的笔画数据
@@ -20,8 +29,13 @@ def download_makemeahanzi():
     - 完全免费开源
     
     数据源: https://github.com/skishore/makemeahanzi
+    
+    Args:
+        max_tier: 保存一级到 max_tier 级字表中的汉字
     """
     
+    from hanzi_store import HanziStore, ingest_graphics
+    
     print("📥 下载 Make Me a Hanzi 数据集...")
     
     # 字符数据（包含笔顺、部首等）
@@ -31,39 +45,36 @@ def download_makemeahanzi():
     output_dir = Path("./makemeahanzi_data")
     output_dir.mkdir(exist_ok=True)
     
-    # 下载图形数据
+    # 下载图形数据（流式写入磁盘，不在内存中保存整个文件）
     print("  下载 graphics.txt (SVG笔画数据)...")
-    response = requests.get(graphics_url)
-    (output_dir / "graphics.txt").write_text(response.text, encoding='utf-8')
+    download_file(graphics_url, output_dir / "graphics.txt")
     
     # 下载字典数据
     print("  下载 dictionary.txt (字符信息)...")
-    response = requests.get(dictionary_url)
-    (output_dir / "dictionary.txt").write_text(response.text, encoding='utf-8')
+    download_file(dictionary_url, output_dir / "dictionary.txt")
     
-    # 解析并生成3500常用字的SVG
+    # 逐行解析，只保留常用字，写入按码位索引的二进制存储
     print("  解析数据...")
     
-    common_3500 = load_common_chars()
-    
-    graphics_data = {}
-    with open(output_dir / "graphics.txt", 'r', encoding='utf-8') as f:
-        for line in f:
-            data = json.loads(line)
-            char = data.get('character')
-            if char in common_3500:
-                graphics_data[char] = data
-    
-    print(f"\n✅ 找到 {len(graphics_data)} / 3500 个常用字的SVG数据")
+    chars = load_common_chars(max_tier)
+    store_file = output_dir / "hanzi_store.bin"
+    stats = ingest_graphics(output_dir / "graphics.txt", store_file, chars)
     
-    # 保存映射
-    mapping_file = output_dir / "common_3500_mapping.json"
-    with open(mapping_file, 'w', encoding='utf-8') as f:
-        json.dump(graphics_data, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 找到 {stats['stored']} / {len(chars)} 个常用字的SVG数据")
+    print(f"💾 保存到: {store_file} ({stats['bytes'] / 1024:.0f} KB)")
     
-    print(f"💾 保存到: {mapping_file}")
-    
-    return graphics_data
+    return HanziStore(store_file)
+
+
+def download_file(url, path, chunk_size=1 << 16):
+    """流式下载到文件"""
+    tmp_path = Path(f"{path}.tmp")
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+    os.replace(tmp_path, path)
 
 
 # ============================================================================
@@ -88,7 +99,11 @@ def download_arphic_fonts():
 # 方案3: 使用Noto Sans CJK（Google开源）
 # ============================================================================
 
-def generate_from_noto_font():
+# NotoSansCJK-Regular.ttc 中的字体顺序: 0=JP 1=KR 2=SC 3=TC 4=HK
+NOTO_SC_INDEX = 2
+
+
+def generate_from_noto_font(size=128, workers=None, limit=None):
     """
     使用Google Noto字体生成图片
     - 最全面的CJK字体
@@ -103,26 +118,20 @@ def generate_from_noto_font():
         print("❌ 需要安装 Pillow: pip install Pillow")
         return
     
-    output_dir = Path("./generated_chars")
-    output_dir.mkdir(exist_ok=True)
-    
     # 下载字体（如果没有）
     font_path = download_noto_font()
+    if font_path is None:
+        return
     
-    # 生成3500个常用字
-    common_chars = load_common_chars()
+    # 生成全部常用字（多进程，每个进程只加载一次字体）
+    common_chars = load_common_chars()[:limit]
+    index = NOTO_SC_INDEX if font_path.endswith('.ttc') else 0
     
     print(f"开始生成 {len(common_chars)} 个汉字图片...")
+    stats = render_chars(common_chars, font_path, "./generated_chars", size, index, workers)
     
-    for i, char in enumerate(common_chars[:100], 1):  # 先测试100个
-        img = generate_char_image(char, font_path)
-        filename = f"{ord(char):04x}_{char}.png"
-        img.save(output_dir / filename)
-        
-        if i % 10 == 0:
-            print(f"  进度: {i}/{len(common_chars)}")
-    
-    print(f"✅ 完成！保存到: {output_dir}")
+    print(f"✅ 完成！{stats['glyphs']} 个汉字，{stats['glyphs_per_second']:.0f} 字/秒，"
+          f"保存到: {stats['output_dir']}")
 
 
 def download_noto_font():
@@ -146,43 +155,461 @@ def download_noto_font():
     return str(font_path)
 
 
-def generate_char_image(char, font_path, size=128):
-    """生成单个汉字图片"""
-    from PIL import Image, ImageDraw, ImageFont
+# ============================================================================
+# 渲染引擎（字体按进程缓存 + 进程池）
+# ============================================================================
+
+@lru_cache(maxsize=32)
+def get_font(font_path, font_size, index=0):
+    """
+    加载字体，同一进程内按 (路径, 字号, 索引) 缓存
+
+    .ttc 文件约 100MB，每个字都调用 ImageFont.truetype 会重复解析整个文件
+    """
+    from PIL import ImageFont
+    return ImageFont.truetype(str(font_path), font_size, index=index)
+
+
+def render_glyph(char, font, size=128):
+    """用已加载的字体渲染单个汉字（白底黑字灰度图，按字形实际边界居中）"""
+    from PIL import Image, ImageDraw
     
-    # 创建白色背景
-    img = Image.new('RGB', (size, size), 'white')
+    img = Image.new('L', (size, size), 255)
     draw = ImageDraw.Draw(img)
     
-    # 加载字体
-    font = ImageFont.truetype(font_path, int(size * 0.8))
-    
-    # 计算文字位置（居中）
     bbox = draw.textbbox((0, 0), char, font=font)
-    x = (size - (bbox[2] - bbox[0])) // 2
-    y = (size - (bbox[3] - bbox[1])) // 2
-    
-    # 绘制黑色文字
-    draw.text((x, y), char, fill='black', font=font)
+    x = (size - (bbox[2] - bbox[0])) // 2 - bbox[0]
+    y = (size - (bbox[3] - bbox[1])) // 2 - bbox[1]
     
+    draw.text((x, y), char, fill=0, font=font)
     return img
 
 
-def load_common_chars():
-    """加载常用3500字"""
-    # 国标一级汉字（3500个）
-    chars = """
-的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音众书布复容儿须际商非验连断深难近矿千周委素技备半办青省列习响约支般史感劳便团往酸历市克何除消构府称太准精值号率族维划选标写存候毛亲快效斯院查江型眼王按格养易置派层片始却专状育厂京识适属圆包火住调满县局照参红细引听该铁价严
-""".replace('\n', '').replace(' ', '')
+def generate_char_image(char, font_path, size=128, index=0):
+    """生成单个汉字图片"""
+    return render_glyph(char, get_font(font_path, int(size * 0.8), index), size)
+
+
+def encode_png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def char_filename(char):
+    return f"{ord(char):04x}_{char}.png"
+
+
+_worker_font = None
+
+
+def _init_render_worker(font_path, size, index):
+    """进程池初始化：每个进程加载一次字体"""
+    global _worker_font
+    _worker_font = (get_font(font_path, int(size * 0.8), index), size)
+
+
+def _render_chunk(job):
+    """
+    渲染一批汉字并一次性写入（在子进程中运行）
+
+    Args:
+        job: (汉字列表, 输出目录)
+
+    Returns:
+        (字数, 字节数)
+    """
+    chars, output_dir = job
+    font, size = _worker_font
+    
+    rendered = [(char_filename(char), encode_png(render_glyph(char, font, size))) for char in chars]
+    
+    total = 0
+    for filename, data in rendered:
+        with open(os.path.join(output_dir, filename), 'wb') as f:
+            f.write(data)
+        total += len(data)
+    return len(rendered), total
+
+
+def render_chars(chars, font_path, output_dir, size=128, index=0, workers=None, chunk_size=128):
+    """
+    多进程渲染汉字图片
+
+    Args:
+        chars: 汉字列表
+        font_path: 字体文件（.ttf / .otf / .ttc）
+        output_dir: 输出目录（文件名: 6c34_水.png）
+        size: 图片尺寸
+        index: .ttc 中的字体序号
+        workers: 进程数，默认 CPU 核数
+        chunk_size: 每个任务渲染的字数
+
+    Returns:
+        {'glyphs', 'bytes', 'seconds', 'glyphs_per_second', 'workers', 'output_dir'}
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    
+    jobs = [(chars[i:i + chunk_size], str(output_dir)) for i in range(0, len(chars), chunk_size)]
+    
+    glyphs = total_bytes = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                             initargs=(str(font_path), size, index)) as executor:
+        for count, nbytes in executor.map(_render_chunk, jobs):
+            glyphs += count
+            total_bytes += nbytes
+            if glyphs % (chunk_size * 8) < chunk_size:
+                print(f"  进度: {glyphs}/{len(chars)}")
+    elapsed = time.perf_counter() - started
+    
+    return {
+        'glyphs': glyphs,
+        'bytes': total_bytes,
+        'seconds': round(elapsed, 3),
+        'glyphs_per_second': glyphs / elapsed if elapsed else 0.0,
+        'workers': workers,
+        'output_dir': str(output_dir)
+    }
+
+
+def benchmark_rendering(font_path, count=2000, size=128, index=0, workers=None):
+    """
+    渲染基准测试：旧实现（每个字重新加载字体）/ 缓存字体单进程 / 进程池
+    """
+    import tempfile
+    from PIL import ImageFont
+    
+    chars = load_common_chars()
+    chars = (chars * (count // len(chars) + 1))[:count]
+    workers = workers or os.cpu_count() or 1
+    
+    print("=" * 70)
+    print("⏱️  字体渲染基准测试")
+    print("=" * 70)
+    print(f"🔤 字体: {font_path} (index={index})")
+    print(f"📊 字数: {count}  尺寸: {size}px  CPU: {os.cpu_count()}")
+    print()
+    
+    # 旧实现：每个字都重新解析字体文件（很慢，只测一小部分）
+    legacy_chars = chars[:min(count, 100)]
+    started = time.perf_counter()
+    for char in legacy_chars:
+        font = ImageFont.truetype(str(font_path), int(size * 0.8), index=index)
+        encode_png(render_glyph(char, font, size))
+    legacy = len(legacy_chars) / (time.perf_counter() - started)
+    print(f"   每字加载字体（旧）     {legacy:>10.0f} 字/秒")
+    
+    # 字体只加载一次，单进程
+    get_font(font_path, int(size * 0.8), index)
+    started = time.perf_counter()
+    font = get_font(font_path, int(size * 0.8), index)
+    for char in chars:
+        encode_png(render_glyph(char, font, size))
+    cached = len(chars) / (time.perf_counter() - started)
+    print(f"   缓存字体 单进程        {cached:>10.0f} 字/秒  ({cached / legacy:.1f}x)")
+    
+    # 进程池 + 批量写入
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stats = render_chars(chars, font_path, tmp_dir, size, index, workers)
+    parallel = stats['glyphs_per_second']
+    print(f"   缓存字体 {workers} 进程        {parallel:>10.0f} 字/秒  ({parallel / legacy:.1f}x，含写文件)")
+    print("=" * 70)
+    
+    return {'legacy': legacy, 'cached': cached, 'parallel': parallel, 'workers': workers}
+
+
+# ============================================================================
+# 多字体批量渲染（字体覆盖索引 + 字符 × 字体矩阵）
+# ============================================================================
+
+FONT_SUFFIXES = {'.ttf', '.otf', '.ttc', '.otc'}
+COVERAGE_FILENAME = "font_coverage.json"
+RENDER_STATE_FILENAME = "font_render_state.json"
+
+
+def font_faces(font_dir):
+    """目录中的全部字体 (路径, 序号)；.ttc/.otc 中的每个字体单独列出"""
+    for path in sorted(Path(font_dir).rglob('*')):
+        if path.suffix.lower() not in FONT_SUFFIXES:
+            continue
+        count = 1
+        if path.suffix.lower() in ('.ttc', '.otc'):
+            with open(path, 'rb') as f:
+                header = f.read(12)
+            if header[:4] == b'ttcf':
+                count = int.from_bytes(header[8:12], 'big')
+        for index in range(count):
+            yield path, index
+
+
+def face_id(path, index):
+    """字体 ID（用作字形变体 ID 的一部分）: NotoSansCJK-Regular-2"""
+    path = Path(path)
+    stem = re.sub(r'[^0-9A-Za-z_-]+', '_', path.stem)
+    return f"{stem}-{index}" if path.suffix.lower() in ('.ttc', '.otc') else stem
+
+
+def to_ranges(codepoints):
+    """排好序的码位 -> [[起, 止], ...]（CJK 字体的码位大多连续，JSON 很小）"""
+    ranges = []
+    for cp in codepoints:
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ranges
+
+
+def read_face_coverage(job):
+    """读取单个字体的 cmap（在子进程中运行）"""
+    from fontTools.ttLib import TTFont
+    
+    path, index = job
+    font = TTFont(path, fontNumber=index, lazy=True)
+    try:
+        cmap = font.getBestCmap() or {}
+        family = font['name'].getDebugName(4) or font['name'].getDebugName(1) or Path(path).stem
+    finally:
+        font.close()
+    return {'ranges': to_ranges(sorted(cmap)), 'family': family, 'glyphs': len(cmap)}
+
+
+class FontCoverage:
+    """单个字体支持的码位（区间 + 二分查找）"""
+    
+    def __init__(self, path, index, family, ranges, fingerprint=""):
+        self.path = str(path)
+        self.index = index
+        self.id = face_id(path, index)
+        self.family = family
+        self.fingerprint = fingerprint
+        self._starts = [r[0] for r in ranges]
+        self._ends = [r[1] for r in ranges]
+    
+    def supports(self, char):
+        cp = ord(char)
+        i = bisect.bisect_right(self._starts, cp) - 1
+        return i >= 0 and cp <= self._ends[i]
+
+
+def build_coverage_index(font_dir, cache_file=None, rebuild=False, workers=None):
+    """
+    建立字体覆盖索引并缓存到 font_coverage.json
+
+    按文件大小和修改时间判断缓存是否有效，只重新读取新增或变化的字体
+
+    Returns:
+        FontCoverage 列表
+    """
+    try:
+        import fontTools  # noqa: F401
+    except ImportError:
+        print("❌ 需要安装 fonttools: pip install fonttools")
+        return []
+    
+    font_dir = Path(font_dir)
+    cache_file = Path(cache_file) if cache_file else font_dir / COVERAGE_FILENAME
+    
+    cache = {}
+    if cache_file.exists() and not rebuild:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f).get('faces', {})
+        except (json.JSONDecodeError, OSError):
+            cache = {}
+    
+    faces, stale = {}, []
+    for path, index in font_faces(font_dir):
+        key = f"{path.relative_to(font_dir).as_posix()}#{index}"
+        stat = path.stat()
+        entry = cache.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            faces[key] = entry
+        else:
+            faces[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            stale.append((key, str(path), index))
+    
+    if stale:
+        print(f"🔍 读取 {len(stale)} 个字体的 cmap...")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            results = executor.map(read_face_coverage, [(p, i) for _, p, i in stale])
+            for (key, _, _), result in zip(stale, results):
+                faces[key].update(result)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'faces': faces}, f, ensure_ascii=False)
+    
+    coverage = []
+    for key, entry in faces.items():
+        relpath, index = key.rsplit('#', 1)
+        coverage.append(FontCoverage(font_dir / relpath, int(index), entry['family'], entry['ranges'],
+                                     f"{entry['size']}:{entry['mtime_ns']}"))
+    return coverage
+
+
+def _render_font_chunk(job):
+    """用指定字体渲染一批汉字，返回 [(汉字, PNG 数据)]（在子进程中运行，字体按进程缓存）"""
+    font_path, index, size, chars = job
+    font = get_font(font_path, int(size * 0.8), index)
+    return font_path, index, [(char, encode_png(render_glyph(char, font, size))) for char in chars]
+
+
+def _load_glyph_catalog(data_dir):
+    """字形目录在 data-collection/glyph_catalog.py"""
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'data-collection'))
+    from glyph_catalog import GlyphCatalog
+    return GlyphCatalog(data_dir)
+
+
+def render_font_matrix(font_dir, chars, data_dir="./collected_characters", size=128,
+                       workers=None, chunk_size=128, rebuild_coverage=False):
+    """
+    字符 × 字体矩阵批量渲染，结果作为字形变体写入字形目录
+
+    - 按覆盖索引跳过字体不支持的组合（不尝试渲染，不会产生方框字）
+    - 已渲染过的组合记录在 font_render_state.json，可以增量添加新字体 / 新汉字；
+      字形与已有变体完全相同时字形目录只保存一份，也记为已渲染
+    - 任务按字体分组，每个进程只需要加载少数几个字体
+
+    Returns:
+        统计信息
+    """
+    coverage = build_coverage_index(font_dir, rebuild=rebuild_coverage, workers=workers)
+    if not coverage:
+        print(f"⚠️  {font_dir} 中没有可用字体")
+        return {}
+    
+    catalog = _load_glyph_catalog(data_dir)
+    workers = workers or os.cpu_count() or 1
+    by_face = {(face.path, face.index): face for face in coverage}
+    
+    # {字体ID: {'font': 字体指纹, 'chars': 已渲染的汉字}}，字体文件变化后全部重新渲染
+    state_file = Path(data_dir) / RENDER_STATE_FILENAME
+    state = {}
+    if state_file.exists():
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    done = {face.id: set(state[face.id]['chars']) if state.get(face.id, {}).get('font') == face.fingerprint
+            else set() for face in coverage}
+    
+    stats = {'fonts': len(coverage), 'combinations': len(chars) * len(coverage),
+             'unsupported': 0, 'existing': 0, 'rendered': 0, 'new_variants': 0}
+    jobs = []
+    for face in coverage:
+        pending = []
+        for char in chars:
+            if not face.supports(char):
+                stats['unsupported'] += 1
+            elif char in done[face.id]:
+                stats['existing'] += 1
+            else:
+                pending.append(char)
+        jobs.extend((face.path, face.index, size, pending[i:i + chunk_size])
+                    for i in range(0, len(pending), chunk_size))
+    total = sum(len(job[3]) for job in jobs)
+    
+    print("=" * 70)
+    print("🔤 多字体批量渲染")
+    print("=" * 70)
+    print(f"📁 字体: {len(coverage)} 个  汉字: {len(chars)}  组合: {stats['combinations']}")
+    print(f"   不支持: {stats['unsupported']}  已存在: {stats['existing']}  待渲染: {total}")
+    print(f"💾 字形目录: {data_dir}  进程数: {workers}")
+    print()
+    
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for font_path, index, rendered in executor.map(_render_font_chunk, jobs):
+            face = by_face[(font_path, index)]
+            for char, data in rendered:
+                _, is_new = catalog.add_variant(
+                    char, data, variant_id=f"font-{face.id}", font_id=face.id,
+                    source='font_render', font_family=face.family)
+                stats['new_variants'] += is_new
+                done[face.id].add(char)
+            stats['rendered'] += len(rendered)
+            if stats['rendered'] % (chunk_size * 16) < len(rendered):
+                print(f"  进度: {stats['rendered']}/{total}")
+    elapsed = time.perf_counter() - started
+    catalog.save()
+    
+    state.update({face.id: {'font': face.fingerprint, 'chars': ''.join(sorted(done[face.id]))}
+                  for face in coverage})
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    
+    stats['seconds'] = round(elapsed, 3)
+    stats['glyphs_per_second'] = round(stats['rendered'] / elapsed, 1) if elapsed else 0.0
+    
+    print()
+    print(f"✅ 渲染 {stats['rendered']} 个字形（新变体 {stats['new_variants']}），"
+          f"{stats['seconds']}s ({stats['glyphs_per_second']:.0f} 字/秒)")
+    print("=" * 70)
+    return stats
+
+
+def load_common_chars(max_tier=1):
+    """
+    加载常用字（《通用规范汉字表》一级到 max_tier 级，去重、保持字表顺序）
     
-    return list(chars[:3500])
+    字表在 data-collection/char_tiers/，见 data-collection/char_tiers.py
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'data-collection'))
+    from char_tiers import common_chars
+    return common_chars(max_tier)
 
 
 # ============================================================================
 # 主程序
 # ============================================================================
 
-if __name__ == "__main__":
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='开源汉字数据集 / 字体渲染工具')
+    parser.add_argument('--render', action='store_true', help='用字体渲染常用字（不进入交互菜单）')
+    parser.add_argument('--benchmark', action='store_true', help='渲染基准测试')
+    parser.add_argument('--font', help='字体文件（默认 ./fonts/NotoSansCJK-Regular.ttc）')
+    parser.add_argument('--font-index', type=int, help='.ttc 中的字体序号（Noto CJK 默认 2 = 简体中文）')
+    parser.add_argument('--size', type=int, default=128, help='图片尺寸')
+    parser.add_argument('--workers', '-j', type=int, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--output', '-o', default='./generated_chars', help='输出目录')
+    parser.add_argument('--count', type=int, default=2000, help='基准测试字数')
+    parser.add_argument('--tier', type=int, default=1, choices=(1, 2, 3), help='使用一级到 N 级字表（默认一级）')
+    parser.add_argument('--fonts', help='字体目录：渲染 字符 × 字体 矩阵并写入字形目录')
+    parser.add_argument('--catalog', default='./collected_characters', help='字形目录（--fonts 模式）')
+    parser.add_argument('--rebuild-coverage', action='store_true', help='重新读取全部字体的 cmap')
+    args = parser.parse_args()
+    
+    if args.fonts:
+        render_font_matrix(args.fonts, load_common_chars(args.tier), args.catalog, args.size,
+                           args.workers, rebuild_coverage=args.rebuild_coverage)
+        return
+    
+    if not (args.render or args.benchmark):
+        interactive_menu()
+        return
+    
+    font_path = args.font or download_noto_font()
+    if font_path is None:
+        return
+    index = args.font_index
+    if index is None:
+        index = NOTO_SC_INDEX if 'NotoSansCJK' in Path(font_path).name and font_path.endswith('.ttc') else 0
+    
+    if args.benchmark:
+        benchmark_rendering(font_path, args.count, args.size, index, args.workers)
+        return
+    
+    chars = load_common_chars(args.tier)
+    print(f"开始生成 {len(chars)} 个汉字图片...")
+    stats = render_chars(chars, font_path, args.output, args.size, index, args.workers)
+    print(f"✅ 完成！{stats['glyphs']} 个汉字，{stats['seconds']}s "
+          f"({stats['glyphs_per_second']:.0f} 字/秒，{stats['workers']} 进程)，保存到: {args.output}")
+
+
+def interactive_menu():
     print("="*70)
     print("开源汉字数据集下载工具")
     print("="*70)
@@ -207,6 +634,10 @@ if __name__ == "__main__":
         download_arphic_fonts()
 
 
+if __name__ == "__main__":
+    main()
+
+
 """
 💡 推荐方案总结:
 
@@ -223,4 +654,19 @@ if __name__ == "__main__":
    → 用 cloudbrush_collector.py 抓包
 
 所有方案都是合法免费的！
+
+命令行:
+# 用 Noto 字体渲染全部常用字（多进程）
+python3 opensource_chars.py --render
+
+# 指定字体 / 尺寸 / 进程数
+python3 opensource_chars.py --render --font ./fonts/NotoSansCJK-Regular.ttc --font-index 2 --size 256 -j 8
+
+# 渲染基准测试（字/秒）
+python3 opensource_chars.py --benchmark --count 5000
+
+# 多字体：渲染 ./fonts 中全部字体 × 常用字，作为字形变体写入字形目录
+# （字体覆盖索引缓存在 ./fonts/font_coverage.json，字体不支持的字直接跳过）
+pip install fonttools
+python3 opensource_chars.py --fonts ./fonts --catalog ../../data-collection/collected_characters
 """
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Make Me a Hanzi 笔画光栅化
+把 hanzi_store.bin 中的 SVG 笔画路径批量转换为 PNG（白底黑字灰度图，与字体渲染结果一致）
+
+- 路径只解析一次：二次 / 三次贝塞尔曲线展开为线段后，整批汉字的全部边放在同一组 NumPy 数组中
+- 扫描线填充完全向量化：一次计算全部边与全部扫描线的交点，按 (笔画, 行, x) 排序后两两配对成区间，
+  用差分数组 + cumsum 填充；每个笔画单独按奇偶规则填充，笔画之间取并集
+- 抗锯齿：每个像素 4 条扫描线，水平方向按精确重叠长度计算覆盖率
+- 可选逐笔画帧（第 k 帧包含前 k 笔），用于笔顺动画
+- 多进程：每个进程打开一次 mmap 存储，任务只传汉字列表
+
+输出:
+    generated_strokes/
+        6c34_水.png                 # 文件名与 opensource_chars.py / upload_to_cloud.py 相同
+        frames/6c34_水/01.png       # --frames：逐笔画帧
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+
+# Make Me a Hanzi 坐标系: 1024 x 1024，y 轴向上，基线偏移 900（SVG 中为 scale(1, -1) translate(0, -900)）
+EM_SIZE = 1024
+BASELINE = 900
+
+CURVE_SEGMENTS = 8
+TOKEN_RE = re.compile(r'[MLQCZmlqcz]|-?\d+(?:\.\d+)?')
+
+
+# ============================================================================
+# 路径解析
+# ============================================================================
+
+def parse_path(path):
+    """
+    解析 SVG 路径（Make Me a Hanzi 只使用绝对坐标的 M / L / Q / C / Z）
+
+    Returns:
+        按路径顺序排列的线段 / 曲线控制点列表：直线 2 个点，二次曲线 3 个点，三次曲线 4 个点；
+        未闭合的子路径自动补上闭合边
+    """
+    segments = []
+    tokens = TOKEN_RE.findall(path)
+    start = current = None
+    command = None
+    i = 0
+
+    def close():
+        if current is not None and current != start:
+            segments.append((current, start))
+
+    while i < len(tokens):
+        token = tokens[i]
+        if token.isalpha():
+            command = token.upper()
+            i += 1
+            if command == 'Z':
+                close()
+                current = start
+                continue
+        if command == 'M':
+            close()
+            start = current = (float(tokens[i]), float(tokens[i + 1]))
+            command = 'L'  # M 后面连续的坐标对按 L 处理
+            i += 2
+        elif command == 'L':
+            point = (float(tokens[i]), float(tokens[i + 1]))
+            segments.append((current, point))
+            current = point
+            i += 2
+        elif command == 'Q':
+            control = (float(tokens[i]), float(tokens[i + 1]))
+            point = (float(tokens[i + 2]), float(tokens[i + 3]))
+            segments.append((current, control, point))
+            current = point
+            i += 4
+        elif command == 'C':
+            c1 = (float(tokens[i]), float(tokens[i + 1]))
+            c2 = (float(tokens[i + 2]), float(tokens[i + 3]))
+            point = (float(tokens[i + 4]), float(tokens[i + 5]))
+            segments.append((current, c1, c2, point))
+            current = point
+            i += 6
+        else:
+            raise ValueError(f"Unsupported path data: {path[:60]}")
+    close()
+    return segments
+
+
+def _flatten(segments, owners):
+    """把一组同类型的线段 / 曲线展开为直线边（向量化），返回 (edges (n, 4), owners)"""
+    if not segments:
+        return np.empty((0, 4)), np.empty(0, dtype=np.int64)
+
+    points = np.asarray(segments, dtype=np.float64)
+    if points.shape[1] == 2:
+        return points.reshape(-1, 4), np.asarray(owners, dtype=np.int64)
+
+    t = np.linspace(0.0, 1.0, CURVE_SEGMENTS + 1)[None, :, None]
+    if points.shape[1] == 3:
+        p0, c, p1 = points[:, None, 0], points[:, None, 1], points[:, None, 2]
+        u = 1 - t
+        curve = u * u * p0 + 2 * u * t * c + t * t * p1
+    else:
+        p0, c1, c2, p1 = (points[:, None, k] for k in range(4))
+        u = 1 - t
+        curve = u ** 3 * p0 + 3 * u * u * t * c1 + 3 * u * t * t * c2 + t ** 3 * p1
+
+    edges = np.concatenate([curve[:, :-1], curve[:, 1:]], axis=2).reshape(-1, 4)
+    return edges, np.repeat(np.asarray(owners, dtype=np.int64), CURVE_SEGMENTS)
+
+
+def stroke_edges(stroke_groups):
+    """
+    把多组笔画转换为边数组
+
+    Args:
+        stroke_groups: 每张图片的笔画路径列表
+
+    Returns:
+        (edges (n, 4) 为 x0, y0, x1, y1；image (n,) 图片序号；stroke (n,) 全局笔画序号)
+    """
+    # 扫描线填充与边的顺序无关，按控制点个数分组后分别展开
+    buckets = {2: ([], []), 3: ([], []), 4: ([], [])}
+    stroke_image = []
+    for image, strokes in enumerate(stroke_groups):
+        for path in strokes:
+            stroke = len(stroke_image)
+            stroke_image.append(image)
+            for segment in parse_path(path):
+                segments, owners = buckets[len(segment)]
+                segments.append(segment)
+                owners.append(stroke)
+
+    parts = [_flatten(segments, owners) for segments, owners in buckets.values()]
+    edges = np.concatenate([p[0] for p in parts])
+    stroke = np.concatenate([p[1] for p in parts])
+    image = np.asarray(stroke_image, dtype=np.int64)[stroke] if len(stroke) else stroke
+    return edges, image, stroke
+
+
+# ============================================================================
+# 扫描线填充
+# ============================================================================
+
+def fill_edges(edges, image, stroke, images, size, supersample):
+    """
+    向量化扫描线填充
+
+    垂直方向每个像素采样 supersample 条扫描线（行中心），水平方向按区间与像素的重叠长度计算精确覆盖率，
+    每个笔画按奇偶规则填充（边按 [ymin, ymax) 半开区间计算交点）
+
+    Args:
+        edges: (n, 4) 输出像素坐标（y 轴向下）
+        image / stroke: 每条边所属的图片 / 笔画
+        images: 图片数量
+        size: 图片边长
+        supersample: 每个像素的扫描线数
+
+    Returns:
+        (images, size * supersample, size) float32 每条扫描线的覆盖率；
+        同一图片的笔画直接相加，重叠部分 > 1，由调用方截断
+    """
+    rows = size * supersample
+    x0, y0, x1, y1 = edges.T
+    y0, y1 = y0 * supersample, y1 * supersample
+    keep = y0 != y1
+    x0, y0, x1, y1, image, stroke = x0[keep], y0[keep], x1[keep], y1[keep], image[keep], stroke[keep]
+
+    # 每条边覆盖的扫描线 [row_start, row_end)
+    y_min, y_max = np.minimum(y0, y1), np.maximum(y0, y1)
+    row_start = np.clip(np.ceil(y_min - 0.5), 0, rows).astype(np.int64)
+    row_end = np.clip(np.ceil(y_max - 0.5), 0, rows).astype(np.int64)
+    counts = row_end - row_start
+
+    # 全部交点
+    edge = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    row = row_start[edge] + np.arange(len(edge)) - offsets[edge]
+    slope = (x1 - x0) / (y1 - y0)
+    x = x0[edge] + (row + 0.5 - y0[edge]) * slope[edge]
+    image, stroke = image[edge], stroke[edge]
+
+    # 同一 (笔画, 行) 的交点按 x 排序后两两配对
+    order = np.lexsort((x, row, stroke))
+    x, row, image, stroke = x[order], row[order], image[order], stroke[order]
+
+    # 数值误差导致某行交点数为奇数时丢掉该行最后一个交点
+    key = stroke * rows + row
+    bounds = np.flatnonzero(np.diff(key)) + 1
+    sizes = np.diff(np.concatenate(([0], bounds, [len(key)])))
+    if (sizes % 2).any():
+        odd_ends = np.concatenate((bounds, [len(key)]))[sizes % 2 == 1] - 1
+        mask = np.ones(len(key), dtype=bool)
+        mask[odd_ends] = False
+        x, row, image = x[mask], row[mask], image[mask]
+
+    # 区间 [xa, xb) 写入差分数组: 起点所在像素 +(1 - frac)，下一像素 +frac；终点相反，cumsum 后即为重叠长度
+    x = np.clip(x, 0, size)
+    cell = np.minimum(np.floor(x), size).astype(np.int64)
+    frac = x - cell
+    sign = np.tile([1.0, -1.0], len(x) // 2)
+    base = (image * rows + row) * (size + 2)
+
+    index = np.concatenate((base + cell, base + cell + 1))
+    weight = np.concatenate((sign * (1 - frac), sign * frac))
+    length = images * rows * (size + 2)
+    diff = np.bincount(index, weights=weight, minlength=length).astype(np.float32)
+    return diff.reshape(images, rows, size + 2).cumsum(axis=2)[:, :, :size]
+
+
+def _pixel_edges(stroke_groups, size):
+    """笔画 -> 输出像素坐标的边"""
+    edges, image, stroke = stroke_edges(stroke_groups)
+    scale = size / EM_SIZE
+    edges = edges * scale
+    edges[:, 1::2] = (BASELINE * scale) - edges[:, 1::2]
+    return edges, image, stroke
+
+
+def to_gray(coverage, size, supersample):
+    """扫描线覆盖率（已截断到 [0, 1]）-> 灰度图"""
+    ink = coverage.reshape(-1, size, supersample, size).mean(axis=2)
+    return np.round(255 - ink * 255).astype(np.uint8)
+
+
+def to_pixels(stroke_groups, size=128, supersample=4):
+    """
+    光栅化多组笔画
+
+    Args:
+        stroke_groups: 每张图片的笔画路径列表
+        size: 输出图片边长
+        supersample: 每个像素的扫描线数
+
+    Returns:
+        (len(stroke_groups), size, size) uint8 灰度图（白底黑字）
+    """
+    edges, image, stroke = _pixel_edges(stroke_groups, size)
+    coverage = fill_edges(edges, image, stroke, len(stroke_groups), size, supersample)
+    np.clip(coverage, 0, 1, out=coverage)
+    return to_gray(coverage, size, supersample)
+
+
+def stroke_frames(strokes, size=128, supersample=4):
+    """
+    逐笔画帧：第 k 帧包含前 k 笔
+
+    Returns:
+        (笔画数, size, size) uint8 灰度图
+    """
+    edges, image, stroke = _pixel_edges([[path] for path in strokes], size)
+    coverage = fill_edges(edges, image, stroke, len(strokes), size, supersample)
+    np.cumsum(coverage, axis=0, out=coverage)
+    np.clip(coverage, 0, 1, out=coverage)
+    return to_gray(coverage, size, supersample)
+
+
+# ============================================================================
+# 批量输出（进程池）
+# ============================================================================
+
+def _load_render_helpers():
+    from opensource_chars import char_filename, encode_png
+    return char_filename, encode_png
+
+
+_worker = None
+
+
+def _init_worker(store_file, output_dir, size, supersample, frames, batch_size):
+    """进程池初始化：每个进程打开一次 mmap 存储"""
+    global _worker
+    from hanzi_store import HanziStore
+    _worker = (HanziStore(store_file), Path(output_dir), size, supersample, frames, batch_size)
+
+
+def _rasterize_chunk(chars):
+    """
+    光栅化一批汉字并写入文件（在子进程中运行）
+
+    Returns:
+        (字数, 帧数, 字节数)
+    """
+    from PIL import Image
+
+    store, output_dir, size, supersample, frames, batch_size = _worker
+    char_filename, encode_png = _load_render_helpers()
+
+    glyphs = [g for g in map(store.get, chars) if g is not None and g.strokes]
+    count = frame_count = total = 0
+    for i in range(0, len(glyphs), batch_size):
+        batch = glyphs[i:i + batch_size]
+        pixels = to_pixels([g.strokes for g in batch], size, supersample)
+        for graphics, image in zip(batch, pixels):
+            data = encode_png(Image.fromarray(image, 'L'))
+            with open(output_dir / char_filename(graphics.char), 'wb') as f:
+                f.write(data)
+            count += 1
+            total += len(data)
+
+    if frames:
+        for graphics in glyphs:
+            frame_dir = output_dir / "frames" / Path(char_filename(graphics.char)).stem
+            frame_dir.mkdir(parents=True, exist_ok=True)
+            for k, image in enumerate(stroke_frames(graphics.strokes, size, supersample), 1):
+                data = encode_png(Image.fromarray(image, 'L'))
+                with open(frame_dir / f"{k:02d}.png", 'wb') as f:
+                    f.write(data)
+                frame_count += 1
+                total += len(data)
+
+    return count, frame_count, total
+
+
+def rasterize_store(store_file, output_dir="./generated_strokes", chars=None, size=128, supersample=4,
+                    frames=False, workers=None, chunk_size=128, batch_size=16):
+    """
+    多进程光栅化笔画存储中的汉字
+
+    Args:
+        store_file: hanzi_store.bin
+        output_dir: 输出目录（文件名: 6c34_水.png）
+        chars: 只处理这些汉字，None 表示存储中的全部汉字
+        size: 图片尺寸
+        supersample: 每个像素的扫描线数
+        frames: 同时输出逐笔画帧
+        workers: 进程数，默认 CPU 核数
+        chunk_size: 每个任务的字数
+        batch_size: 每次向量化填充的字数（内存约 batch_size * size^2 * supersample * 12 字节）
+
+    Returns:
+        {'glyphs', 'frames', 'missing', 'bytes', 'seconds', 'glyphs_per_second', 'workers', 'output_dir'}
+    """
+    from hanzi_store import HanziStore
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    with HanziStore(store_file) as store:
+        available = list(store.chars()) if chars is None else [c for c in chars if c in store]
+    missing = 0 if chars is None else len(chars) - len(available)
+
+    jobs = [available[i:i + chunk_size] for i in range(0, len(available), chunk_size)]
+
+    glyphs = frame_count = total_bytes = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(store_file), str(output_dir), size, supersample, frames,
+                                       batch_size)) as executor:
+        for count, nframes, nbytes in executor.map(_rasterize_chunk, jobs):
+            glyphs += count
+            frame_count += nframes
+            total_bytes += nbytes
+            if glyphs % (chunk_size * 8) < chunk_size:
+                print(f"  进度: {glyphs}/{len(available)}")
+    elapsed = time.perf_counter() - started
+
+    return {
+        'glyphs': glyphs,
+        'frames': frame_count,
+        'missing': missing,
+        'bytes': total_bytes,
+        'seconds': round(elapsed, 3),
+        'glyphs_per_second': glyphs / elapsed if elapsed else 0.0,
+        'workers': workers,
+        'output_dir': str(output_dir)
+    }
+
+
+def rasterize_pil(strokes, size=128, supersample=4):
+    """逐笔画用 PIL ImageDraw.polygon 填充（基准测试对照）"""
+    from PIL import Image, ImageDraw
+
+    resolution = size * supersample
+    img = Image.new('L', (resolution, resolution), 255)
+    draw = ImageDraw.Draw(img)
+    scale = resolution / EM_SIZE
+    for path in strokes:
+        points = []
+        for segment in parse_path(path):
+            edges, _ = _flatten([segment], [0])
+            points.extend((x * scale, (BASELINE - y) * scale) for x, y in edges[:, :2])
+        draw.polygon(points, fill=0)
+    return img.resize((size, size), Image.BOX)
+
+
+def benchmark(store_file, count=1000, size=128, supersample=4, batch_size=16):
+    """PIL 逐字逐笔画填充 / NumPy 批量扫描线"""
+    from hanzi_store import HanziStore
+
+    with HanziStore(store_file) as store:
+        glyphs = [g for g in store][:count]
+    strokes = [g.strokes for g in glyphs]
+
+    print("=" * 70)
+    print("⏱️  笔画光栅化基准测试")
+    print("=" * 70)
+    print(f"📊 字数: {len(glyphs)}  尺寸: {size}px  扫描线: {supersample}/像素")
+    print()
+
+    started = time.perf_counter()
+    for s in strokes:
+        rasterize_pil(s, size, supersample)
+    pil = len(strokes) / (time.perf_counter() - started)
+    print(f"   PIL 逐笔画 polygon     {pil:>10.0f} 字/秒")
+
+    started = time.perf_counter()
+    for i in range(0, len(strokes), batch_size):
+        to_pixels(strokes[i:i + batch_size], size, supersample)
+    vectorized = len(strokes) / (time.perf_counter() - started)
+    print(f"   NumPy 批量扫描线       {vectorized:>10.0f} 字/秒  ({vectorized / pil:.1f}x)")
+    print("=" * 70)
+    return {'pil': pil, 'vectorized': vectorized}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Make Me a Hanzi 笔画光栅化')
+    parser.add_argument('--store', default='./makemeahanzi_data/hanzi_store.bin', help='笔画存储文件')
+    parser.add_argument('--output', '-o', default='./generated_strokes', help='输出目录')
+    parser.add_argument('--chars', help='只处理这些汉字（默认常用字）')
+    parser.add_argument('--all', action='store_true', help='处理存储中的全部汉字')
+    parser.add_argument('--tier', type=int, default=1, choices=(1, 2, 3), help='常用字范围：一级到 N 级字表')
+    parser.add_argument('--size', type=int, default=128, help='图片尺寸')
+    parser.add_argument('--supersample', type=int, default=4, help='每个像素的扫描线数（抗锯齿）')
+    parser.add_argument('--frames', action='store_true', help='同时输出逐笔画帧')
+    parser.add_argument('--workers', '-j', type=int, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--benchmark', action='store_true', help='基准测试')
+    parser.add_argument('--count', type=int, default=1000, help='基准测试字数')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.store, args.count, args.size, args.supersample)
+        return
+
+    if args.all:
+        chars = None
+    elif args.chars:
+        chars = list(dict.fromkeys(args.chars))
+    else:
+        from opensource_chars import load_common_chars
+        chars = load_common_chars(args.tier)
+
+    print("=" * 70)
+    print("🖌️  笔画光栅化")
+    print("=" * 70)
+    stats = rasterize_store(args.store, args.output, chars, args.size, args.supersample,
+                            args.frames, args.workers)
+    frames = f"，{stats['frames']} 帧" if args.frames else ""
+    print(f"✅ 完成！{stats['glyphs']} 个汉字{frames}，{stats['seconds']}s "
+          f"({stats['glyphs_per_second']:.0f} 字/秒，{stats['workers']} 进程)")
+    if stats['missing']:
+        print(f"⚠️  {stats['missing']} 个汉字不在笔画存储中")
+    print(f"💾 保存到: {stats['output_dir']}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 先下载 Make Me a Hanzi 并生成笔画存储（opensource_chars.py 方案1）
+python3 opensource_chars.py
+
+# 光栅化常用字 -> generated_strokes/6c34_水.png
+python3 stroke_rasterizer.py
+
+# 全部汉字，256px，8 进程，同时输出笔顺动画帧
+python3 stroke_rasterizer.py --all --size 256 -j 8 --frames
+
+# 上传（与字体渲染的图片相同）
+python3 upload_to_cloud.py
+
+# 基准测试
+python3 stroke_rasterizer.py --benchmark
+"""
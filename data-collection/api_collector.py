@@ -8,6 +8,7 @@ import json
 import os
 import time
 import base64
+import binascii
 import re
 import requests
 from pathlib import Path
@@ -15,6 +16,12 @@ from datetime import datetime
 from typing import Optional, Dict, List
 from tqdm import tqdm
 
+from rate_controller import AdaptiveRateController
+from glyph_catalog import GlyphCatalog
+from negative_cache import (
+    NegativeCache, REASON_NO_URL, REASON_HTTP_ERROR, REASON_DECODE_ERROR
+)
+
 
 class APICollector:
     """使用 API Token 直接采集汉字图片"""
@@ -23,7 +30,10 @@ class APICollector:
                  token: str,
                  api_base_url: str = "https://sfapi.fanglige.com",
                  token_header: str = "Authorization",
-                 token_format: str = "Bearer {token}"):
+                 token_format: str = "Bearer {token}",
+                 max_rate: float = 5.0,
+                 max_retries: int = 3,
+                 use_negative_cache: bool = True):
         """
         初始化采集器
         
@@ -32,11 +42,18 @@ class APICollector:
             api_base_url: API 基础 URL
             token_header: token 在 header 中的字段名（如 "Authorization", "Token", "X-Auth-Token"）
             token_format: token 的格式（如 "Bearer {token}", "{token}", "Token {token}"）
+            max_rate: 自适应限速的速率上限（请求/秒）
+            max_retries: 遇到 429/5xx 时的最大重试次数
+            use_negative_cache: 是否跳过负缓存中未过期的字符
         """
         self.token = token
         self.api_base_url = api_base_url.rstrip('/')
         self.token_header = token_header
         self.token_format = token_format
+        self.max_retries = max_retries
+        
+        # 自适应限速（API 查询和图片下载共用）
+        self.rate_controller = AdaptiveRateController(max_rate=max_rate)
         
         # 输出目录
         self.output_dir = Path("./collected_characters")
@@ -46,25 +63,32 @@ class APICollector:
         self.common_chars = self.load_common_chars()
         self.collected_chars = set()
         
-        # URL映射
+        # 字形目录（多变体），char_url_mapping.json 由目录导出 primary 变体
+        self.catalog = GlyphCatalog(self.output_dir)
         self.char_urls = {}
-        self.mapping_file = self.output_dir / "char_url_mapping.json"
+        self.mapping_file = self.catalog.legacy_mapping_file
+        
+        # 负缓存：记录无结果的字符，重复运行时跳过
+        self.use_negative_cache = use_negative_cache
+        self.negative_cache = NegativeCache(self.output_dir / "negative_cache.json")
+        self.last_failure = None  # 最近一次失败的 (原因, 详情)
         
         # 统计信息
         self.stats = {
             'total_requests': 0,
             'images_saved': 0,
+            'variants_saved': 0,
             'api_responses': 0,
             'failed': 0,
+            'negative_cache_skipped': 0,
             'start_time': datetime.now().isoformat()
         }
         
         # 加载已有数据
-        if self.mapping_file.exists():
-            with open(self.mapping_file, 'r', encoding='utf-8') as f:
-                self.char_urls = json.load(f)
-                self.collected_chars = set(self.char_urls.keys())
-                print(f"📂 已加载 {len(self.char_urls)} 个已采集字符")
+        if len(self.catalog):
+            self.char_urls = self.catalog.to_legacy_mapping()
+            self.collected_chars = set(self.char_urls.keys())
+            print(f"📂 已加载 {len(self.char_urls)} 个已采集字符（{self.catalog.variant_count()} 个变体）")
         
         # 创建 session
         self.session = requests.Session()
@@ -102,8 +126,10 @@ class APICollector:
             char: 汉字
             
         Returns:
-            包含图片 URL 或数据的字典，失败返回 None
+            包含图片 URL 或数据的字典，失败返回 None（原因记录在 self.last_failure）
+            'variants' 字段包含响应中的所有字形变体，第一个即顶层的 data/url
         """
+        self.last_failure = None
         try:
             import random
             import string
@@ -136,8 +162,10 @@ class APICollector:
             }
             
             try:
-                response = self.session.get(endpoint, params=params, headers=headers, timeout=10)
-                self.stats['total_requests'] += 1
+                response = self._request(endpoint, params=params, headers=headers)
+                
+                if response.status_code != 200:
+                    return self._fail(REASON_HTTP_ERROR, f"HTTP {response.status_code}")
                 
                 # 如果返回的是图片
                 if response.headers.get('content-type', '').startswith('image/'):
@@ -162,15 +190,14 @@ class APICollector:
                             url_pattern = r'https?://sfapi\.fanglige\.com/svg_png/[^\s]+\.png'
                             matches = re.findall(url_pattern, encrypted_value)
                             if matches:
-                                # 返回第一个匹配的 URL
-                                image_url = matches[0]
-                                return self._download_image(image_url)
-                            return None
+                                # 下载所有匹配的变体
+                                return self._download_variants(matches)
+                            return self._fail(REASON_NO_URL, "encrypted response without image URL")
                         
                         # 尝试从 JSON 中提取图片 URL
-                        image_url = self._extract_image_url_from_json(data)
-                        if image_url:
-                            return self._download_image(image_url)
+                        image_urls = self._extract_image_urls_from_json(data)
+                        if image_urls:
+                            return self._download_variants(image_urls)
                         
                         # 如果 JSON 中直接包含图片数据（base64）
                         if 'image' in data or 'data' in data:
@@ -178,12 +205,18 @@ class APICollector:
                             if isinstance(image_data, str) and image_data.startswith('data:image'):
                                 # data:image/png;base64,xxx
                                 base64_data = image_data.split(',')[1]
+                                try:
+                                    decoded = base64.b64decode(base64_data)
+                                except (binascii.Error, ValueError) as e:
+                                    return self._fail(REASON_DECODE_ERROR, f"base64: {e}")
                                 return {
                                     'type': 'image',
-                                    'data': base64.b64decode(base64_data),
+                                    'data': decoded,
                                     'url': response.url,
                                     'content_type': 'image/png'
                                 }
+                        
+                        return self._fail(REASON_NO_URL, "JSON response without image URL")
                     
                     except json.JSONDecodeError:
                         # 响应不是 JSON，可能是文本
@@ -192,22 +225,56 @@ class APICollector:
                         url_pattern = r'https?://sfapi\.fanglige\.com/svg_png/[^\s]+\.png'
                         matches = re.findall(url_pattern, text)
                         if matches:
-                            return self._download_image(matches[0])
+                            return self._download_variants(matches)
+                        return self._fail(REASON_DECODE_ERROR, "invalid JSON response")
                 
             except requests.exceptions.RequestException as e:
                 print(f"❌ 请求失败: {e}")
-                return None
+                return self._fail(REASON_HTTP_ERROR, type(e).__name__)
             
-            return None
+            return self._fail(REASON_NO_URL, f"unexpected content-type: {response.headers.get('content-type', '')}")
             
         except Exception as e:
             print(f"❌ 获取 '{char}' 失败: {e}")
-            return None
+            return self._fail(REASON_DECODE_ERROR, str(e))
+    
+    def _fail(self, reason: str, detail: str = "") -> None:
+        """记录失败原因并返回 None"""
+        self.last_failure = (reason, detail)
+        return None
+    
+    def _request(self, url: str, **kwargs) -> requests.Response:
+        """
+        经过自适应限速的 GET 请求
+        
+        遇到 429/5xx 时按 Retry-After 退避后重试，超过 max_retries 返回最后一次响应；
+        网络异常在重试耗尽后向上抛出
+        """
+        kwargs.setdefault('timeout', 10)
+        
+        for attempt in range(self.max_retries + 1):
+            self.rate_controller.wait()
+            self.stats['total_requests'] += 1
+            
+            try:
+                response = self.session.get(url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.rate_controller.record_error(type(e).__name__)
+                if attempt >= self.max_retries:
+                    raise
+                continue
+            
+            if not self.rate_controller.record_response(response.status_code, response.headers):
+                return response
+            
+            print(f"⏳ HTTP {response.status_code}，降速至 {self.rate_controller.rate:.2f} 请求/秒")
+        
+        return response
     
     def _download_image(self, image_url: str) -> Optional[Dict]:
         """下载图片"""
         try:
-            img_response = self.session.get(image_url, timeout=10)
+            img_response = self._request(image_url)
             if img_response.status_code == 200:
                 return {
                     'type': 'image',
@@ -215,58 +282,80 @@ class APICollector:
                     'url': image_url,
                     'content_type': img_response.headers.get('content-type', 'image/png')
                 }
+            return self._fail(REASON_HTTP_ERROR, f"image HTTP {img_response.status_code}")
         except Exception as e:
             print(f"❌ 下载图片失败 {image_url}: {e}")
-        return None
+            return self._fail(REASON_HTTP_ERROR, f"image {type(e).__name__}")
+    
+    def _download_variants(self, image_urls: List[str]) -> Optional[Dict]:
+        """
+        下载响应中的所有变体（limit=24 时最多 24 个）
+        
+        返回第一个成功的结果，'variants' 字段包含全部成功下载的变体
+        """
+        variants = []
+        for image_url in dict.fromkeys(image_urls):  # 去重并保持顺序
+            result = self._download_image(image_url)
+            if result:
+                variants.append(result)
+        
+        if not variants:
+            return None
+        
+        self.last_failure = None
+        return dict(variants[0], variants=variants)
     
-    def _extract_image_url_from_json(self, data: Dict) -> Optional[str]:
-        """从 JSON 响应中提取图片 URL"""
-        def find_url(obj, path=""):
+    def _extract_image_urls_from_json(self, data: Dict) -> List[str]:
+        """从 JSON 响应中提取所有图片 URL"""
+        urls = []
+        
+        def find_urls(obj, path=""):
             if isinstance(obj, dict):
                 for k, v in obj.items():
                     if k in ['url', 'image_url', 'imageUrl', 'img', 'src', 'path']:
                         if isinstance(v, str) and ('.png' in v or '.jpg' in v or 'http' in v):
-                            return v
-                    result = find_url(v, f"{path}.{k}")
-                    if result:
-                        return result
+                            urls.append(v)
+                            continue
+                    find_urls(v, f"{path}.{k}")
             elif isinstance(obj, list):
                 for item in obj:
-                    result = find_url(item, path)
-                    if result:
-                        return result
+                    find_urls(item, path)
             elif isinstance(obj, str):
                 if ('.png' in obj or '.jpg' in obj) and ('http' in obj or obj.startswith('/')):
-                    return obj
-            return None
+                    urls.append(obj)
         
-        return find_url(data)
+        find_urls(data)
+        return urls
     
-    def save_char_image(self, char: str, image_data: bytes, url: str, content_type: str = 'image/png'):
-        """保存汉字图片"""
-        # 生成文件名
-        unicode_hex = f"{ord(char):04x}"
-        filename = f"{unicode_hex}_{char}.png"
-        filepath = self.output_dir / filename
-        
-        # 保存图片
-        with open(filepath, 'wb') as f:
-            f.write(image_data)
+    def save_char_variants(self, char: str, variants: List[Dict]):
+        """保存汉字的所有变体到 {unicode}_{汉字}/ 目录"""
+        new_count = 0
+        for variant in variants:
+            _, is_new = self.catalog.add_variant(
+                char,
+                variant['data'],
+                url=variant['url'],
+                source='api',
+                content_type=variant.get('content_type', 'image/png')
+            )
+            if is_new:
+                new_count += 1
         
         self.stats['images_saved'] += 1
+        self.stats['variants_saved'] += new_count
         
-        # 记录映射
-        self.char_urls[char] = {
-            "url": url,
-            "filename": filename,
-            "unicode": f"U+{ord(char):04X}",
-            "size": len(image_data),
-            "timestamp": datetime.now().isoformat()
-        }
+        # 记录映射（primary 变体）
+        self.char_urls[char] = self.catalog.legacy_entry(char)
         
         self.collected_chars.add(char)
+        self.negative_cache.discard(char)
         
-        print(f"✅ [{self.stats['images_saved']}] 保存: '{char}' -> {filename} ({len(image_data)} bytes)")
+        print(f"✅ [{self.stats['images_saved']}] 保存: '{char}' -> {self.char_urls[char]['filename']} "
+              f"(新增 {new_count} 个变体，共 {len(self.catalog.variants(char))} 个)")
+    
+    def save_char_image(self, char: str, image_data: bytes, url: str, content_type: str = 'image/png'):
+        """保存单张汉字图片（作为一个变体）"""
+        self.save_char_variants(char, [{'data': image_data, 'url': url, 'content_type': content_type}])
     
     def collect_char(self, char: str) -> bool:
         """采集单个汉字"""
@@ -277,12 +366,7 @@ class APICollector:
         result = self.get_char_image(char)
         
         if result and result['type'] == 'image':
-            self.save_char_image(
-                char=char,
-                image_data=result['data'],
-                url=result['url'],
-                content_type=result.get('content_type', 'image/png')
-            )
+            self.save_char_variants(char, result.get('variants') or [result])
             
             # 定期保存
             if len(self.char_urls) % 10 == 0:
@@ -292,7 +376,9 @@ class APICollector:
             return True
         else:
             self.stats['failed'] += 1
-            print(f"❌ 无法获取 '{char}' 的图片")
+            reason, detail = self.last_failure or (REASON_NO_URL, "")
+            self.negative_cache.record(char, reason, detail)
+            print(f"❌ 无法获取 '{char}' 的图片 ({reason})")
             return False
     
     def collect_batch(self, chars: List[str] = None, delay: float = 0.5):
@@ -301,7 +387,7 @@ class APICollector:
         
         Args:
             chars: 要采集的汉字列表，None 表示使用常用字列表
-            delay: 每次请求之间的延迟（秒）
+            delay: 初始请求间隔（秒），之后由自适应限速根据服务器响应调整
         """
         if chars is None:
             chars = self.common_chars
@@ -309,33 +395,44 @@ class APICollector:
         # 过滤已采集的字符
         chars_to_collect = [c for c in chars if c not in self.collected_chars]
         
+        # 过滤负缓存中未过期的字符
+        if self.use_negative_cache:
+            before = len(chars_to_collect)
+            chars_to_collect = self.negative_cache.filter(chars_to_collect)
+            self.stats['negative_cache_skipped'] = before - len(chars_to_collect)
+        
         if not chars_to_collect:
-            print("✅ 所有字符已采集完成！")
+            if self.stats['negative_cache_skipped']:
+                print(f"✅ 没有待采集字符（{self.stats['negative_cache_skipped']} 个在负缓存中，TTL 到期后重试）")
+            else:
+                print("✅ 所有字符已采集完成！")
             return
         
         print(f"🚀 开始批量采集 {len(chars_to_collect)} 个汉字...")
         print(f"   已采集: {len(self.collected_chars)}")
         print(f"   待采集: {len(chars_to_collect)}")
+        if self.stats['negative_cache_skipped']:
+            print(f"   负缓存跳过: {self.stats['negative_cache_skipped']}")
         print()
         
+        if delay > 0:
+            self.rate_controller.set_rate(1.0 / delay)
+        
         # 使用进度条
         with tqdm(total=len(chars_to_collect), desc="采集进度") as pbar:
             for char in chars_to_collect:
                 success = self.collect_char(char)
                 pbar.update(1)
-                
-                # 延迟，避免请求过快
-                if delay > 0:
-                    time.sleep(delay)
+                pbar.set_postfix({"速率": f"{self.rate_controller.rate:.2f}/s"})
         
         # 最终保存
         self._save_mapping()
         self._print_progress()
     
     def _save_mapping(self):
-        """保存字符映射"""
-        with open(self.mapping_file, 'w', encoding='utf-8') as f:
-            json.dump(self.char_urls, f, indent=2, ensure_ascii=False)
+        """保存字形目录，并导出字符映射（primary 变体）"""
+        self.catalog.save(export_legacy=True)
+        self.negative_cache.save()
     
     def _print_progress(self):
         """打印进度"""
@@ -346,12 +443,16 @@ class APICollector:
         print("\n" + "="*70)
         print(f"📊 采集进度: {collected}/{total} ({percentage:.1f}%)")
         print(f"   图片总数: {self.stats['images_saved']}")
+        print(f"   变体总数: {self.catalog.variant_count()}")
         print(f"   失败: {self.stats['failed']}")
+        print(f"   当前速率: {self.rate_controller.rate:.2f} 请求/秒")
         print("="*70 + "\n")
     
     def done(self):
         """清理和总结"""
         self._save_mapping()
+        self.stats['rate_control'] = self.rate_controller.metrics()
+        self.stats['negative_cache'] = self.negative_cache.summary()
         
         # 生成采集报告
         report = {
@@ -379,7 +480,10 @@ class APICollector:
         print(f"   完成率: {len(self.collected_chars) / len(self.common_chars) * 100:.1f}%")
         print(f"   图片总数: {self.stats['images_saved']}")
         print(f"   失败: {self.stats['failed']}")
+        print(f"   退避次数: {self.stats['rate_control']['backoff_events']}")
+        print(f"   负缓存跳过: {self.stats['negative_cache_skipped']}")
         print(f"   保存位置: {self.output_dir}")
+        print(f"   目录文件: {self.catalog.catalog_file}")
         print(f"   映射文件: {self.mapping_file}")
         print(f"   报告文件: {report_file}")
         print("="*70)
@@ -406,10 +510,13 @@ def main():
     api_base_url = os.getenv('CLOUDBRUSH_API_URL', 'https://sfapi.fanglige.com')
     token_header = os.getenv('CLOUDBRUSH_TOKEN_HEADER', 'Authorization')
     token_format = os.getenv('CLOUDBRUSH_TOKEN_FORMAT', 'Bearer {token}')
+    max_rate = float(os.getenv('CLOUDBRUSH_MAX_RATE', '5.0'))
+    use_negative_cache = os.getenv('CLOUDBRUSH_IGNORE_NEGATIVE_CACHE', '') != '1'
     
     print(f"📡 API 地址: {api_base_url}")
     print(f"🔑 Token Header: {token_header}")
     print(f"📝 Token 格式: {token_format}")
+    print(f"⚡ 速率上限: {max_rate} 请求/秒")
     print()
     
     # 创建采集器
@@ -417,7 +524,9 @@ def main():
         token=token,
         api_base_url=api_base_url,
         token_header=token_header,
-        token_format=token_format
+        token_format=token_format,
+        max_rate=max_rate,
+        use_negative_cache=use_negative_cache
     )
     
     # 测试单个字符
@@ -447,7 +556,7 @@ def main():
     print()
     
     try:
-        collector.collect_batch(delay=0.5)  # 每次请求间隔 0.5 秒
+        collector.collect_batch(delay=0.5)  # 初始间隔 0.5 秒，之后自适应调整
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断采集")
     finally:
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+字形图集（Sprite Sheet）生成
+把多个汉字的 primary 变体打包到少量图集中，客户端渲染短语时只需请求几张缓存的图片
+
+分组方式:
+- tier:  按字频表（common_3500_chars.txt）顺序，每 N 个字一张图集；不在表中的字按 Unicode 区块分组
+- block: 按 Unicode 区块（码位 >> 8，即每 256 个码位）分组
+
+输出（与单字 PNG 一起上传，key = "chars/" + 相对路径）:
+    collected_characters/atlases/tier-000.3f9a1c2e.png
+    collected_characters/atlases/tier-000.3f9a1c2e.webp   (Pillow 支持 WebP 时)
+    collected_characters/atlases/atlas_index.json
+
+文件名带内容哈希，内容不变时 URL 不变，可长期缓存；
+每个字在图集中的坐标写入 glyph_catalog.json 并随 char_url_mapping.json 导出
+"""
+
+import hashlib
+import io
+import json
+import math
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from glyph_catalog import GlyphCatalog
+
+
+ATLAS_DIR = "atlases"
+INDEX_FILENAME = "atlas_index.json"
+R2_KEY_PREFIX = "chars/"
+
+DEFAULT_CELL_SIZE = 64
+DEFAULT_CHARS_PER_ATLAS = 256
+DEFAULT_PADDING = 1
+
+
+def block_id(char: str) -> str:
+    """Unicode 区块分组 ID，例如 水 (U+6C34) -> block-6c"""
+    return f"block-{ord(char) >> 8:02x}"
+
+
+def load_frequency_order(freq_file: Path) -> List[str]:
+    """读取字频表（按文件中出现顺序，去重）"""
+    if not freq_file.exists():
+        return []
+    with open(freq_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return list(OrderedDict.fromkeys(c for c in text if not c.isspace()))
+
+
+def group_chars(chars: Sequence[str],
+                group_by: str = 'tier',
+                frequency: Optional[Sequence[str]] = None,
+                per_atlas: int = DEFAULT_CHARS_PER_ATLAS) -> Dict[str, List[str]]:
+    """
+    把字符分配到图集
+
+    Args:
+        chars: 已采集的字符
+        group_by: 'tier' 或 'block'
+        frequency: 字频表顺序（tier 模式使用）
+        per_atlas: 每张图集最多容纳的字数
+
+    Returns:
+        {图集ID: [字符, ...]}（字符按码位或字频排序）
+    """
+    available = set(chars)
+    groups: Dict[str, List[str]] = OrderedDict()
+
+    remaining = sorted(available)
+    if group_by == 'tier':
+        ranked = [c for c in (frequency or []) if c in available]
+        for start in range(0, len(ranked), per_atlas):
+            groups[f"tier-{start // per_atlas:03d}"] = ranked[start:start + per_atlas]
+        ranked_set = set(ranked)
+        remaining = [c for c in remaining if c not in ranked_set]
+    elif group_by != 'block':
+        raise ValueError(f"Unknown group_by: {group_by}")
+
+    by_block: Dict[str, List[str]] = OrderedDict()
+    for char in remaining:
+        by_block.setdefault(block_id(char), []).append(char)
+
+    # 区块内超过容量时拆分为多张
+    for bid, members in by_block.items():
+        if len(members) <= per_atlas:
+            groups[bid] = members
+            continue
+        for part, start in enumerate(range(0, len(members), per_atlas)):
+            groups[f"{bid}-{part}"] = members[start:start + per_atlas]
+
+    return groups
+
+
+class AtlasBuilder:
+    """图集生成器"""
+
+    def __init__(self,
+                 data_dir: str = "./collected_characters",
+                 group_by: str = 'tier',
+                 freq_file: str = "./common_3500_chars.txt",
+                 cell_size: int = DEFAULT_CELL_SIZE,
+                 per_atlas: int = DEFAULT_CHARS_PER_ATLAS,
+                 padding: int = DEFAULT_PADDING):
+        self.data_dir = Path(data_dir)
+        self.atlas_dir = self.data_dir / ATLAS_DIR
+        self.group_by = group_by
+        self.freq_file = Path(freq_file)
+        self.cell_size = cell_size
+        self.per_atlas = per_atlas
+        self.padding = padding
+        self.catalog = GlyphCatalog(self.data_dir)
+
+    def _primary_path(self, char: str) -> Optional[Path]:
+        variants = self.catalog.variants(char)
+        if not variants:
+            return None
+        path = self.catalog.path_for(variants[0])
+        return path if path.exists() else None
+
+    def _render_sheet(self, chars: List[str]):
+        """把一组字符绘制到一张图集，返回 (图像, {字符: 坐标})"""
+        from PIL import Image
+
+        columns = max(1, math.ceil(math.sqrt(len(chars))))
+        rows = math.ceil(len(chars) / columns)
+        pitch = self.cell_size + self.padding
+        sheet = Image.new('RGBA', (columns * pitch - self.padding, rows * pitch - self.padding),
+                          (255, 255, 255, 0))
+
+        frames = {}
+        for index, char in enumerate(chars):
+            with Image.open(self._primary_path(char)) as img:
+                glyph = img.convert('RGBA')
+            glyph.thumbnail((self.cell_size, self.cell_size), Image.Resampling.LANCZOS)
+
+            # 在单元格中居中
+            col, row = index % columns, index // columns
+            x = col * pitch + (self.cell_size - glyph.width) // 2
+            y = row * pitch + (self.cell_size - glyph.height) // 2
+            sheet.paste(glyph, (x, y))
+            frames[char] = {'x': x, 'y': y, 'w': glyph.width, 'h': glyph.height}
+
+        # 全不透明时去掉 alpha 通道，减小体积
+        if sheet.getchannel('A').getextrema() == (255, 255):
+            sheet = sheet.convert('RGB')
+        return sheet, frames
+
+    def _write_sheet(self, atlas_id: str, sheet) -> Dict[str, Dict]:
+        """写入 PNG（以及 WebP），文件名带内容哈希"""
+        from PIL import features
+
+        encoded = {}
+        buffer = io.BytesIO()
+        sheet.save(buffer, format='PNG', optimize=True)
+        encoded['png'] = buffer.getvalue()
+        if features.check('webp'):
+            buffer = io.BytesIO()
+            sheet.save(buffer, format='WEBP', lossless=True, method=6)
+            encoded['webp'] = buffer.getvalue()
+
+        digest = hashlib.sha256(encoded['png']).hexdigest()[:8]
+        files = {}
+        for fmt, data in encoded.items():
+            relpath = f"{ATLAS_DIR}/{atlas_id}.{digest}.{fmt}"
+            path = self.data_dir / relpath
+            if not path.exists():
+                path.write_bytes(data)
+            files[fmt] = {'filename': relpath, 'key': R2_KEY_PREFIX + relpath, 'bytes': len(data)}
+        return files
+
+    def _remove_stale_files(self, keep: set):
+        for path in self.atlas_dir.iterdir():
+            if path.name != INDEX_FILENAME and f"{ATLAS_DIR}/{path.name}" not in keep:
+                path.unlink()
+
+    def build(self) -> Dict:
+        chars = [c for c in self.catalog.characters if self._primary_path(c) is not None]
+        frequency = load_frequency_order(self.freq_file) if self.group_by == 'tier' else None
+        groups = group_chars(chars, self.group_by, frequency, self.per_atlas)
+
+        print("=" * 70)
+        print("🧩 字形图集生成")
+        print("=" * 70)
+        print(f"📁 数据目录: {self.data_dir}")
+        print(f"📊 字符数: {len(chars)}  图集数: {len(groups)}  分组: {self.group_by}")
+        print(f"📐 单元格: {self.cell_size}px  每张最多: {self.per_atlas} 字")
+        print()
+
+        self.atlas_dir.mkdir(parents=True, exist_ok=True)
+        index = {
+            'version': 1,
+            'generated_at': datetime.now().isoformat(),
+            'group_by': self.group_by,
+            'cell_size': self.cell_size,
+            'atlases': {},
+            'chars': {}
+        }
+        keep = set()
+
+        for atlas_id, members in groups.items():
+            sheet, frames = self._render_sheet(members)
+            files = self._write_sheet(atlas_id, sheet)
+            keep.update(f['filename'] for f in files.values())
+
+            index['atlases'][atlas_id] = {
+                'width': sheet.width,
+                'height': sheet.height,
+                'count': len(members),
+                'files': files
+            }
+            for char, frame in frames.items():
+                index['chars'][char] = dict(atlas=atlas_id, **frame)
+                self.catalog.set_atlas(char, {
+                    'id': atlas_id,
+                    'width': sheet.width,
+                    'height': sheet.height,
+                    'keys': {fmt: f['key'] for fmt, f in files.items()},
+                    **frame
+                })
+
+            sizes = ', '.join(f"{fmt} {f['bytes'] / 1024:.1f} KB" for fmt, f in files.items())
+            print(f"✅ {atlas_id}: {len(members)} 字, {sheet.width}x{sheet.height} ({sizes})")
+
+        # 不再属于任何图集的字符（例如图片被删除）
+        for char in self.catalog.characters:
+            if char not in index['chars']:
+                self.catalog.set_atlas(char, None)
+
+        self._remove_stale_files(keep)
+        with open(self.atlas_dir / INDEX_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        self.catalog.save()
+
+        print()
+        print("=" * 70)
+        print("🎉 图集生成完成！")
+        print(f"   索引文件: {self.atlas_dir / INDEX_FILENAME}")
+        print("=" * 70)
+        return index
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成字形图集（Sprite Sheet）')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--group-by', choices=['tier', 'block'], default='tier',
+                        help='分组方式: tier=按字频, block=按 Unicode 区块')
+    parser.add_argument('--freq-file', default='./common_3500_chars.txt', help='字频表（tier 模式）')
+    parser.add_argument('--cell-size', type=int, default=DEFAULT_CELL_SIZE, help='单元格大小（像素）')
+    parser.add_argument('--per-atlas', type=int, default=DEFAULT_CHARS_PER_ATLAS, help='每张图集最多字数')
+    args = parser.parse_args()
+
+    builder = AtlasBuilder(args.data_dir, args.group_by, args.freq_file,
+                           args.cell_size, args.per_atlas)
+    builder.build()
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 按字频分组（常用字集中在前几张图集）
+python3 atlas_builder.py
+
+# 按 Unicode 区块分组，单元格 96px
+python3 atlas_builder.py --group-by block --cell-size 96
+
+生成后:
+=======
+- 图集和 atlas_index.json 保存在 collected_characters/atlases/
+- 上传: cd ../handwriting-api-worker && python3 upload-data.py
+- Worker 搜索结果中的 atlas 字段给出图集 URL 和字符坐标 (x, y, w, h)，
+  客户端用 CSS background-position 或 canvas drawImage 裁剪显示
+"""
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+抓包日志（JSONL 分段轮转）
+代替每个请求/响应一个 JSON 文件的方式，把记录追加到少量分段文件中
+
+- 每条记录一行紧凑 JSON，带全局单调递增序号 seq（跨进程重启不重复）
+- 分段按大小或时间轮转，轮转后压缩（安装 zstandard 时用 zstd，否则 gzip）
+- 图片等二进制内容存入内容寻址存储（content_store.py），记录中只保存 sha256
+
+目录结构:
+    debug_logs/capture/capture-20240101-120000-000000001000.jsonl       (当前分段)
+    debug_logs/capture/capture-20240101-110000-000000000001.jsonl.zst   (已轮转)
+    debug_logs/capture/capture_state.json                               (序号状态)
+    debug_logs/objects/ab/cd/abcd...                                    (图片内容)
+"""
+
+import gzip
+import io
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+SEGMENT_PATTERN = re.compile(r'^capture-\d{8}-\d{6}-(\d{12})\.jsonl(\.gz|\.zst)?$')
+STATE_FILENAME = "capture_state.json"
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 3600.0
+SEQ_RESERVE_BLOCK = 1000
+
+
+def default_compression() -> Optional[str]:
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+class CaptureLogWriter:
+    """JSONL 分段日志写入器（线程安全）"""
+
+    def __init__(self,
+                 log_dir,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE,
+                 compression: Optional[str] = 'auto'):
+        """
+        初始化写入器
+
+        Args:
+            log_dir: 分段目录
+            max_bytes: 单个分段的最大字节数（未压缩）
+            max_age: 单个分段的最长时间（秒）
+            compression: 'zstd' / 'gzip' / None，'auto' 时优先 zstd
+        """
+        if compression == 'auto':
+            compression = default_compression()
+        if compression == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd compression requires: pip install zstandard")
+        if compression not in ('zstd', 'gzip', None):
+            raise ValueError(f"Unknown compression: {compression}")
+
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = compression
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_path = None
+        self._segment_bytes = 0
+        self._segment_started = 0.0
+
+        # 序号按块预留并先写入状态文件，进程崩溃时最多跳过一段序号，不会重复
+        self._state_file = self.log_dir / STATE_FILENAME
+        self._next_seq = self._load_next_seq()
+        self._reserved_until = self._next_seq
+
+        # 上次未正常关闭的分段
+        for path in self.log_dir.glob('capture-*.jsonl'):
+            self._compress_segment(path)
+
+    def _load_next_seq(self) -> int:
+        if self._state_file.exists():
+            try:
+                with open(self._state_file, 'r', encoding='utf-8') as f:
+                    return int(json.load(f)['next_seq'])
+            except (OSError, ValueError, KeyError):
+                pass
+        # 状态文件丢失时从已有分段恢复
+        last = 0
+        for record in iter_capture_records(self.log_dir):
+            last = max(last, record.get('seq', 0))
+        return last + 1
+
+    def _reserve(self, block: int = SEQ_RESERVE_BLOCK):
+        self._reserved_until = self._next_seq + block
+        tmp_file = self._state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'next_seq': self._reserved_until}, f)
+        tmp_file.replace(self._state_file)
+
+    def _open_segment(self):
+        name = f"capture-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{self._next_seq:012d}.jsonl"
+        self._segment_path = self.log_dir / name
+        self._file = open(self._segment_path, 'a', encoding='utf-8')
+        self._segment_bytes = 0
+        self._segment_started = time.monotonic()
+
+    def _compress_segment(self, path: Path):
+        if self.compression is None:
+            return
+        data = path.read_bytes()
+        if self.compression == 'zstd':
+            target = path.with_name(path.name + '.zst')
+            target.write_bytes(zstandard.ZstdCompressor(level=10).compress(data))
+        else:
+            target = path.with_name(path.name + '.gz')
+            with gzip.open(target, 'wb', compresslevel=6) as f:
+                f.write(data)
+        path.unlink()
+
+    def _rotate(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._compress_segment(self._segment_path)
+
+    def write(self, record: Dict) -> int:
+        """追加一条记录，返回分配的序号"""
+        with self._lock:
+            if self._file is not None and (
+                    self._segment_bytes >= self.max_bytes or
+                    time.monotonic() - self._segment_started >= self.max_age):
+                self._rotate()
+            if self._next_seq >= self._reserved_until:
+                self._reserve()
+            if self._file is None:
+                self._open_segment()
+
+            seq = self._next_seq
+            self._next_seq += 1
+            line = json.dumps(dict(seq=seq, **record), ensure_ascii=False, separators=(',', ':')) + '\n'
+            self._file.write(line)
+            self._file.flush()
+            self._segment_bytes += len(line.encode('utf-8'))
+            return seq
+
+    def close(self):
+        """关闭并压缩当前分段（正常关闭时归还未用完的预留序号）"""
+        with self._lock:
+            self._rotate()
+            self._reserve(block=0)
+
+
+def _segment_first_seq(path: Path) -> int:
+    return int(SEGMENT_PATTERN.match(path.name).group(1))
+
+
+def list_segments(log_dir) -> List[Path]:
+    """按起始序号排序的分段文件"""
+    log_dir = Path(log_dir)
+    if not log_dir.exists():
+        return []
+    segments = [p for p in log_dir.iterdir() if SEGMENT_PATTERN.match(p.name)]
+    return sorted(segments, key=_segment_first_seq)
+
+
+def _open_segment_text(path: Path):
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.suffix == '.zst':
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path.name} requires: pip install zstandard")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_capture_records(log_dir,
+                         start_seq: int = 0,
+                         kinds: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """
+    按序号顺序遍历全部分段中的记录
+
+    Args:
+        log_dir: 分段目录
+        start_seq: 只返回 seq >= start_seq 的记录
+        kinds: 只返回指定 kind 的记录（例如 {'request', 'response'}）
+    """
+    kinds = set(kinds) if kinds else None
+    segments = list_segments(log_dir)
+
+    for index, path in enumerate(segments):
+        # 下一个分段的起始序号 <= start_seq 时，整个分段都可以跳过
+        if index + 1 < len(segments) and _segment_first_seq(segments[index + 1]) <= start_seq:
+            continue
+
+        with _open_segment_text(path) as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # 当前分段末尾未写完的行
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('seq', 0) < start_seq:
+                    continue
+                if kinds is not None and record.get('kind') not in kinds:
+                    continue
+                yield record
+
+
+def main():
+    """查看抓包日志"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看 JSONL 抓包日志')
+    parser.add_argument('--log-dir', default='./debug_logs/capture', help='分段目录')
+    parser.add_argument('--start-seq', type=int, default=0, help='起始序号')
+    parser.add_argument('--kind', action='append', help='只显示指定类型（request/response）')
+    parser.add_argument('--tail', type=int, default=20, help='显示最后 N 条')
+    args = parser.parse_args()
+
+    segments = list_segments(args.log_dir)
+    total = 0
+    last = []
+    for record in iter_capture_records(args.log_dir, args.start_seq, args.kind):
+        total += 1
+        last.append(record)
+        if len(last) > args.tail:
+            last.pop(0)
+
+    print("=" * 70)
+    print("📜 抓包日志")
+    print("=" * 70)
+    print(f"📁 目录: {args.log_dir}")
+    print(f"📦 分段: {len(segments)}  记录: {total}")
+    print()
+    for record in last:
+        print(f"#{record['seq']:>8} {record.get('timestamp', '')} {record.get('kind', ''):<8} "
+              f"{record.get('status_code', record.get('method', ''))} {record.get('url', '')}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 启用抓包日志模式
+DEBUG_CAPTURE_LOG=1 mitmdump -s debug_collector.py
+
+# 查看最近的记录
+python3 capture_log.py --tail 50
+
+# 读取记录
+from capture_log import iter_capture_records
+
+for record in iter_capture_records('./debug_logs/capture', kinds={'response'}):
+    print(record['seq'], record['url'], record.get('body_sha256'))
+"""
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+分级字表加载器（《通用规范汉字表》一级 / 二级 / 三级）
+
+字表文件放在 char_tiers/ 目录:
+    char_tiers/
+        tier1.txt       # 一级字表 3500 字
+        tier2.txt       # 二级字表 3000 字
+        tier3.txt       # 三级字表 1605 字
+        .tiers.bin      # 二进制缓存（自动生成）
+
+- 文件格式不限：每行一个字、带序号（"0001 一"）或整段文字均可，只提取 CJK 汉字，# 开头的行为注释
+- 每级去重并保持原顺序；已出现在较低级别的字不会重复计入
+- 没有 tier1.txt 时使用 common_3500_chars.txt 作为一级字表（实际字数以文件内容为准）
+- 解析结果缓存为二进制码位数组（总是写在字表目录下，目录不存在时自动创建），
+  源文件（大小 / 修改时间）不变时直接读取缓存
+"""
+
+import hashlib
+import re
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+TIER_COUNT = 3
+DEFAULT_TIER_DIR = Path(__file__).resolve().parent / "char_tiers"
+FALLBACK_TIER1_FILE = Path(__file__).resolve().parent / "common_3500_chars.txt"
+CACHE_FILENAME = ".tiers.bin"
+
+# 标准字表的字数（用于提示字表是否完整）
+EXPECTED_COUNTS = {1: 3500, 2: 3000, 3: 1605}
+
+# 基本区、扩展 A、兼容区、扩展 B 及以后（三级字表包含少量扩展区的字）
+CJK_RE = re.compile('[㐀-䶿一-鿿豈-﫿\U00020000-\U0003134f]')
+
+CACHE_MAGIC = b"CTR1"
+CACHE_HEADER = struct.Struct("<4s16s" + "I" * TIER_COUNT)
+
+
+def tier_sources(tier_dir=None) -> Dict[int, Path]:
+    """{级别: 字表文件}，只包含存在的文件"""
+    tier_dir = Path(tier_dir) if tier_dir else DEFAULT_TIER_DIR
+    sources = {}
+    for tier in range(1, TIER_COUNT + 1):
+        path = tier_dir / f"tier{tier}.txt"
+        if path.exists():
+            sources[tier] = path
+    if 1 not in sources and FALLBACK_TIER1_FILE.exists():
+        sources[1] = FALLBACK_TIER1_FILE
+    return dict(sorted(sources.items()))
+
+
+def parse_tier_file(path) -> List[str]:
+    """提取文件中的汉字（保持顺序，未去重）"""
+    chars = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            if line.lstrip().startswith('#'):
+                continue
+            chars.extend(CJK_RE.findall(line))
+    return chars
+
+
+def _fingerprint(sources: Dict[int, Path]) -> bytes:
+    parts = []
+    for tier, path in sources.items():
+        stat = path.stat()
+        parts.append(f"{tier}:{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.md5("|".join(parts).encode('utf-8')).digest()
+
+
+def _read_cache(cache_file: Path, fingerprint: bytes) -> Optional[List[str]]:
+    try:
+        data = cache_file.read_bytes()
+    except OSError:
+        return None
+    if len(data) < CACHE_HEADER.size:
+        return None
+
+    magic, cached_fingerprint, *counts = CACHE_HEADER.unpack_from(data, 0)
+    if magic != CACHE_MAGIC or cached_fingerprint != fingerprint:
+        return None
+    if len(data) != CACHE_HEADER.size + sum(counts) * 4:
+        return None
+
+    codepoints = array('I', data[CACHE_HEADER.size:])
+    if sys.byteorder == 'big':
+        codepoints.byteswap()
+
+    tiers, offset = [], 0
+    for count in counts:
+        tiers.append(''.join(map(chr, codepoints[offset:offset + count])))
+        offset += count
+    return tiers
+
+
+def _write_cache(cache_file: Path, fingerprint: bytes, tiers: List[str]):
+    codepoints = array('I', (ord(c) for tier in tiers for c in tier))
+    if sys.byteorder == 'big':
+        codepoints.byteswap()
+    tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_file, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, fingerprint, *(len(t) for t in tiers)))
+            f.write(codepoints.tobytes())
+        tmp_file.replace(cache_file)
+    except OSError:
+        pass  # 目录只读时不缓存
+
+
+class CharTiers:
+    """分级字表（每级去重、保持顺序）"""
+
+    def __init__(self, tiers: List[str], sources: Optional[Dict[int, Path]] = None):
+        """
+        Args:
+            tiers: 各级字表（字符串，下标 0 为一级）
+            sources: {级别: 字表文件}
+        """
+        self.tiers = list(tiers) + [''] * (TIER_COUNT - len(tiers))
+        self.sources = sources or {}
+        self._tier_of = {}
+        for level, chars in enumerate(self.tiers, 1):
+            for char in chars:
+                self._tier_of[char] = level
+
+    @classmethod
+    def from_lists(cls, lists: List[List[str]], sources: Optional[Dict[int, Path]] = None) -> "CharTiers":
+        """各级原始字符列表 -> 去重后的分级字表（已出现在较低级别的字跳过）"""
+        seen = set()
+        tiers = []
+        for chars in lists:
+            unique = []
+            for char in chars:
+                if char not in seen:
+                    seen.add(char)
+                    unique.append(char)
+            tiers.append(''.join(unique))
+        return cls(tiers, sources)
+
+    def chars(self, max_tier: int = 1) -> List[str]:
+        """一级到 max_tier 级的全部汉字（按级别、字表顺序）"""
+        return list(''.join(self.tiers[:max_tier]))
+
+    def tier(self, level: int) -> List[str]:
+        return list(self.tiers[level - 1])
+
+    def tier_of(self, char: str) -> int:
+        """汉字所在的级别，不在字表中返回 0"""
+        return self._tier_of.get(char, 0)
+
+    def __contains__(self, char: str) -> bool:
+        return char in self._tier_of
+
+    def __len__(self) -> int:
+        return len(self._tier_of)
+
+    def counts(self) -> Dict[int, int]:
+        return {level: len(chars) for level, chars in enumerate(self.tiers, 1)}
+
+    def missing_counts(self) -> Dict[int, int]:
+        """与标准字表相比缺少的字数（字表文件不完整时 > 0）"""
+        return {level: max(0, EXPECTED_COUNTS[level] - count) for level, count in self.counts().items()}
+
+
+def load_char_tiers(tier_dir=None, use_cache: bool = True) -> CharTiers:
+    """
+    加载分级字表
+
+    Args:
+        tier_dir: 字表目录，默认 data-collection/char_tiers/
+        use_cache: 使用 / 生成二进制缓存
+
+    Returns:
+        CharTiers
+    """
+    sources = tier_sources(tier_dir)
+    if not sources:
+        return CharTiers([])
+
+    # 使用 common_3500_chars.txt 兜底时缓存也放在字表目录，不写到源码目录
+    fingerprint = _fingerprint(sources)
+    cache_file = (Path(tier_dir) if tier_dir else DEFAULT_TIER_DIR) / CACHE_FILENAME
+    if use_cache:
+        tiers = _read_cache(cache_file, fingerprint)
+        if tiers is not None:
+            return CharTiers(tiers, sources)
+
+    lists = [parse_tier_file(sources[level]) if level in sources else [] for level in range(1, TIER_COUNT + 1)]
+    char_tiers = CharTiers.from_lists(lists, sources)
+    if use_cache:
+        _write_cache(cache_file, fingerprint, char_tiers.tiers)
+    return char_tiers
+
+
+@lru_cache(maxsize=8)
+def _cached_tiers(tier_dir: Optional[str]) -> CharTiers:
+    return load_char_tiers(tier_dir)
+
+
+def common_chars(max_tier: int = 1, tier_dir=None) -> List[str]:
+    """一级到 max_tier 级的常用字列表（同一进程内只加载一次）"""
+    return _cached_tiers(str(tier_dir) if tier_dir else None).chars(max_tier)
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='分级字表（通用规范汉字表）')
+    parser.add_argument('--tier-dir', help='字表目录（默认 ./char_tiers，缺少一级字表时用 common_3500_chars.txt）')
+    parser.add_argument('--export', type=int, metavar='N', help='输出一级到 N 级的全部汉字（每行一个）')
+    parser.add_argument('--check', help='查询汉字所在级别')
+    args = parser.parse_args()
+
+    if args.export:
+        for char in load_char_tiers(args.tier_dir).chars(args.export):
+            print(char)
+        return
+
+    started = time.perf_counter()
+    parsed = load_char_tiers(args.tier_dir, use_cache=False)
+    parse_ms = (time.perf_counter() - started) * 1000
+    load_char_tiers(args.tier_dir)  # 生成缓存
+    started = time.perf_counter()
+    tiers = load_char_tiers(args.tier_dir)
+    cache_ms = (time.perf_counter() - started) * 1000
+
+    if args.check:
+        for char in args.check:
+            level = tiers.tier_of(char)
+            print(f"{char}: {f'{level} 级' if level else '不在字表中'}")
+        return
+
+    print("=" * 70)
+    print("📚 分级字表")
+    print("=" * 70)
+    for level, count in tiers.counts().items():
+        source = tiers.sources.get(level)
+        missing = tiers.missing_counts()[level]
+        note = f"（缺少 {missing} 字）" if missing else ""
+        print(f"   {level} 级: {count:>5} 字 / 标准 {EXPECTED_COUNTS[level]}{note}  {source or '-'}")
+    print(f"   合计: {len(tiers)} 字")
+    if parsed.tiers != tiers.tiers:
+        print("⚠️  缓存与解析结果不一致")
+    print(f"⏱️  解析文本 {parse_ms:.2f} ms，读取缓存 {cache_ms:.2f} ms")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 把《通用规范汉字表》各级字表放到 char_tiers/tier1.txt ~ tier3.txt
+python3 char_tiers.py                 # 各级字数统计
+python3 char_tiers.py --check 水龘     # 查询级别
+python3 char_tiers.py --export 2 > chars_6500.txt
+
+# 在代码中使用
+from char_tiers import common_chars, load_char_tiers
+
+chars = common_chars()                # 一级字表（去重、保持顺序）
+chars = common_chars(max_tier=3)      # 全部 8105 字
+tiers = load_char_tiers()
+tiers.tier_of('水')                    # -> 1
+"""
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+内容寻址存储
+按 sha256 保存二进制内容（图片响应等），相同内容只存一份
+
+目录结构:
+    objects/ab/cd/abcd1234...（完整 sha256）
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+class ContentStore:
+    """sha256 内容寻址存储"""
+
+    def __init__(self, root, create: bool = True):
+        """
+        Args:
+            root: 存储根目录
+            create: 是否立即创建根目录；只读使用时传 False（put 时仍会按需创建）
+        """
+        self.root = Path(root)
+        if create:
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def put(self, data: bytes) -> str:
+        """保存内容，返回 sha256；已存在时不重复写入"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if path.exists():
+            return digest
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{digest}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        path = self.path_for(digest)
+        if not path.exists():
+            return None
+        return path.read_bytes()
+
+    def __contains__(self, digest: str) -> bool:
+        return self.path_for(digest).exists()
+
+    def __iter__(self) -> Iterator[str]:
+        for path in self.root.glob('*/*/*'):
+            if not path.name.endswith('.tmp'):
+                yield path.name
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+训练数据集导出（WebDataset 格式的分片 tar 包）
+把字形目录中的全部变体打包成固定大小的 tar 分片，训练时顺序读取少量大文件，而不是打开上百万个小 PNG
+
+分片结构:
+    dataset/
+        glyphs-000000.tar
+            06c34-59-2jsr.png       # 图片原始字节
+            06c34-59-2jsr.json      # 标签
+            ...
+        glyphs-000001.tar
+        classes.json                # 汉字 -> 类别编号（按码位排序）
+        dataset_index.json          # 分片列表、样本数、导出参数
+
+- 样本顺序先按种子打乱（只打乱索引，不读取文件），再边读边写入当前分片，不在磁盘上暂存
+- 图片读取用线程池预取（有界窗口），与 tar 写入重叠
+- 分片先写 .tmp 再改名，中断后不会留下不完整的分片
+- ShardReader 用后台线程预读后续分片，可选乱序缓冲区
+"""
+
+import io
+import json
+import os
+import queue
+import random
+import re
+import tarfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from glyph_catalog import GlyphCatalog, unicode_label
+
+
+SHARD_PATTERN = "glyphs-{:06d}.tar"
+INDEX_FILENAME = "dataset_index.json"
+CLASSES_FILENAME = "classes.json"
+
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024   # 每个分片最大字节数
+DEFAULT_SHARD_COUNT = 100000            # 每个分片最多样本数
+
+_KEY_UNSAFE_RE = re.compile(r'[^0-9A-Za-z_-]')
+
+
+def sample_key(char: str, variant_id: str) -> str:
+    """
+    样本 key（tar 成员名去掉扩展名）
+
+    WebDataset 按第一个 '.' 拆分 key 和扩展名，key 中只保留 ASCII 字母数字、'_' 和 '-'
+    """
+    return f"{ord(char):05x}-{_KEY_UNSAFE_RE.sub('_', variant_id)}"
+
+
+def _tar_member(name: str, data: bytes) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0  # 相同输入生成相同的分片
+    info.mode = 0o644
+    return info
+
+
+def _prefetch(fn, items: Iterable, workers: int, depth: int) -> Iterator:
+    """按顺序返回 fn(item)，后台最多提前处理 depth 个"""
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ============================================================================
+# 导出
+# ============================================================================
+
+class ShardWriter:
+    """按大小 / 数量滚动的 tar 分片写入器"""
+
+    def __init__(self, output_dir, shard_size: int = DEFAULT_SHARD_SIZE,
+                 shard_count: int = DEFAULT_SHARD_COUNT):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.shard_count = shard_count
+        self.shards: List[Dict] = []
+        self._tar = None
+        self._tmp_path = None
+
+    def _open(self):
+        name = SHARD_PATTERN.format(len(self.shards))
+        self._tmp_path = self.output_dir / (name + '.tmp')
+        self._tar = tarfile.open(self._tmp_path, 'w', format=tarfile.USTAR_FORMAT)
+        self.shards.append({'name': name, 'samples': 0, 'bytes': 0})
+
+    def _close(self):
+        if self._tar is None:
+            return
+        self._tar.close()
+        shard = self.shards[-1]
+        path = self.output_dir / shard['name']
+        os.replace(self._tmp_path, path)
+        shard['bytes'] = path.stat().st_size
+        self._tar = None
+
+    def write(self, key: str, files: Dict[str, bytes]):
+        """写入一个样本 {扩展名: 数据}；同一样本的文件总在同一个分片中"""
+        size = sum(len(data) + 1024 for data in files.values())  # 每个成员约 512 字节头 + 填充
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or self._tar is None or shard['samples'] >= self.shard_count or \
+                (shard['samples'] and self._tar.fileobj.tell() + size > self.shard_size):
+            self._close()
+            self._open()
+            shard = self.shards[-1]
+
+        for ext, data in files.items():
+            self._tar.addfile(_tar_member(f"{key}.{ext}", data), io.BytesIO(data))
+        shard['samples'] += 1
+
+    def close(self):
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DatasetExporter:
+    """字形目录 -> WebDataset 分片"""
+
+    def __init__(self,
+                 data_dir: str = "./collected_characters",
+                 output_dir: str = "./dataset",
+                 shard_size: int = DEFAULT_SHARD_SIZE,
+                 shard_count: int = DEFAULT_SHARD_COUNT,
+                 seed: Optional[int] = 0,
+                 workers: int = 8):
+        """
+        Args:
+            data_dir: 数据目录（collected_characters）
+            output_dir: 输出目录
+            shard_size: 每个分片最大字节数
+            shard_count: 每个分片最多样本数
+            seed: 打乱顺序的随机种子，None 表示按目录顺序
+            workers: 读取图片的线程数
+        """
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir)
+        self.shard_size = shard_size
+        self.shard_count = shard_count
+        self.seed = seed
+        self.workers = workers
+        self.catalog = GlyphCatalog(self.data_dir)
+
+    def samples(self) -> List[Dict]:
+        """全部可用样本（文件存在的变体）"""
+        samples = []
+        for char, variant_id, variant in self.catalog.iter_variants():
+            if not variant.get('filename') or not self.catalog.path_for(variant).exists():
+                continue
+            samples.append({'char': char, 'variant_id': variant_id, 'variant': variant})
+        return samples
+
+    def _load(self, sample: Dict) -> Dict:
+        with open(self.catalog.path_for(sample['variant']), 'rb') as f:
+            return dict(sample, data=f.read())
+
+    @staticmethod
+    def _label(sample: Dict, classes: Dict[str, int], tiers) -> Dict:
+        char, variant = sample['char'], sample['variant']
+        label = {
+            'char': char,
+            'unicode': unicode_label(char),
+            'label': classes[char],
+            'variant_id': sample['variant_id'],
+            'font_id': variant.get('font_id'),
+            'source': variant.get('source'),
+            'sha256': variant.get('sha256'),
+        }
+        if tiers is not None:
+            label['tier'] = tiers.tier_of(char)
+        for field in ('font_family', 'width', 'height'):
+            if variant.get(field) is not None:
+                label[field] = variant[field]
+        return label
+
+    def run(self) -> Dict:
+        samples = self.samples()
+        if self.seed is not None:
+            random.Random(self.seed).shuffle(samples)
+
+        classes = {char: i for i, char in enumerate(sorted({s['char'] for s in samples}))}
+        try:
+            from char_tiers import load_char_tiers
+            tiers = load_char_tiers()
+        except ImportError:
+            tiers = None
+
+        print("=" * 70)
+        print("📦 导出训练数据集（WebDataset 分片）")
+        print("=" * 70)
+        print(f"📁 数据目录: {self.data_dir}")
+        print(f"💾 输出目录: {self.output_dir}")
+        print(f"📊 样本: {len(samples)}  类别: {len(classes)}  "
+              f"分片上限: {self.shard_size / 1024 / 1024:.0f} MB / {self.shard_count} 个样本")
+        print(f"🔀 打乱: {'种子 ' + str(self.seed) if self.seed is not None else '否'}")
+        print()
+
+        # 旧分片会被新的编号覆盖，多出来的删掉
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.output_dir.glob("glyphs-*.tar*"):
+            stale.unlink()
+
+        started = time.perf_counter()
+        image_bytes = 0
+        with ShardWriter(self.output_dir, self.shard_size, self.shard_count) as writer:
+            for i, sample in enumerate(_prefetch(self._load, samples, self.workers, self.workers * 8), 1):
+                label = self._label(sample, classes, tiers)
+                writer.write(sample_key(sample['char'], sample['variant_id']), {
+                    'png': sample['data'],
+                    'json': json.dumps(label, ensure_ascii=False).encode('utf-8'),
+                })
+                image_bytes += len(sample['data'])
+                if i % 10000 == 0:
+                    print(f"  进度: {i}/{len(samples)}  分片: {len(writer.shards)}")
+        elapsed = time.perf_counter() - started
+
+        with open(self.output_dir / CLASSES_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(classes, f, ensure_ascii=False)
+
+        index = {
+            'format': 'webdataset',
+            'created_at': datetime.now().isoformat(),
+            'data_dir': str(self.data_dir),
+            'samples': len(samples),
+            'classes': len(classes),
+            'seed': self.seed,
+            'shard_size': self.shard_size,
+            'shard_count': self.shard_count,
+            'shards': writer.shards,
+        }
+        with open(self.output_dir / INDEX_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+
+        total = sum(s['bytes'] for s in writer.shards)
+        print()
+        print("=" * 70)
+        print("🎉 导出完成！")
+        print("=" * 70)
+        print(f"   样本: {len(samples)}  分片: {len(writer.shards)}  "
+              f"大小: {total / 1024 / 1024:.1f} MB（图片 {image_bytes / 1024 / 1024:.1f} MB）")
+        print(f"   用时: {elapsed:.2f}s ({len(samples) / elapsed if elapsed else 0:.0f} 样本/秒)")
+        print(f"   索引文件: {self.output_dir / INDEX_FILENAME}")
+        print("=" * 70)
+        return index
+
+
+# ============================================================================
+# 读取
+# ============================================================================
+
+def list_shards(dataset_dir) -> List[Path]:
+    """数据集目录中的分片（优先使用索引文件中的顺序）"""
+    dataset_dir = Path(dataset_dir)
+    index_file = dataset_dir / INDEX_FILENAME
+    if index_file.exists():
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return [dataset_dir / s['name'] for s in json.load(f)['shards']]
+    return sorted(dataset_dir.glob("glyphs-*.tar"))
+
+
+def _iter_members_fast(path) -> Iterator:
+    """
+    直接解析 USTAR 头（ShardWriter 写出的分片只有普通文件），整个分片一次读入内存
+
+    遇到 PAX / GNU 长文件名等扩展头时抛出 ValueError，由调用方改用 tarfile
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    view = memoryview(data)
+    offset = 0
+    while offset + 512 <= len(data):
+        header = data[offset:offset + 512]
+        if header[:1] == b'\0':
+            break  # 结尾的空块
+        name = header[:100].split(b'\0', 1)[0]
+        prefix = header[345:500].split(b'\0', 1)[0] if header[257:262] == b'ustar' else b''
+        size = int(header[124:136].split(b'\0', 1)[0].strip() or b'0', 8)
+        typeflag = header[156:157]
+        offset += 512
+        if typeflag in (b'0', b'\0'):
+            full_name = (prefix + b'/' + name if prefix else name).decode('utf-8')
+            yield full_name, view[offset:offset + size]
+        elif typeflag not in (b'5',):
+            raise ValueError(f"unsupported tar member type {typeflag!r}")
+        offset += (size + 511) // 512 * 512
+
+
+def _iter_members_tarfile(path) -> Iterator:
+    with tarfile.open(path, 'r|') as tar:  # 流式读取，不需要随机访问
+        for member in tar:
+            if member.isfile():
+                yield member.name, tar.extractfile(member).read()
+
+
+def iter_shard(path) -> Iterator[Dict]:
+    """
+    顺序读取一个分片，按 key 合并同一样本的成员
+
+    Returns:
+        {'__key__': key, 'png': bytes, 'json': bytes, ...}
+    """
+    try:
+        members = list(_iter_members_fast(path))
+    except ValueError:
+        members = _iter_members_tarfile(path)  # 其他工具生成的 tar（PAX 头等）
+
+    sample = None
+    for name, data in members:
+        key, _, ext = name.rpartition('/')[2].partition('.')
+        if sample is None or sample['__key__'] != key:
+            if sample is not None:
+                yield sample
+            sample = {'__key__': key}
+        sample[ext] = bytes(data)
+    if sample is not None:
+        yield sample
+
+
+_END = object()
+READ_BATCH = 256  # 队列中每次传递的样本数（减少线程间同步）
+
+
+class ShardReader:
+    """
+    多分片读取器（后台线程预读）
+
+    每个分片由一个线程顺序读取，样本按批放入有界队列；训练循环消费当前分片时，后续分片已经在读取
+    """
+
+    def __init__(self,
+                 shards: Sequence,
+                 prefetch: int = 2,
+                 shuffle_buffer: int = 0,
+                 shuffle_shards: bool = False,
+                 seed: Optional[int] = None,
+                 decode: bool = True):
+        """
+        Args:
+            shards: 分片路径（或数据集目录）
+            prefetch: 同时读取的分片数
+            shuffle_buffer: 乱序缓冲区大小，0 表示按分片内顺序返回
+            shuffle_shards: 每次遍历前打乱分片顺序
+            seed: 随机种子
+            decode: 解析 json 标签（图片保持原始字节）
+        """
+        if isinstance(shards, (str, Path)) and Path(shards).is_dir():
+            shards = list_shards(shards)
+        self.shards = [Path(s) for s in shards]
+        self.prefetch = max(1, prefetch)
+        self.shuffle_buffer = shuffle_buffer
+        self.shuffle_shards = shuffle_shards
+        self.random = random.Random(seed)
+        self.decode = decode
+
+    def _read_shard(self, path: Path, out: queue.Queue):
+        batch = []
+        try:
+            for sample in iter_shard(path):
+                if self.decode and 'json' in sample:
+                    sample['json'] = json.loads(sample['json'])
+                batch.append(sample)
+                if len(batch) >= READ_BATCH:
+                    out.put(batch)
+                    batch = []
+            out.put(batch)
+        except Exception as e:
+            out.put(e)
+        out.put(_END)
+
+    def _ordered(self) -> Iterator[Dict]:
+        shards = list(self.shards)
+        if self.shuffle_shards:
+            self.random.shuffle(shards)
+
+        # 每个分片一个有界队列，按分片顺序消费
+        pending = deque()
+
+        def start(path):
+            out = queue.Queue(maxsize=16)
+            thread = threading.Thread(target=self._read_shard, args=(path, out), daemon=True)
+            thread.start()
+            pending.append(out)
+
+        remaining = iter(shards)
+        for path in remaining:
+            start(path)
+            if len(pending) >= self.prefetch:
+                break
+
+        while pending:
+            out = pending.popleft()
+            for path in remaining:
+                start(path)
+                break
+            while True:
+                item = out.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield from item
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.shuffle_buffer <= 0:
+            yield from self._ordered()
+            return
+
+        buffer = []
+        for sample in self._ordered():
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sample)
+                continue
+            i = self.random.randrange(len(buffer))
+            yield buffer[i]
+            buffer[i] = sample
+        self.random.shuffle(buffer)
+        yield from buffer
+
+
+def benchmark(data_dir: str, dataset_dir: str):
+    """逐个打开散装 PNG / 读取分片"""
+    catalog = GlyphCatalog(data_dir)
+    paths = [catalog.path_for(v) for _, _, v in catalog.iter_variants() if v.get('filename')]
+    paths = [p for p in paths if p.exists()]
+
+    print("=" * 70)
+    print("⏱️  数据集读取基准测试")
+    print("=" * 70)
+
+    started = time.perf_counter()
+    total = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            total += len(f.read())
+    loose = time.perf_counter() - started
+    print(f"   散装 PNG     {len(paths) / loose:>10.0f} 样本/秒  ({len(paths)} 个文件)")
+
+    started = time.perf_counter()
+    count = sum(1 for _ in ShardReader(dataset_dir, decode=False))  # 两边都只读取原始字节
+    sharded = time.perf_counter() - started
+    print(f"   tar 分片     {count / sharded:>10.0f} 样本/秒  ({len(list_shards(dataset_dir))} 个分片，"
+          f"{loose / sharded:.1f}x)")
+    print("=" * 70)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='导出 WebDataset 格式的训练数据集')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--output', '-o', default='./dataset', help='输出目录')
+    parser.add_argument('--shard-size', type=float, default=DEFAULT_SHARD_SIZE / 1024 / 1024,
+                        help='每个分片最大 MB')
+    parser.add_argument('--shard-count', type=int, default=DEFAULT_SHARD_COUNT, help='每个分片最多样本数')
+    parser.add_argument('--seed', type=int, default=0, help='打乱顺序的随机种子')
+    parser.add_argument('--no-shuffle', action='store_true', help='不打乱，按目录顺序导出')
+    parser.add_argument('--workers', '-j', type=int, default=8, help='读取图片的线程数')
+    parser.add_argument('--inspect', action='store_true', help='读取已导出的数据集并统计')
+    parser.add_argument('--benchmark', action='store_true', help='对比散装 PNG 和分片的读取速度')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.data_dir, args.output)
+        return
+
+    if args.inspect:
+        shards = list_shards(args.output)
+        started = time.perf_counter()
+        samples = labels = 0
+        for sample in ShardReader(shards):
+            samples += 1
+            labels += 'json' in sample
+        elapsed = time.perf_counter() - started
+        print(f"📦 {len(shards)} 个分片，{samples} 个样本（{labels} 个带标签），"
+              f"{elapsed:.2f}s ({samples / elapsed if elapsed else 0:.0f} 样本/秒)")
+        return
+
+    exporter = DatasetExporter(args.data_dir, args.output, int(args.shard_size * 1024 * 1024),
+                               args.shard_count, None if args.no_shuffle else args.seed, args.workers)
+    exporter.run()
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 导出（默认 64 MB 一个分片，种子 0 打乱）
+python3 dataset_export.py -o ./dataset
+
+# 小分片，便于多机分发
+python3 dataset_export.py -o ./dataset --shard-size 16
+
+# 统计 / 基准测试
+python3 dataset_export.py -o ./dataset --inspect
+python3 dataset_export.py -o ./dataset --benchmark
+
+# 训练时读取
+from dataset_export import ShardReader
+
+for sample in ShardReader('./dataset', prefetch=2, shuffle_buffer=5000, shuffle_shards=True):
+    image = Image.open(io.BytesIO(sample['png']))
+    label = sample['json']['label']
+
+# 也可以直接用 webdataset 库
+import webdataset as wds
+dataset = wds.WebDataset('dataset/glyphs-{000000..000009}.tar').decode('pil').to_tuple('png', 'json')
+"""
@@ -2,14 +2,20 @@
 """
 Debug 调试采集器 - 记录所有请求详情
 用于分析 CloudBrush API 的数据格式
+
+设置 DEBUG_CAPTURE_LOG=1 时使用抓包日志模式: 记录追加到轮转的 JSONL 分段（capture_log.py），
+图片内容存入 debug_logs/objects/（content_store.py），不再生成大量小文件
 """
 
 import json
+import os
 from pathlib import Path
 from mitmproxy import http
 from datetime import datetime
 import base64
 
+from flow_utils import FlowFilter
+
 class DebugCollector:
     """调试采集器 - 记录所有请求和响应详情"""
 
@@ -17,17 +23,34 @@ class DebugCollector:
         self.output_dir = Path("./debug_logs")
         self.output_dir.mkdir(exist_ok=True)
         self.request_count = 0
+        self.flow_filter = FlowFilter()
+
+        self.capture_log = None
+        self.content_store = None
+        if os.environ.get('DEBUG_CAPTURE_LOG') == '1':
+            from capture_log import CaptureLogWriter
+            from content_store import ContentStore
+
+            self.capture_log = CaptureLogWriter(
+                self.output_dir / "capture",
+                max_bytes=int(os.environ.get('DEBUG_CAPTURE_MAX_MB', '64')) * 1024 * 1024,
+                max_age=float(os.environ.get('DEBUG_CAPTURE_MAX_AGE', '3600'))
+            )
+            self.content_store = ContentStore(self.output_dir / "objects")
 
         print("=" * 70)
         print("🔍 Debug 调试模式启动")
         print("=" * 70)
         print(f"📁 日志目录: {self.output_dir}")
+        if self.capture_log:
+            print(f"📜 抓包日志模式: {self.capture_log.log_dir} "
+                  f"(压缩: {self.capture_log.compression or '无'})")
         print("🎯 将记录所有 sfapi.fanglige.com 的请求")
         print("=" * 70)
 
     def request(self, flow: http.HTTPFlow) -> None:
         """记录所有请求"""
-        if "sfapi.fanglige.com" not in flow.request.host:
+        if not self.flow_filter.match(flow):
             return
 
         self.request_count += 1
@@ -70,19 +93,24 @@ class DebugCollector:
             request_info["decoded_params"] = decoded_params
 
         # 保存请求日志
-        log_file = self.output_dir / f"request_{timestamp}_{self.request_count:03d}.json"
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(request_info, f, indent=2, ensure_ascii=False)
+        if self.capture_log:
+            seq = self.capture_log.write(dict(kind='request', flow_id=flow.id, **request_info))
+            log_name = f"capture #{seq}"
+        else:
+            log_file = self.output_dir / f"request_{timestamp}_{self.request_count:03d}.json"
+            with open(log_file, 'w', encoding='utf-8') as f:
+                json.dump(request_info, f, indent=2, ensure_ascii=False)
+            log_name = log_file.name
 
         print(f"\n📥 请求 #{self.request_count}: {flow.request.method} {flow.request.path}")
         print(f"   URL: {flow.request.pretty_url}")
         if decoded_params:
             print(f"   🔓 解码参数: {decoded_params}")
-        print(f"   💾 日志: {log_file.name}")
+        print(f"   💾 日志: {log_name}")
 
     def response(self, flow: http.HTTPFlow) -> None:
         """记录所有响应"""
-        if "sfapi.fanglige.com" not in flow.request.host:
+        if not self.flow_filter.match(flow, count=False):
             return
 
         timestamp = datetime.now().strftime("%H%M%S")
@@ -98,7 +126,13 @@ class DebugCollector:
         }
 
         # 处理不同类型的响应
-        if "image" in content_type:
+        if "image" in content_type and self.content_store:
+            # 图片内容按 sha256 存储，记录中只保存摘要
+            digest = self.content_store.put(flow.response.content)
+            response_info["body_sha256"] = digest
+            print(f"📷 图片响应: {len(flow.response.content)} bytes -> objects/{digest[:12]}")
+
+        elif "image" in content_type:
             # 保存图片
             ext = content_type.split('/')[-1].split(';')[0]
             img_file = self.output_dir / f"image_{timestamp}_{self.request_count:03d}.{ext}"
@@ -144,12 +178,23 @@ class DebugCollector:
             response_info["body_preview"] = flow.response.content[:200].decode('utf-8', errors='ignore')
 
         # 保存响应日志
+        if self.capture_log:
+            seq = self.capture_log.write(dict(kind='response', flow_id=flow.id, **response_info))
+            print(f"   💾 响应日志: capture #{seq}")
+            return
+
         log_file = self.output_dir / f"response_{timestamp}_{self.request_count:03d}.json"
         with open(log_file, 'w', encoding='utf-8') as f:
             json.dump(response_info, f, indent=2, ensure_ascii=False)
 
         print(f"   💾 响应日志: {log_file.name}")
 
+    def done(self):
+        """mitmproxy 退出时关闭并压缩当前分段"""
+        print(f"🚦 流量: {self.flow_filter.summary()}")
+        if self.capture_log:
+            self.capture_log.close()
+
 
 # mitmproxy addon 注册
 addons = [DebugCollector()]
@@ -162,4 +207,13 @@ mitmweb -s debug_collector.py -p 8080
 
 这会记录所有 CloudBrush API 的详细信息到 debug_logs/ 目录
 查看日志就能知道 API 的实际数据格式
+
+# 抓包日志模式（JSONL 分段 + 内容寻址图片存储）
+DEBUG_CAPTURE_LOG=1 mitmweb -s debug_collector.py -p 8080
+
+# 可选: 分段大小（MB）和时长（秒）
+DEBUG_CAPTURE_LOG=1 DEBUG_CAPTURE_MAX_MB=16 DEBUG_CAPTURE_MAX_AGE=600 mitmdump -s debug_collector.py
+
+# 查看记录
+python3 capture_log.py --tail 50
 """
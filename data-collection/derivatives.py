@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+衍生格式生成
+为每个字形变体生成 WebP（以及 AVIF，如果 Pillow 支持）和多种尺寸的缩略图
+
+本地路径与 R2 key 一一对应（key = "chars/" + 相对路径）:
+    collected_characters/6c34_水/59-2jsr/full.webp   ->  chars/6c34_水/59-2jsr/full.webp
+    collected_characters/6c34_水/59-2jsr/w64.avif    ->  chars/6c34_水/59-2jsr/w64.avif
+
+生成结果记录在 glyph_catalog.json 的变体 'derivatives' 字段中，
+并随 char_url_mapping.json 导出，Worker 据此返回最小的可用格式
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tqdm import tqdm
+
+from glyph_catalog import GlyphCatalog, char_dir_name
+
+
+R2_KEY_PREFIX = "chars/"
+DEFAULT_SIZES = (32, 64, 128)
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+}
+
+# 各格式的编码参数：原尺寸 WebP 使用无损，缩略图使用有损以换取体积
+ENCODE_PARAMS = {
+    ('webp', 'full'): {'lossless': True, 'method': 6},
+    ('webp', 'thumb'): {'quality': 85, 'method': 6},
+    ('avif', 'full'): {'quality': 90, 'speed': 4},
+    ('avif', 'thumb'): {'quality': 75, 'speed': 4},
+}
+
+
+@lru_cache(maxsize=None)
+def avif_supported() -> bool:
+    """
+    当前进程能否编码 AVIF（必要时导入 pillow_avif 插件注册编码器）
+
+    插件注册只在导入它的进程中生效；spawn / forkserver 启动的工作进程（macOS 默认）
+    不会继承父进程的导入，因此工作进程也要调用一次
+    """
+    from PIL import features
+
+    try:
+        if features.check('avif'):
+            return True
+    except ValueError:
+        pass
+    try:
+        import pillow_avif  # noqa: F401  (注册 AVIF 插件)
+        return True
+    except ImportError:
+        return False
+
+
+def available_formats() -> List[str]:
+    """当前 Pillow 支持的衍生格式"""
+    from PIL import features
+
+    formats = []
+    if features.check('webp'):
+        formats.append('webp')
+    if avif_supported():
+        formats.append('avif')
+
+    return formats
+
+
+def content_type_for(path) -> str:
+    return CONTENT_TYPES.get(Path(path).suffix.lstrip('.').lower(), 'application/octet-stream')
+
+
+def derivative_relpath(char: str, variant_id: str, label: str, fmt: str) -> str:
+    return f"{char_dir_name(char)}/{variant_id}/{label}.{fmt}"
+
+
+def generate_variant_derivatives(job: Tuple[str, str, str, str, Sequence[int], Sequence[str]]) -> Dict:
+    """
+    为单个变体生成全部衍生文件（在子进程中运行）
+
+    Args:
+        job: (数据目录, 字符, 变体ID, 源文件相对路径, 缩略图尺寸, 格式)
+
+    Returns:
+        {'char', 'variant_id', 'derivatives': [...], 'error'}
+    """
+    from PIL import Image
+
+    data_dir, char, variant_id, filename, sizes, formats = job
+    data_dir = Path(data_dir)
+    if 'avif' in formats and not avif_supported():
+        formats = [f for f in formats if f != 'avif']
+    result = {'char': char, 'variant_id': variant_id, 'derivatives': [], 'error': None}
+
+    try:
+        with Image.open(data_dir / filename) as img:
+            img.load()
+            source = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+
+        renditions = [('full', source)]
+        for size in sorted(set(sizes)):
+            if size >= max(source.size):
+                continue
+            thumb = source.copy()
+            thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+            renditions.append((f"w{size}", thumb))
+
+        for label, image in renditions:
+            kind = 'full' if label == 'full' else 'thumb'
+            for fmt in formats:
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt.upper(), **ENCODE_PARAMS[(fmt, kind)])
+                data = buffer.getvalue()
+
+                relpath = derivative_relpath(char, variant_id, label, fmt)
+                out_path = data_dir / relpath
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(out_path, 'wb') as f:
+                    f.write(data)
+
+                result['derivatives'].append({
+                    'format': fmt,
+                    'label': label,
+                    'width': image.size[0],
+                    'height': image.size[1],
+                    'bytes': len(data),
+                    'filename': relpath,
+                    'key': R2_KEY_PREFIX + relpath
+                })
+
+    except Exception as e:
+        result['error'] = str(e)
+
+    return result
+
+
+class DerivativeGenerator:
+    """批量衍生格式生成器"""
+
+    def __init__(self,
+                 data_dir: str = "./collected_characters",
+                 sizes: Sequence[int] = DEFAULT_SIZES,
+                 formats: Optional[Sequence[str]] = None,
+                 workers: Optional[int] = None):
+        self.data_dir = Path(data_dir)
+        self.sizes = tuple(sizes)
+        supported = available_formats()
+        self.formats = [f for f in (formats or supported) if f in supported]
+        self.workers = workers or os.cpu_count() or 1
+        self.catalog = GlyphCatalog(self.data_dir)
+
+    def pending_jobs(self, force: bool = False) -> List[Tuple]:
+        """需要（重新）生成的变体：没有衍生文件，或源文件 sha256 变化"""
+        jobs = []
+        for char, variant_id, variant in self.catalog.iter_variants():
+            if not self.catalog.path_for(variant).exists():
+                continue
+            if not force and variant.get('derivatives') and \
+                    variant.get('derivatives_source') == variant.get('sha256'):
+                continue
+            jobs.append((str(self.data_dir), char, variant_id, variant['filename'],
+                         self.sizes, tuple(self.formats)))
+        return jobs
+
+    def run(self, force: bool = False) -> Dict:
+        jobs = self.pending_jobs(force)
+
+        print("=" * 70)
+        print("🖼️  衍生格式生成")
+        print("=" * 70)
+        print(f"📁 数据目录: {self.data_dir}")
+        print(f"🎨 格式: {', '.join(self.formats) or '(无可用格式)'}")
+        print(f"📐 缩略图: {', '.join(str(s) for s in self.sizes)}")
+        print(f"📊 待处理变体: {len(jobs)}  进程数: {self.workers}")
+        print()
+
+        stats = {'variants': len(jobs), 'files': 0, 'bytes': 0, 'errors': 0}
+        if not jobs or not self.formats:
+            return stats
+
+        chunksize = max(1, len(jobs) // (self.workers * 8))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for result in tqdm(executor.map(generate_variant_derivatives, jobs, chunksize=chunksize),
+                               total=len(jobs), desc="生成进度"):
+                if result['error']:
+                    stats['errors'] += 1
+                    print(f"\n❌ {result['char']} {result['variant_id']}: {result['error']}")
+                    continue
+
+                variant = self.catalog.get_variant(result['char'], result['variant_id'])
+                self.catalog.update_variant(
+                    result['char'], result['variant_id'],
+                    derivatives=result['derivatives'],
+                    derivatives_source=variant.get('sha256')
+                )
+                stats['files'] += len(result['derivatives'])
+                stats['bytes'] += sum(d['bytes'] for d in result['derivatives'])
+
+        self.catalog.save()
+
+        print()
+        print("=" * 70)
+        print("🎉 生成完成！")
+        print("=" * 70)
+        print(f"   变体: {stats['variants']}")
+        print(f"   衍生文件: {stats['files']} ({stats['bytes'] / 1024:.1f} KB)")
+        print(f"   失败: {stats['errors']}")
+        print("=" * 70)
+        return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成 WebP/AVIF 及缩略图')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='缩略图尺寸（逗号分隔）')
+    parser.add_argument('--formats', default=None, help='格式（逗号分隔，默认全部可用格式）')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--force', action='store_true', help='重新生成全部衍生文件')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    formats = [f.strip().lower() for f in args.formats.split(',')] if args.formats else None
+
+    generator = DerivativeGenerator(args.data_dir, sizes, formats, args.workers)
+    generator.run(force=args.force)
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 安装依赖（AVIF 需要 Pillow >= 11.3 或 pip install pillow-avif-plugin）
+pip install pillow tqdm
+
+# 生成全部衍生格式
+python3 derivatives.py
+
+# 只生成 WebP 缩略图
+python3 derivatives.py --formats webp --sizes 48,96
+
+生成后:
+=======
+- 衍生文件保存在 collected_characters/{unicode}_{汉字}/{变体ID}/ 下
+- 上传: cd ../handwriting-api-worker && python3 upload-data.py
+- Worker 搜索结果中的 derivatives 字段列出全部格式，image 字段为最小的可用格式
+"""
@@ -7,41 +7,46 @@ CloudBrush 汉字图片自动化采集器 (增强版)
 import json
 import os
 import time
-import base64
 from pathlib import Path
 from mitmproxy import http
 from datetime import datetime
 import hashlib
 
+from flow_utils import FlowFilter, QueryCorrelator, API_PATH, flow_cn_char, path_startswith
+from glyph_catalog import GlyphCatalog
+
 class EnhancedCharacterCollector:
     """增强版汉字采集器 - 支持自动化和手动模式"""
     
     def __init__(self):
         self.output_dir = Path("./collected_characters")
         self.output_dir.mkdir(exist_ok=True)
+        self.flow_filter = FlowFilter()
+        self.correlator = QueryCorrelator(ttl=float(os.environ.get('CORRELATION_TTL', '30')))
         
         # 加载常用汉字列表
         self.common_chars = self.load_common_chars()
         self.collected_chars = set()
         
-        # URL映射
-        self.char_urls = {}
-        self.mapping_file = self.output_dir / "char_url_mapping.json"
+        # 字形目录（多变体存储），同时导出旧版 char_url_mapping.json
+        self.catalog = GlyphCatalog(self.output_dir)
+        self.mapping_file = self.catalog.legacy_mapping_file
+        self.char_urls = self.catalog.to_legacy_mapping()
         
         # 统计信息
         self.stats = {
             'total_requests': 0,
             'images_saved': 0,
+            'images_attributed': 0,
+            'images_unknown': 0,
             'api_responses': 0,
             'start_time': datetime.now().isoformat()
         }
         
         # 加载已有数据
-        if self.mapping_file.exists():
-            with open(self.mapping_file, 'r', encoding='utf-8') as f:
-                self.char_urls = json.load(f)
-                self.collected_chars = set(self.char_urls.keys())
-                print(f"📂 已加载 {len(self.char_urls)} 个已采集字符")
+        if self.char_urls:
+            self.collected_chars = set(self.char_urls.keys())
+            print(f"📂 已加载 {len(self.char_urls)} 个已采集字符（{self.catalog.variant_count()} 个变体）")
     
     def load_common_chars(self):
         """加载常用汉字列表"""
@@ -60,25 +65,21 @@ class EnhancedCharacterCollector:
     
     def request(self, flow: http.HTTPFlow) -> None:
         """拦截请求"""
-        if "sfapi.fanglige.com" not in flow.request.host:
+        if not self.flow_filter.match(flow):
             return
         
         self.stats['total_requests'] += 1
         
-        # 记录查询的汉字
-        if '/class/action.php' in flow.request.path:
-            cn_char = flow.request.query.get('cnChar', '')
-            if cn_char:
-                try:
-                    char = base64.b64decode(cn_char).decode('utf-8', errors='ignore')
-                    if char and '\u4e00' <= char[0] <= '\u9fff':
-                        print(f"🔍 正在查询: '{char}'")
-                except:
-                    pass
+        # 记录查询的汉字（解码结果缓存在内存中，供 response 钩子使用）
+        if path_startswith(flow, API_PATH):
+            char = flow_cn_char(flow)
+            if char:
+                self.correlator.record(flow, char)
+                print(f"🔍 正在查询: '{char}'")
     
     def response(self, flow: http.HTTPFlow) -> None:
         """拦截响应"""
-        if "sfapi.fanglige.com" not in flow.request.host:
+        if not self.flow_filter.match(flow, count=False):
             return
         
         content_type = flow.response.headers.get("content-type", "")
@@ -95,46 +96,45 @@ class EnhancedCharacterCollector:
         """保存图片文件"""
         url = flow.request.pretty_url
         
-        # 尝试从多个来源提取汉字
-        char = self._extract_character(flow.request)
+        # 尝试从多个来源提取汉字；图片请求本身不带汉字时，归属到同一客户端最近的查询
+        char = self._extract_character(flow)
+        attributed = False
+        if not char:
+            char = self.correlator.attribute(flow)
+            attributed = char is not None
+        
+        self.stats['images_saved'] += 1
         
         if not char:
             # 如果无法提取，使用URL hash作为文件名
             url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
             filename = f"unknown_{url_hash}.png"
-        else:
-            # Unicode编码_汉字.png
-            unicode_hex = f"{ord(char):04x}"
-            filename = f"{unicode_hex}_{char}.png"
+            with open(self.output_dir / filename, 'wb') as f:
+                f.write(flow.response.content)
+            self.stats['images_unknown'] += 1
+            print(f"💾 保存未知图片: {filename}")
+            return
         
-        filepath = self.output_dir / filename
+        # 保存为字符的一个变体: {unicode}_{汉字}/{变体ID}.png
+        variant, is_new = self.catalog.add_variant(
+            char, flow.response.content, url=url,
+            source='proxy_correlated' if attributed else 'proxy'
+        )
+        if attributed:
+            self.stats['images_attributed'] += 1
         
-        # 保存图片
-        with open(filepath, 'wb') as f:
-            f.write(flow.response.content)
+        is_new_char = char not in self.collected_chars
+        self.char_urls[char] = self.catalog.legacy_entry(char)
+        self.collected_chars.add(char)
         
-        self.stats['images_saved'] += 1
+        marker = "🔗" if attributed else "✅"
+        print(f"{marker} [{self.stats['images_saved']}] 保存: '{char}' -> {variant['filename']} "
+              f"({len(flow.response.content)} bytes{'' if is_new else ', 已存在'})")
         
-        if char:
-            # 记录映射
-            self.char_urls[char] = {
-                "url": url,
-                "filename": filename,
-                "unicode": f"U+{ord(char):04X}",
-                "size": len(flow.response.content),
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            self.collected_chars.add(char)
-            
-            print(f"✅ [{self.stats['images_saved']}] 保存: '{char}' -> {filename} ({len(flow.response.content)} bytes)")
-            
-            # 定期保存
-            if len(self.char_urls) % 10 == 0:
-                self._save_mapping()
-                self._print_progress()
-        else:
-            print(f"💾 保存未知图片: {filename}")
+        # 定期保存
+        if is_new_char and len(self.char_urls) % 10 == 0:
+            self._save_mapping()
+            self._print_progress()
     
     def _process_api_response(self, flow: http.HTTPFlow):
         """处理API响应"""
@@ -179,29 +179,26 @@ class EnhancedCharacterCollector:
         
         find_urls(data)
     
-    def _extract_character(self, request) -> str:
+    def _extract_character(self, flow: http.HTTPFlow) -> str:
         """从请求中提取汉字"""
-        # 方法1: 从cnChar参数
-        cn_char = request.query.get('cnChar', '')
-        if cn_char:
-            try:
-                decoded = base64.b64decode(cn_char).decode('utf-8', errors='ignore')
-                if decoded and len(decoded) >= 1:
-                    char = decoded[0]
-                    if '\u4e00' <= char <= '\u9fff':
-                        return char
-            except:
-                pass
+        # 方法1: 从cnChar参数（request 钩子已解码时直接使用缓存，不再扫描路径和参数）
+        char = flow_cn_char(flow)
+        if char:
+            return char
+        
+        request = flow.request
+        raw_path = request.data.path
         
-        # 方法2: 从URL路径
-        path = request.path
-        if '/chars/' in path:
-            parts = path.split('/')
+        # 方法2: 从URL路径（先在原始字节上判断，图片请求 svg_png/... 不会解码路径）
+        if b'/chars/' in raw_path:
+            parts = request.path.split('/')
             for part in parts:
                 if len(part) > 0 and '\u4e00' <= part[0] <= '\u9fff':
                     return part[0]
         
-        # 方法3: 从其他参数
+        # 方法3: 从其他参数（没有 query 时不解析）
+        if b'?' not in raw_path:
+            return None
         for param in request.query.values():
             try:
                 if len(param) == 1 and '\u4e00' <= param <= '\u9fff':
@@ -212,9 +209,8 @@ class EnhancedCharacterCollector:
         return None
     
     def _save_mapping(self):
-        """保存字符映射"""
-        with open(self.mapping_file, 'w', encoding='utf-8') as f:
-            json.dump(self.char_urls, f, indent=2, ensure_ascii=False)
+        """保存字形目录并导出字符映射"""
+        self.catalog.save(export_legacy=True)
     
     def _print_progress(self):
         """打印进度"""
@@ -243,6 +239,8 @@ class EnhancedCharacterCollector:
             },
             'missing_chars': list(set(self.common_chars) - self.collected_chars)[:50],
             'stats': self.stats,
+            'flow_filter': self.flow_filter.stats(),
+            'correlation': self.correlator.stats(),
             'char_mapping': self.char_urls
         }
         
@@ -257,6 +255,10 @@ class EnhancedCharacterCollector:
         print(f"   已采集字符: {len(self.collected_chars)}")
         print(f"   完成率: {len(self.collected_chars) / len(self.common_chars) * 100:.1f}%")
         print(f"   图片总数: {self.stats['images_saved']}")
+        print(f"   流量: {self.flow_filter.summary()}")
+        correlation = self.correlator.stats()
+        print(f"   关联归属: {correlation['attributed']} 张图片 "
+              f"(归属率 {correlation['attribution_rate'] * 100:.1f}%，未知 {self.stats['images_unknown']} 张)")
         print(f"   保存位置: {self.output_dir}")
         print(f"   映射文件: {self.mapping_file}")
         print(f"   报告文件: {report_file}")
@@ -325,7 +327,8 @@ Q: 看不到任何输出？
 A: 确保App流量经过代理，检查证书是否信任
 
 Q: 只保存了unknown_xxx.png？
-A: URL中没有汉字信息，需要从API响应中提取
+A: 图片URL中没有汉字信息，会归属到同一设备最近 30 秒内查询的汉字（🔗 标记）；
+   仍为 unknown 时说明图片前没有查询请求，可调大时间窗口: CORRELATION_TTL=60 mitmweb -s enhanced_collector.py
 
 Q: 图片无法打开？
 A: 可能是加密的，检查是否为PNG格式
@@ -337,7 +340,7 @@ A: 这是正常的，3000字需要1-2小时手动操作
 采集完成后:
 =========
 cd collected_characters
-ls *.png | wc -l                    # 统计数量
+ls -d */ | wc -l                    # 统计字符数（每个字一个目录，包含多个变体）
 cat char_url_mapping.json | head   # 查看映射
 python3 -m http.server 8000        # 本地预览
 """
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+mitmproxy 采集脚本共用的流工具
+
+FlowFilter: 预编译的 host / path 过滤器
+- 手机上的大部分流量（系统服务、其他 App）与采集无关，应当以最小开销跳过
+- 直接读取 request.data 中的原始 host / path，不构造 pretty_url，不解码 path
+- 判断只是一次 frozenset 查找加一次预编译正则匹配，每个钩子重复判断比缓存结果更便宜，
+  无关流量不分配任何对象
+- 统计已处理 / 已过滤的流数量（同一个流的第二个钩子传 count=False，不重复计数）
+
+按流缓存的结果都不写入 flow.metadata：mitmproxy -w 会把 metadata 一起保存，
+回放抓包时会读回采集时的结果，修改过滤 / 解码逻辑后重新处理就不会生效
+
+flow_cn_char: cnChar 参数只解码一次
+- request 钩子解码后缓存在内存中，response 钩子直接读取
+- 相同的 base64 参数使用 LRU 缓存，重复查询不再解码
+
+QueryCorrelator: 图片请求（svg_png/{folder}/{id}.png）不带汉字，
+按客户端记录最近的 queryDict 查询，把随后的图片归属到该汉字
+"""
+
+import base64
+import binascii
+import re
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+
+TARGET_HOSTS = ("sfapi.fanglige.com",)
+
+# 常用路径（匹配 request.data.path 的原始字节）
+API_PATH = rb"/class/action.php"
+IMAGE_PATH = rb"/svg_png/"
+
+_MISSING = object()
+
+
+class FlowCache:
+    """
+    按流缓存计算结果（只在内存中）
+
+    key 为 (flow.id, id(flow))：同一个流的多个钩子命中缓存；从不同文件读回的同 ID 流
+    是不同的对象，不会互相命中。容量有上限，最早写入的先淘汰（FIFO）
+    """
+
+    def __init__(self, maxsize: int = 16384):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[tuple, object]" = OrderedDict()
+
+    def get(self, flow, default=None):
+        return self._items.get((flow.id, id(flow)), default)
+
+    def put(self, flow, value):
+        self._items[(flow.id, id(flow))] = value
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def discard(self, flow):
+        self._items.pop((flow.id, id(flow)), None)
+
+    def clear(self):
+        self._items.clear()
+
+
+class FlowFilter:
+    """预编译的 host / path 过滤器"""
+
+    def __init__(self,
+                 hosts: Iterable[str] = TARGET_HOSTS,
+                 path_prefixes: Optional[Iterable[bytes]] = None):
+        """
+        初始化过滤器
+
+        Args:
+            hosts: 目标 host（精确匹配；"*.example.com" 匹配所有子域名）
+            path_prefixes: 路径前缀（bytes），None 表示不限制路径
+        """
+        hosts = [h.lower() for h in hosts]
+        self._exact_hosts = frozenset(h for h in hosts if not h.startswith('*.'))
+        suffixes = tuple(h[1:] for h in hosts if h.startswith('*.'))
+        self._host_suffixes = suffixes or None
+
+        prefixes = tuple(path_prefixes) if path_prefixes else ()
+        self._path_match = (
+            re.compile(b"|".join(re.escape(p) for p in prefixes)).match if prefixes else None
+        )
+
+        self.processed = 0
+        self.filtered = 0
+
+    def _host_matches(self, host: str) -> bool:
+        if host in self._exact_hosts:
+            return True
+        if not host.islower():
+            host = host.lower()
+            if host in self._exact_hosts:
+                return True
+        if self._host_suffixes is not None:
+            return host.endswith(self._host_suffixes)
+        return False
+
+    def match(self, flow, count: bool = True) -> bool:
+        """
+        流是否需要处理
+
+        Args:
+            flow: mitmproxy 流
+            count: 是否计入统计；同一个流的 request 钩子已经计数时，response 钩子传 False
+        """
+        data = flow.request.data
+        result = self._host_matches(data.host) and (
+            self._path_match is None or self._path_match(data.path) is not None
+        )
+
+        if count:
+            if result:
+                self.processed += 1
+            else:
+                self.filtered += 1
+        return result
+
+    def stats(self) -> Dict:
+        total = self.processed + self.filtered
+        return {
+            'processed': self.processed,
+            'filtered': self.filtered,
+            'filtered_ratio': round(self.filtered / total, 4) if total else 0.0
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"处理 {stats['processed']} 个流，过滤 {stats['filtered']} 个无关流 "
+                f"({stats['filtered_ratio'] * 100:.1f}%)")
+
+
+def path_startswith(flow, prefix: bytes) -> bool:
+    """不解码 path 的前缀判断"""
+    return flow.request.data.path.startswith(prefix)
+
+
+_cn_chars = FlowCache()
+
+
+def is_cjk(char: str) -> bool:
+    return '\u4e00' <= char <= '\u9fff'
+
+
+@lru_cache(maxsize=8192)
+def decode_cn_char(encoded: str) -> str:
+    """解码 base64 编码的 cnChar 参数，失败返回空字符串"""
+    if not encoded:
+        return ''
+    try:
+        # 未转义的 '+' 在 query 解析后会变成空格
+        return base64.b64decode(encoded.replace(' ', '+')).decode('utf-8')
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return ''
+
+
+def flow_cn_char(flow) -> Optional[str]:
+    """
+    请求查询的汉字（cnChar 参数的第一个字），没有时返回 None
+
+    结果缓存在内存中（不写入 flow.metadata），同一个流的后续钩子不再解析 query
+    """
+    cached = _cn_chars.get(flow, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    char = None
+    if b'cnChar=' in flow.request.data.path:
+        decoded = decode_cn_char(flow.request.query.get('cnChar', ''))
+        if decoded and is_cjk(decoded[0]):
+            char = decoded[0]
+
+    _cn_chars.put(flow, char)
+    return char
+
+
+class QueryCorrelator:
+    """
+    查询 / 图片关联表
+
+    App 查询一个字后会立即请求该字的全部字形图片，因此同一客户端在 ttl 秒内
+    最近的一次查询就是图片对应的汉字。内存有上限：每个客户端最多保留
+    max_per_client 条查询，最多跟踪 max_clients 个客户端（最久未活动的先淘汰）
+    时间使用流自身的时间戳，离线回放时结果与实时一致
+    """
+
+    def __init__(self, ttl: float = 30.0, max_per_client: int = 16, max_clients: int = 256):
+        self.ttl = ttl
+        self.max_per_client = max_per_client
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[str, deque]" = OrderedDict()
+        self.counters = {'queries': 0, 'attributed': 0, 'unattributed': 0, 'expired': 0}
+
+    @staticmethod
+    def client_key(flow) -> str:
+        peername = flow.client_conn.peername
+        return peername[0] if peername else ''
+
+    def record(self, flow, char: str):
+        """记录一次汉字查询"""
+        self.record_at(self.client_key(flow), flow.request.timestamp_start, char)
+
+    def attribute(self, flow) -> Optional[str]:
+        """返回图片请求之前、ttl 内同一客户端最近一次查询的汉字"""
+        return self.attribute_at(self.client_key(flow), flow.request.timestamp_start)
+
+    def record_at(self, key: str, timestamp: float, char: str):
+        """按客户端和时间戳记录查询（用于 Charles / HAR 等非 mitmproxy 来源）"""
+        queries = self._clients.get(key)
+        if queries is None:
+            queries = self._clients[key] = deque(maxlen=self.max_per_client)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(key)
+
+        queries.append((timestamp, char))
+        self.counters['queries'] += 1
+
+    def attribute_at(self, key: str, timestamp: float) -> Optional[str]:
+        queries = self._clients.get(key)
+
+        char = None
+        if queries:
+            while queries and timestamp - queries[0][0] > self.ttl:
+                queries.popleft()
+                self.counters['expired'] += 1
+            for query_time, query_char in reversed(queries):
+                if query_time <= timestamp:
+                    char = query_char
+                    break
+
+        self.counters['attributed' if char else 'unattributed'] += 1
+        return char
+
+    def stats(self) -> Dict:
+        images = self.counters['attributed'] + self.counters['unattributed']
+        return dict(self.counters,
+                    clients=len(self._clients),
+                    attribution_rate=round(self.counters['attributed'] / images, 4) if images else 0.0)
+
+
+def benchmark(total: int = 200000, relevant_ratio: float = 0.05):
+    """对比采集脚本原来的 host 字符串判断和 FlowFilter 的开销"""
+    import random
+    import time
+    from mitmproxy.test import tflow
+
+    hosts = ["gateway.icloud.com", "api.weixin.qq.com", "mesu.apple.com", "sfapi.fanglige.com"]
+    flows = []
+    for i in range(2000):
+        flow = tflow.tflow()
+        host = hosts[3] if random.random() < relevant_ratio else random.choice(hosts[:3])
+        flow.request.host = host
+        flow.request.path = f"/class/action.php?api=queryDict&i={i}" if host == hosts[3] else f"/v1/sync/{i}"
+        flows.append(flow)
+
+    # 每个流经过 request 和 response 两个钩子
+    def legacy(flow):
+        for _ in range(2):
+            matched = 'sfapi.fanglige.com' in flow.request.host
+        return matched
+
+    flow_filter = FlowFilter()
+
+    def filtered(flow):
+        matched = flow_filter.match(flow)
+        return flow_filter.match(flow, count=False) and matched
+
+    print("=" * 70)
+    print("⏱️  流过滤基准测试")
+    print("=" * 70)
+    for name, check in (("'...' in request.host", legacy), ("FlowFilter", filtered)):
+        started = time.perf_counter()
+        for i in range(total):
+            check(flows[i % len(flows)])
+        elapsed = time.perf_counter() - started
+        print(f"   {name:<24} {elapsed / total * 1e6:.2f} µs/流")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    benchmark()
+
+
+"""
+使用方法:
+=========
+from flow_utils import FlowFilter, API_PATH
+
+class MyCollector:
+    def __init__(self):
+        self.flow_filter = FlowFilter()
+
+    def request(self, flow):
+        if not self.flow_filter.match(flow):
+            return
+        ...
+
+    def response(self, flow):
+        if not self.flow_filter.match(flow, count=False):  # request 钩子已计数
+            return
+        ...
+
+    def done(self):
+        print(self.flow_filter.summary())
+
+# 基准测试（需要 mitmproxy）
+python3 flow_utils.py
+"""
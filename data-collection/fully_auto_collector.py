@@ -8,17 +8,21 @@ import sys
 import requests
 import base64
 import json
-import time
 from pathlib import Path
 from tqdm import tqdm
 from typing import List
 from urllib.parse import quote
 
+from rate_controller import AdaptiveRateController
+from url_index import UrlIndex, url_key
+
 class FullyAutoCollector:
     """完全自动化采集器"""
 
-    def __init__(self, token: str, output_dir: str = "./collected_characters"):
+    def __init__(self, token: str, output_dir: str = "./collected_characters", max_rate: float = 5.0,
+                 max_retries: int = 3):
         self.token = token
+        self.max_retries = max_retries  # 遇到 429/5xx 或网络错误时同一个字的最大重试次数
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
 
@@ -30,23 +34,21 @@ class FullyAutoCollector:
             "Accept-Language": "zh-CN,zh-Hans;q=0.9",
         }
 
-        # 已采集的 URL
+        # 自适应限速
+        self.rate_controller = AdaptiveRateController(max_rate=max_rate)
+        self.session = requests.Session()
+
+        # 已采集的 URL（索引记录 URL -> 汉字，文本文件继续追加以兼容旧脚本）
         self.url_file = Path("./auto_extracted_urls.txt")
-        self.collected_urls = self.load_urls()
-
-    def load_urls(self) -> set:
-        """加载已收集的 URL"""
-        if self.url_file.exists():
-            with open(self.url_file, 'r') as f:
-                return set(line.strip() for line in f if line.strip())
-        return set()
-
-    def save_url(self, url: str):
-        """保存 URL"""
-        if url not in self.collected_urls:
+        self.url_index = UrlIndex("./url_index.sqlite3", legacy_text=self.url_file)
+
+    def save_url(self, url: str, char: str):
+        """保存 URL 及其对应的汉字"""
+        if self.url_index.add(url, char=char, source='api'):
             with open(self.url_file, 'a') as f:
                 f.write(url + '\n')
-            self.collected_urls.add(url)
+        elif url_key(url) is None:
+            print(f"⚠️  无法解析的 URL（已保存到索引 unparsed_urls 表）: {url}")
 
     def get_common_chars(self) -> List[str]:
         """获取常用汉字列表（3500字）"""
@@ -98,7 +100,24 @@ class FullyAutoCollector:
         }
 
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
+            # 被限流时按 Retry-After 退避后重试同一个字，而不是直接记为失败
+            for attempt in range(self.max_retries + 1):
+                self.rate_controller.wait()
+                try:
+                    response = self.session.get(url, params=params, headers=self.headers, timeout=10)
+                except requests.exceptions.RequestException as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    self.rate_controller.record_error(type(e).__name__)
+                    continue
+
+                if not self.rate_controller.record_response(response.status_code, response.headers):
+                    break
+                print(f"⏳ {char}: HTTP {response.status_code}，降速至 {self.rate_controller.rate:.2f} 请求/秒"
+                      f"（第 {attempt + 1} 次）")
+            else:
+                print(f"⚠️  {char}: 重试 {self.max_retries} 次后仍被限流，跳过")
+                return []
 
             if response.status_code == 200:
                 # 响应是加密的，但我们可以尝试其他方法
@@ -112,6 +131,10 @@ class FullyAutoCollector:
 
             return []
 
+        except requests.exceptions.RequestException as e:
+            self.rate_controller.record_error(type(e).__name__)
+            print(f"⚠️  查询 {char} 失败: {e}")
+            return []
         except Exception as e:
             print(f"⚠️  查询 {char} 失败: {e}")
             return []
@@ -129,7 +152,13 @@ class FullyAutoCollector:
         return []
 
     def collect_all(self, chars: List[str], delay: float = 1.0):
-        """批量采集"""
+        """
+        批量采集
+
+        Args:
+            chars: 要查询的汉字列表
+            delay: 初始请求间隔（秒），之后由自适应限速根据服务器响应调整
+        """
 
         print("=" * 70)
         print("  完全自动化批量采集")
@@ -145,6 +174,16 @@ class FullyAutoCollector:
         success_count = 0
         fail_count = 0
 
+        # 索引中已有 URL 的汉字不再查询
+        pending = [char for char in chars if not self.url_index.has_char(char)]
+        if len(pending) < len(chars):
+            print(f"⏭️  跳过已有 URL 的汉字: {len(chars) - len(pending)} 个")
+            print()
+        chars = pending
+
+        if delay > 0:
+            self.rate_controller.set_rate(1.0 / delay)
+
         with tqdm(total=len(chars), desc="查询进度") as pbar:
             for char in chars:
                 # 查询汉字
@@ -153,12 +192,14 @@ class FullyAutoCollector:
                 if urls:
                     success_count += 1
                     for url in urls:
-                        self.save_url(url)
+                        self.save_url(url, char)
                 else:
                     fail_count += 1
 
                 pbar.update(1)
-                time.sleep(delay)
+                pbar.set_postfix({"速率": f"{self.rate_controller.rate:.2f}/s"})
+
+        self.url_index.close()
 
         print()
         print("=" * 70)
@@ -168,6 +209,13 @@ class FullyAutoCollector:
         print(f"  失败: {fail_count}")
         print()
 
+        metrics = self.rate_controller.metrics()
+        print("⚡ 限速指标:")
+        print(f"  当前速率: {metrics['current_rate']} 请求/秒")
+        print(f"  退避次数: {metrics['backoff_events']}")
+        print(f"  遵守 Retry-After: {metrics['retry_after_honored']} 次")
+        print()
+
 def main():
     """主函数"""
 
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+字形目录 (glyph_catalog.json)
+支持每个汉字保存多个字形变体（不同字体/书法风格）
+
+存储结构:
+    collected_characters/
+        glyph_catalog.json          # 目录文件（schema v2）
+        char_url_mapping.json       # 旧版单变体映射（v1），由目录导出，供 Worker/上传脚本使用
+        6c34_水/
+            59-2jsr.png             # 变体文件，文件名为变体 ID
+            62-2omf.png
+
+目录结构 (schema v2):
+    {
+      "schema_version": 2,
+      "updated_at": "...",
+      "characters": {
+        "水": {
+          "unicode": "U+6C34",
+          "primary": "59-2jsr",
+          "variants": {
+            "59-2jsr": {"font_id": "59", "url": "...", "filename": "6c34_水/59-2jsr.png",
+                        "sha256": "...", "size": 1234, "source": "api", "timestamp": "..."}
+          }
+        }
+      }
+    }
+
+按字符查询变体是字典查找（O(1)），另外在内存中维护 sha256 -> (字符, 变体ID) 索引用于去重
+"""
+
+import hashlib
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+SCHEMA_VERSION = 2
+CATALOG_FILENAME = "glyph_catalog.json"
+LEGACY_MAPPING_FILENAME = "char_url_mapping.json"
+
+# https://sfapi.fanglige.com/svg_png/{folder}/{name}.png，folder 推测为字体 ID
+SVG_PNG_URL_RE = re.compile(r'/svg_png/(\d+)/([0-9A-Za-z]+)\.png')
+
+
+def char_dir_name(char: str) -> str:
+    """字符目录名：unicode_汉字（与旧版文件名前缀一致）"""
+    return f"{ord(char):04x}_{char}"
+
+
+def unicode_label(char: str) -> str:
+    return f"U+{ord(char):04X}"
+
+
+def variant_id_from_url(url: str) -> Tuple[str, Optional[str]]:
+    """
+    从图片 URL 推导变体 ID 和字体 ID
+
+    /svg_png/59/2jsr.png -> ("59-2jsr", "59")；其他 URL 使用 URL 哈希
+    """
+    match = SVG_PNG_URL_RE.search(url or "")
+    if match:
+        folder, name = match.groups()
+        return f"{folder}-{name}", folder
+    return f"u{hashlib.md5((url or '').encode()).hexdigest()[:10]}", None
+
+
+class GlyphCatalog:
+    """多变体字形目录"""
+
+    def __init__(self, data_dir, auto_migrate: bool = True):
+        """
+        加载目录
+
+        Args:
+            data_dir: 数据目录（collected_characters）
+            auto_migrate: 目录不存在或缺少字符时，从旧版 char_url_mapping.json 迁移
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.catalog_file = self.data_dir / CATALOG_FILENAME
+        self.legacy_mapping_file = self.data_dir / LEGACY_MAPPING_FILENAME
+
+        self.characters: Dict[str, Dict] = {}
+        self._hash_index: Dict[str, Tuple[str, str]] = {}
+        self._dirty = False
+
+        if self.catalog_file.exists():
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            version = data.get('schema_version', 1)
+            if version > SCHEMA_VERSION:
+                raise ValueError(
+                    f"{self.catalog_file} uses schema v{version}, "
+                    f"this tool only supports up to v{SCHEMA_VERSION}"
+                )
+            self.characters = data.get('characters', {})
+            self._rebuild_hash_index()
+
+        if auto_migrate and self.legacy_mapping_file.exists():
+            migrated = self.import_legacy_mapping(self._load_legacy_mapping())
+            if migrated:
+                print(f"🔄 已从 {LEGACY_MAPPING_FILENAME} 迁移 {migrated} 个字符到 {CATALOG_FILENAME}")
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def __contains__(self, char: str) -> bool:
+        return char in self.characters
+
+    def __len__(self) -> int:
+        return len(self.characters)
+
+    def variants(self, char: str) -> List[Dict]:
+        """列出某个字符的所有变体（primary 在前）"""
+        entry = self.characters.get(char)
+        if not entry:
+            return []
+        primary = entry.get('primary')
+        variants = [dict(v, variant_id=vid) for vid, v in entry['variants'].items()]
+        variants.sort(key=lambda v: v['variant_id'] != primary)
+        return variants
+
+    def get_variant(self, char: str, variant_id: str) -> Optional[Dict]:
+        entry = self.characters.get(char)
+        if not entry:
+            return None
+        return entry['variants'].get(variant_id)
+
+    def iter_variants(self) -> Iterator[Tuple[str, str, Dict]]:
+        """遍历所有 (字符, 变体ID, 变体信息)"""
+        for char, entry in self.characters.items():
+            for variant_id, variant in entry['variants'].items():
+                yield char, variant_id, variant
+
+    def path_for(self, variant: Dict) -> Path:
+        """变体文件的本地路径"""
+        return self.data_dir / variant['filename']
+
+    def find_by_hash(self, sha256: str) -> Optional[Tuple[str, str]]:
+        return self._hash_index.get(sha256)
+
+    def variant_count(self) -> int:
+        return sum(len(entry['variants']) for entry in self.characters.values())
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def add_variant(self,
+                    char: str,
+                    data: bytes,
+                    url: str = "",
+                    variant_id: Optional[str] = None,
+                    font_id: Optional[str] = None,
+                    source: str = "api",
+                    ext: str = "png",
+                    **extra) -> Tuple[Dict, bool]:
+        """
+        保存一个变体图片到 {unicode}_{汉字}/{变体ID}.{ext}
+
+        同一字符下内容相同（sha256）的图片只保存一次
+
+        Returns:
+            (变体信息, 是否为新变体)
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        existing = self._hash_index.get(sha256)
+        if existing and existing[0] == char:
+            return self.characters[char]['variants'][existing[1]], False
+
+        if variant_id is None:
+            variant_id, url_font_id = variant_id_from_url(url)
+            font_id = font_id or url_font_id
+
+        filename = f"{char_dir_name(char)}/{variant_id}.{ext}"
+        filepath = self.data_dir / filename
+        filepath.parent.mkdir(exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+
+        variant = self._put_variant(char, variant_id, {
+            'font_id': font_id,
+            'url': url,
+            'filename': filename,
+            'sha256': sha256,
+            'size': len(data),
+            'source': source,
+            'timestamp': datetime.now().isoformat(),
+            **extra
+        })
+        return variant, True
+
+    def register_file(self, char: str, filename: str, variant_id: str, **info) -> Dict:
+        """登记一个已存在的文件（不复制、不移动），用于迁移和外部生成的图片"""
+        filepath = self.data_dir / filename
+        variant = {'filename': filename, 'timestamp': datetime.now().isoformat()}
+        if filepath.exists():
+            data = filepath.read_bytes()
+            variant['sha256'] = hashlib.sha256(data).hexdigest()
+            variant['size'] = len(data)
+        variant.update(info)
+        return self._put_variant(char, variant_id, variant)
+
+    def update_variant(self, char: str, variant_id: str, **fields):
+        """更新变体字段（例如优化后的大小、衍生格式）"""
+        variant = self.characters[char]['variants'][variant_id]
+        old_hash = variant.get('sha256')
+        variant.update(fields)
+        if 'sha256' in fields and fields['sha256'] != old_hash:
+            self._hash_index.pop(old_hash, None)
+            self._hash_index[fields['sha256']] = (char, variant_id)
+        self._dirty = True
+
+    def set_primary(self, char: str, variant_id: str):
+        entry = self.characters[char]
+        if variant_id not in entry['variants']:
+            raise KeyError(f"{char} has no variant {variant_id}")
+        entry['primary'] = variant_id
+        self._dirty = True
+
+    def set_atlas(self, char: str, atlas: Optional[Dict]):
+        """记录字符在图集中的位置（atlas_builder.py 生成），None 表示移除"""
+        entry = self.characters[char]
+        if atlas is None:
+            if entry.pop('atlas', None) is not None:
+                self._dirty = True
+            return
+        if entry.get('atlas') != atlas:
+            entry['atlas'] = atlas
+            self._dirty = True
+
+    def _put_variant(self, char: str, variant_id: str, variant: Dict) -> Dict:
+        entry = self.characters.setdefault(char, {
+            'unicode': unicode_label(char),
+            'primary': variant_id,
+            'variants': {}
+        })
+        previous = entry['variants'].get(variant_id)
+        if previous and previous.get('sha256'):
+            self._hash_index.pop(previous['sha256'], None)
+
+        entry['variants'][variant_id] = variant
+        if entry.get('primary') not in entry['variants']:
+            entry['primary'] = variant_id
+        if variant.get('sha256'):
+            self._hash_index[variant['sha256']] = (char, variant_id)
+        self._dirty = True
+        return variant
+
+    def _rebuild_hash_index(self):
+        self._hash_index = {}
+        for char, variant_id, variant in self.iter_variants():
+            if variant.get('sha256'):
+                self._hash_index[variant['sha256']] = (char, variant_id)
+
+    # ------------------------------------------------------------------
+    # 旧版映射 (v1) 迁移与导出
+    # ------------------------------------------------------------------
+
+    def _load_legacy_mapping(self) -> Dict:
+        try:
+            with open(self.legacy_mapping_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            print(f"⚠️  {self.legacy_mapping_file} 为空或格式错误，跳过迁移")
+            return {}
+
+    def import_legacy_mapping(self, mapping: Dict) -> int:
+        """
+        迁移 v1 单变体映射 {汉字: {url, filename, unicode, size, timestamp}}
+
+        已在目录中的字符不会被覆盖；原文件保持原位置，作为 primary 变体登记
+
+        Returns:
+            迁移的字符数
+        """
+        migrated = 0
+        for char, info in mapping.items():
+            if char in self.characters or not isinstance(info, dict) or not info.get('filename'):
+                continue
+
+            url = info.get('url', '')
+            variant_id, font_id = variant_id_from_url(url) if url else ('legacy', None)
+            self.register_file(
+                char,
+                info['filename'],
+                variant_id,
+                font_id=font_id,
+                url=url,
+                source='legacy',
+                timestamp=info.get('timestamp') or datetime.now().isoformat()
+            )
+            migrated += 1
+        return migrated
+
+    def legacy_entry(self, char: str) -> Dict:
+        """导出某个字符的 v1 映射条目（primary 变体）"""
+        entry = self.characters[char]
+        primary = entry['variants'][entry['primary']]
+        legacy = {
+            'url': primary.get('url', ''),
+            'filename': primary['filename'],
+            'unicode': entry['unicode'],
+            'size': primary.get('size', 0),
+            'timestamp': primary.get('timestamp', ''),
+            'variant_count': len(entry['variants'])
+        }
+        if primary.get('derivatives'):
+            legacy['derivatives'] = [
+                {k: d[k] for k in ('format', 'label', 'width', 'bytes', 'key')}
+                for d in primary['derivatives']
+            ]
+        if entry.get('atlas'):
+            legacy['atlas'] = entry['atlas']
+        return legacy
+
+    def to_legacy_mapping(self) -> Dict[str, Dict]:
+        return {char: self.legacy_entry(char) for char in self.characters}
+
+    def save(self, export_legacy: bool = True):
+        """保存目录；export_legacy 时同时重新导出 char_url_mapping.json"""
+        if not self._dirty and self.catalog_file.exists():
+            return
+
+        payload = {
+            'schema_version': SCHEMA_VERSION,
+            'updated_at': datetime.now().isoformat(),
+            'characters': self.characters
+        }
+        tmp_file = self.catalog_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        tmp_file.replace(self.catalog_file)
+
+        if export_legacy:
+            with open(self.legacy_mapping_file, 'w', encoding='utf-8') as f:
+                json.dump(self.to_legacy_mapping(), f, indent=2, ensure_ascii=False)
+
+        self._dirty = False
+
+
+def main():
+    """迁移旧版映射 / 查看字符变体"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='字形目录工具')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('chars', nargs='*', help='要查看变体的汉字')
+    args = parser.parse_args()
+
+    catalog = GlyphCatalog(args.data_dir)
+    catalog.save()
+
+    print("=" * 70)
+    print("📚 字形目录")
+    print("=" * 70)
+    print(f"📁 目录文件: {catalog.catalog_file}")
+    print(f"📊 字符: {len(catalog)}  变体: {catalog.variant_count()}")
+
+    for char in args.chars:
+        variants = catalog.variants(char)
+        print(f"\n'{char}' ({len(variants)} 个变体):")
+        for v in variants:
+            print(f"   {v['variant_id']:<16} font={v.get('font_id')}  {v.get('size', 0):>7} bytes  {v['filename']}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 迁移旧版 char_url_mapping.json 并查看统计
+python3 glyph_catalog.py
+
+# 查看某些字的全部变体
+python3 glyph_catalog.py 水 火
+
+# 在代码中使用
+from glyph_catalog import GlyphCatalog
+
+catalog = GlyphCatalog('./collected_characters')
+for variant in catalog.variants('水'):
+    print(variant['variant_id'], catalog.path_for(variant))
+"""
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+字形相似度搜索（"写法相似的字"）
+基于 glyph_tensor.py 导出的字形张量，不需要深度学习模型
+
+特征:
+    hog     梯度方向直方图（8x8 像素一个单元，8 个方向，512 维），对笔画粗细不敏感（默认）
+    binary  二值化后降采样到 32x32（1024 维），余弦相似度即 Ochiai 系数
+
+索引:
+    暴力搜索  全部特征 L2 归一化后一次矩阵乘法 + argpartition 取 top-k（NumPy 向量化）
+    IVF-PQ   粗聚类倒排表 + 残差乘积量化（每个子空间 256 个中心，每个向量 m 字节），
+             查询时只扫描 nprobe 个倒排表，用查表法（ADC）计算近似距离，再用原始特征重排
+
+存储:
+    collected_characters/glyph_tensor/search_index.npz
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from glyph_tensor import TENSOR_DIR, GlyphTensor, normalize_glyph
+
+
+INDEX_FILENAME = "search_index.npz"
+FEATURES = ('hog', 'binary')
+
+HOG_CELL = 8
+HOG_BINS = 8
+BINARY_SIZE = 32
+BINARY_THRESHOLD = 0.5   # 墨迹比例
+
+FEATURE_BATCH = 4096
+
+
+# ============================================================================
+# 特征（向量化）
+# ============================================================================
+
+def _resample(images: np.ndarray, size: int) -> np.ndarray:
+    """最近邻缩放到 (n, size, size)，尺寸相同时原样返回"""
+    full = images.shape[1]
+    if full == size:
+        return images
+    index = ((np.arange(size) + 0.5) * full / size).astype(np.int64)
+    return images[:, index][:, :, index]
+
+
+def hog_features(images: np.ndarray, cell: int = HOG_CELL, bins: int = HOG_BINS) -> np.ndarray:
+    """
+    梯度方向直方图
+
+    Args:
+        images: (n, size, size) uint8 白底黑字；size 不是 cell 的整数倍时先缩放到最接近的整数倍
+
+    Returns:
+        (n, (size / cell)^2 * bins) float32
+    """
+    full = images.shape[1]
+    if full % cell:
+        images = _resample(images, max(1, round(full / cell)) * cell)
+
+    ink = 1.0 - images.astype(np.float32) / 255.0
+    gx = np.zeros_like(ink)
+    gy = np.zeros_like(ink)
+    gx[:, :, 1:-1] = ink[:, :, 2:] - ink[:, :, :-2]
+    gy[:, 1:-1, :] = ink[:, 2:, :] - ink[:, :-2, :]
+
+    magnitude = np.hypot(gx, gy)
+    orientation = np.arctan2(gy, gx) % np.pi  # 无符号方向
+    bin_index = np.minimum((orientation * (bins / np.pi)).astype(np.int64), bins - 1)
+
+    # 每个像素的 (图片, 单元, 方向) 直方图下标，一次 bincount 累加
+    n, size, _ = images.shape
+    cells = size // cell
+    cell_index = (np.arange(size) // cell)[:, None] * cells + (np.arange(size) // cell)[None, :]
+    index = (np.arange(n)[:, None, None] * (cells * cells) + cell_index) * bins + bin_index
+    hist = np.bincount(index.ravel(), weights=magnitude.ravel(), minlength=n * cells * cells * bins)
+    return np.sqrt(hist.astype(np.float32)).reshape(n, -1)  # 平方根（Hellinger）减弱少数强边缘的影响
+
+
+def binary_features(images: np.ndarray, size: int = BINARY_SIZE) -> np.ndarray:
+    """二值化降采样: (n, size * size) float32 (0 / 1)；图片边长不是 size 的整数倍时先缩放"""
+    n, full, _ = images.shape
+    factor = max(1, round(full / size))
+    images = _resample(images, size * factor)
+    ink = 1.0 - images.astype(np.float32) / 255.0
+    pooled = ink.reshape(n, size, factor, size, factor).mean(axis=(2, 4))
+    return (pooled > BINARY_THRESHOLD).astype(np.float32).reshape(n, -1)
+
+
+def extract_features(images: np.ndarray, feature: str = 'hog') -> np.ndarray:
+    """(n, size, size) uint8 -> L2 归一化的 (n, d) float32"""
+    if feature == 'hog':
+        vectors = hog_features(images)
+    elif feature == 'binary':
+        vectors = binary_features(images)
+    else:
+        raise ValueError(f"Unknown feature: {feature}")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+# ============================================================================
+# 聚类 / 乘积量化
+# ============================================================================
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """每个向量最近的中心（平方 L2）"""
+    c_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int64)
+    for i in range(0, len(x), chunk):
+        block = x[i:i + chunk]
+        out[i:i + chunk] = np.argmin(c_norms[None, :] - 2.0 * block @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int = 20, seed: int = 0,
+           sample: Optional[int] = 50000) -> np.ndarray:
+    """Lloyd k-means（训练集过大时先随机采样），返回 (k, d) 中心"""
+    rng = np.random.default_rng(seed)
+    if sample and len(x) > sample:
+        x = x[rng.choice(len(x), sample, replace=False)]
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        assign = _nearest(x, centroids)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():  # 空簇重新随机选点
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFPQ:
+    """倒排表 + 残差乘积量化"""
+
+    def __init__(self, coarse: np.ndarray, codebooks: np.ndarray,
+                 list_offsets: np.ndarray, list_ids: np.ndarray, codes: np.ndarray):
+        self.coarse = coarse              # (nlist, d)
+        self.codebooks = codebooks        # (m, 256, d / m)
+        self.list_offsets = list_offsets  # (nlist + 1,)，倒排表 i 为 list_ids[offsets[i]:offsets[i + 1]]
+        self.list_ids = list_ids          # (n,) 按倒排表排序的行号（特征矩阵中的下标）
+        self.codes = codes                # (n, m) uint8，与 list_ids 对齐
+
+        # ||q - c - b||^2 = ||q - c||^2 + (||b||^2 + 2<c, b>) - 2<q, b>，括号内与查询无关，预先计算
+        m, ksub, dsub = codebooks.shape
+        coarse_sub = coarse.reshape(len(coarse), m, dsub)
+        self._list_terms = ((codebooks ** 2).sum(axis=2)[None]
+                            + 2 * np.einsum('lmd,mkd->lmk', coarse_sub, codebooks)).astype(np.float32)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.coarse)
+
+    @classmethod
+    def train(cls, features: np.ndarray, nlist: Optional[int] = None, m: int = 32,
+              seed: int = 0) -> "IVFPQ":
+        n, d = features.shape
+        if d % m:
+            raise ValueError(f"dimension {d} is not divisible by m={m}")
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        ksub = min(256, n)
+
+        coarse = kmeans(features, nlist, seed=seed)
+        assign = _nearest(features, coarse)
+        residuals = features - coarse[assign]
+
+        dsub = d // m
+        codebooks = np.stack([kmeans(residuals[:, j * dsub:(j + 1) * dsub], ksub, iterations=15,
+                                     seed=seed + j + 1, sample=20000) for j in range(m)])
+        if ksub < 256:
+            codebooks = np.concatenate([codebooks, np.zeros((m, 256 - ksub, dsub), np.float32)], axis=1)
+
+        codes = np.empty((n, m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = _nearest(residuals[:, j * dsub:(j + 1) * dsub], codebooks[j, :ksub])
+
+        order = np.argsort(assign, kind='stable')
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=len(coarse)))))
+        return cls(coarse, codebooks, list_offsets, order, codes[order])
+
+    def candidates(self, query: np.ndarray, count: int, nprobe: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        近似最近邻（平方 L2 距离从小到大）
+
+        Returns:
+            (行号, 近似距离)
+        """
+        m, _, dsub = self.codebooks.shape
+        coarse_dist = ((self.coarse - query) ** 2).sum(axis=1)
+        probes = np.argsort(coarse_dist)[:nprobe]
+
+        query_terms = -2 * np.einsum('md,mkd->mk', query.reshape(m, dsub), self.codebooks)
+        subspaces = np.arange(m)
+
+        ids, dists = [], []
+        for probe in probes:
+            start, end = self.list_offsets[probe], self.list_offsets[probe + 1]
+            if start == end:
+                continue
+            table = self._list_terms[probe] + query_terms                        # (m, 256)
+            codes = self.codes[start:end]
+            dists.append(coarse_dist[probe] + table[subspaces, codes].sum(axis=1))  # ADC 查表
+            ids.append(self.list_ids[start:end])
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        ids, dists = np.concatenate(ids), np.concatenate(dists)
+        if len(ids) > count:
+            top = np.argpartition(dists, count)[:count]
+            ids, dists = ids[top], dists[top]
+        order = np.argsort(dists)
+        return ids[order], dists[order]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {'ivf_coarse': self.coarse, 'ivf_codebooks': self.codebooks,
+                'ivf_offsets': self.list_offsets, 'ivf_ids': self.list_ids, 'ivf_codes': self.codes}
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "IVFPQ":
+        return cls(arrays['ivf_coarse'], arrays['ivf_codebooks'], arrays['ivf_offsets'],
+                   arrays['ivf_ids'], arrays['ivf_codes'])
+
+
+# ============================================================================
+# 搜索索引
+# ============================================================================
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """每行分数最高的 k 个下标（从高到低）"""
+    k = min(k, scores.shape[-1])
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=-1), axis=-1)
+    return np.take_along_axis(top, order, axis=-1)
+
+
+class GlyphSearchIndex:
+    """字形相似度索引"""
+
+    def __init__(self, features: np.ndarray, rows: np.ndarray, feature: str = 'hog',
+                 ivf: Optional[IVFPQ] = None, tensor_rows: int = 0):
+        """
+        Args:
+            features: (n, d) L2 归一化特征
+            rows: (n,) 每个特征对应的字形张量行号
+            feature: 特征类型
+            ivf: 可选 IVF-PQ 索引
+            tensor_rows: 建索引时字形张量的行数（判断是否需要重建）
+        """
+        self.features = features
+        self.rows = rows
+        self.feature = feature
+        self.ivf = ivf
+        self.tensor_rows = tensor_rows
+        self._position = {int(r): i for i, r in enumerate(rows)}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, tensor: GlyphTensor, feature: str = 'hog', batch_size: int = FEATURE_BATCH) -> "GlyphSearchIndex":
+        """为字形张量中每个 (汉字, 变体) 的最新行计算特征"""
+        rows = tensor.active_rows()
+        chunks = [extract_features(np.asarray(tensor.images[rows[i:i + batch_size]]), feature)
+                  for i in range(0, len(rows), batch_size)]
+        features = np.concatenate(chunks) if chunks else np.empty((0, 0), np.float32)
+        return cls(features, rows, feature, tensor_rows=len(tensor))
+
+    def train_ivf(self, nlist: Optional[int] = None, m: int = 32, seed: int = 0):
+        # 特征维度随张量尺寸变化，子空间数取不超过 m 且能整除维度的最大值
+        d = self.features.shape[1]
+        m = max(k for k in range(1, min(m, d) + 1) if d % k == 0)
+        self.ivf = IVFPQ.train(self.features, nlist, m, seed)
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None,
+               rerank: int = 100) -> List[List[Tuple[int, float]]]:
+        """
+        相似度搜索
+
+        Args:
+            queries: (d,) 或 (q, d) L2 归一化特征
+            k: 返回数量
+            nprobe: 使用 IVF-PQ 时扫描的倒排表数，None 表示暴力搜索
+            rerank: IVF-PQ 取多少个候选用原始特征重排
+
+        Returns:
+            每个查询的 [(字形张量行号, 余弦相似度)]，相似度从高到低
+        """
+        queries = np.atleast_2d(queries).astype(np.float32)
+
+        if nprobe is None or self.ivf is None:
+            results = []
+            for i in range(0, len(queries), 256):
+                block = queries[i:i + 256]
+                scores = block @ self.features.T
+                top = _top_k(scores, k)
+                for q, ids in enumerate(top):
+                    results.append([(int(self.rows[j]), float(scores[q, j])) for j in ids])
+            return results
+
+        results = []
+        for query in queries:
+            ids, _ = self.ivf.candidates(query, max(k, rerank), nprobe)
+            if not rerank:
+                ids = ids[:k]
+            if not len(ids):
+                results.append([])
+                continue
+            scores = self.features[ids] @ query
+            results.append([(int(self.rows[ids[j]]), float(scores[j])) for j in _top_k(scores, k)])
+        return results
+
+    def query_features(self, images: np.ndarray) -> np.ndarray:
+        return extract_features(images.reshape(-1, *images.shape[-2:]), self.feature)
+
+    def features_for_row(self, row: int) -> Optional[np.ndarray]:
+        i = self._position.get(int(row))
+        return None if i is None else self.features[i]
+
+    def save(self, path):
+        arrays = {'features': self.features, 'rows': self.rows,
+                  'meta': np.array(json.dumps({'feature': self.feature, 'tensor_rows': self.tensor_rows}))}
+        if self.ivf is not None:
+            arrays.update(self.ivf.to_arrays())
+        tmp_path = Path(f"{path}.tmp.npz")
+        np.savez(tmp_path, **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path) -> "GlyphSearchIndex":
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            ivf = IVFPQ.from_arrays(data) if 'ivf_coarse' in data else None
+            return cls(data['features'], data['rows'], meta['feature'], ivf, meta.get('tensor_rows', 0))
+
+
+def load_or_build(tensor: GlyphTensor, index_file: Path, feature: str = 'hog', ivf: bool = False,
+                  rebuild: bool = False) -> GlyphSearchIndex:
+    """读取索引；字形张量有新行、特征类型不同或缺少 IVF-PQ 时重建"""
+    if index_file.exists() and not rebuild:
+        index = GlyphSearchIndex.load(index_file)
+        if index.tensor_rows == len(tensor) and index.feature == feature and (index.ivf or not ivf):
+            return index
+
+    started = time.perf_counter()
+    index = GlyphSearchIndex.build(tensor, feature)
+    if ivf:
+        index.train_ivf()
+    index.save(index_file)
+    print(f"🔨 已建立索引: {len(index)} 个字形, {feature}, "
+          f"{'IVF-PQ, ' if ivf else ''}{time.perf_counter() - started:.2f}s -> {index_file}")
+    return index
+
+
+# ============================================================================
+# 基准测试
+# ============================================================================
+
+def _augment(images: np.ndarray, count: int, seed: int = 0) -> np.ndarray:
+    """用随机平移 + 噪声把字形扩充到 count 个（模拟更大的字形库）"""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(images), count)
+    out = np.asarray(images)[picks].copy()
+    shifts = rng.integers(-3, 4, size=(count, 2))
+    for (dy, dx) in set(map(tuple, shifts)):
+        mask = (shifts[:, 0] == dy) & (shifts[:, 1] == dx)
+        out[mask] = np.roll(out[mask], (dy, dx), axis=(1, 2))
+    noise = rng.random(out.shape) < 0.01
+    out[noise] = 255 - out[noise]
+    return out
+
+
+def benchmark(tensor: GlyphTensor, sizes: Sequence[int] = (10000, 100000), feature: str = 'hog',
+              k: int = 10, queries: int = 200, nprobe: int = 8) -> List[Dict]:
+    """暴力搜索 / IVF-PQ 单次查询延迟及召回率"""
+    base = np.asarray(tensor.images[tensor.active_rows()])
+    results = []
+
+    print("=" * 70)
+    print(f"⏱️  字形搜索基准测试（特征: {feature}，top-{k}，{queries} 次查询）")
+    print("=" * 70)
+    for size in sizes:
+        images = base if size <= len(base) else _augment(base, size)
+        images = images[:size]
+        started = time.perf_counter()
+        features = np.concatenate([extract_features(images[i:i + FEATURE_BATCH], feature)
+                                   for i in range(0, size, FEATURE_BATCH)])
+        feature_seconds = time.perf_counter() - started
+        index = GlyphSearchIndex(features, np.arange(size), feature)
+
+        started = time.perf_counter()
+        index.train_ivf()
+        train_seconds = time.perf_counter() - started
+
+        rng = np.random.default_rng(1)
+        query_features = extract_features(_augment(images[rng.integers(0, size, queries)], queries, seed=2),
+                                          feature)
+
+        def timed(**kwargs):
+            latencies, found = [], []
+            for q in query_features:
+                t = time.perf_counter()
+                found.append({row for row, _ in index.search(q, k, **kwargs)[0]})
+                latencies.append((time.perf_counter() - t) * 1000)
+            return np.percentile(latencies, [50, 95]), found
+
+        (brute_p50, brute_p95), exact = timed()
+        (ivf_p50, ivf_p95), approx = timed(nprobe=nprobe)
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approx, exact)])
+
+        print(f"📊 {size} 个字形（特征 {feature_seconds:.2f}s，IVF-PQ 训练 {train_seconds:.2f}s，"
+              f"{index.ivf.nlist} 个倒排表）")
+        print(f"   暴力搜索      p50 {brute_p50:7.2f} ms   p95 {brute_p95:7.2f} ms")
+        print(f"   IVF-PQ        p50 {ivf_p50:7.2f} ms   p95 {ivf_p95:7.2f} ms   "
+              f"recall@{k} {recall:.3f} (nprobe={nprobe})")
+        results.append({'size': size, 'brute_p50_ms': brute_p50, 'brute_p95_ms': brute_p95,
+                        'ivf_p50_ms': ivf_p50, 'ivf_p95_ms': ivf_p95, 'recall': recall})
+    print("=" * 70)
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='字形相似度搜索')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--tensor-dir', help='字形张量目录（默认 <数据目录>/glyph_tensor）')
+    parser.add_argument('--char', help='查找与该汉字（第一个变体）写法相似的字形')
+    parser.add_argument('--variant', help='指定变体 ID（与 --char 一起使用）')
+    parser.add_argument('--image', help='查找与该图片相似的字形')
+    parser.add_argument('-k', type=int, default=10, help='返回数量')
+    parser.add_argument('--feature', choices=FEATURES, default='hog', help='特征类型')
+    parser.add_argument('--ivf', action='store_true', help='使用 IVF-PQ 索引（大规模字形库）')
+    parser.add_argument('--nprobe', type=int, default=8, help='IVF-PQ 扫描的倒排表数')
+    parser.add_argument('--rebuild', action='store_true', help='重建索引')
+    parser.add_argument('--benchmark', action='store_true', help='基准测试')
+    parser.add_argument('--sizes', default='10000,100000', help='基准测试字形数（逗号分隔）')
+    args = parser.parse_args()
+
+    tensor_dir = Path(args.tensor_dir) if args.tensor_dir else Path(args.data_dir) / TENSOR_DIR
+    tensor = GlyphTensor(tensor_dir)
+
+    if args.benchmark:
+        benchmark(tensor, [int(s) for s in args.sizes.split(',')], args.feature, args.k)
+        return
+
+    index = load_or_build(tensor, tensor_dir / INDEX_FILENAME, args.feature, args.ivf, args.rebuild)
+    if not (args.char or args.image):
+        print(f"📦 {len(index)} 个字形已建立索引，使用 --char / --image 查询")
+        return
+
+    exclude = None
+    if args.image:
+        query = index.query_features(normalize_glyph(args.image, tensor.size))[0]
+        label = args.image
+    else:
+        char = args.char[0]
+        rows = tensor.rows_for(char)
+        if args.variant:
+            rows = [r for r in rows if tensor.rows[r]['variant_id'] == args.variant]
+        if not rows:
+            print(f"❌ {char} 不在字形张量中")
+            return
+        exclude = rows[0]
+        query = index.features_for_row(exclude)
+        label = f"{char} ({tensor.rows[exclude]['variant_id']})"
+
+    nprobe = args.nprobe if args.ivf else None
+    started = time.perf_counter()
+    results = index.search(query, args.k + (exclude is not None), nprobe=nprobe)[0]
+    elapsed = (time.perf_counter() - started) * 1000
+    results = [(row, score) for row, score in results if row != exclude][:args.k]
+
+    print(f"🔍 与 {label} 相似的字形（{'IVF-PQ' if nprobe else '暴力搜索'}，{elapsed:.2f} ms）:")
+    for rank, (row, score) in enumerate(results, 1):
+        info = tensor.rows[row]
+        print(f"  {rank:>2}. {info['char']}  {info['variant_id']:<24} 相似度 {score:.4f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 先导出字形张量
+python3 glyph_tensor.py
+
+# 查找写法相似的字
+python3 glyph_search.py --char 水
+python3 glyph_search.py --image unknown.png -k 20
+python3 glyph_search.py --char 水 --ivf --nprobe 16     # 大规模字形库
+
+# 基准测试（字形不足时用平移 + 噪声扩充）
+python3 glyph_search.py --benchmark --sizes 10000,100000
+
+# 在代码中使用
+from glyph_tensor import GlyphTensor
+from glyph_search import GlyphSearchIndex
+
+tensor = GlyphTensor('collected_characters/glyph_tensor')
+index = GlyphSearchIndex.build(tensor)
+for row, score in index.search(index.features_for_row(tensor.rows_for('水')[0]), k=5)[0]:
+    print(tensor.rows[row]['char'], score)
+"""
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+字形张量导出（NumPy memmap）
+把字形目录中的全部变体解码一次，归一化为固定尺寸灰度图，写入一个 .npy 文件，
+相似度搜索 / 模型训练直接 np.load(mmap_mode='r') 读取，不再重复解码 PNG
+
+存储结构:
+    collected_characters/glyph_tensor/
+        glyphs.npy          # uint8 (N, size, size)，白底黑字
+        codepoints.npy      # uint32 (N,)，每行的汉字码位
+        rows.jsonl          # 每行一条 {"char", "variant_id", "sha256"}
+
+- .npy 头固定为 128 字节，追加新字时只在文件末尾写入新行并原地更新头中的 shape，不重写整个文件
+- glyphs.npy 的头最后更新，是提交点：中途中断时多写的数据在下次追加时截掉，读取方只看到完整的行
+- 变体内容变化（sha256 不同）时追加新行，旧行保留；GlyphTensor 按 (汉字, 变体ID) 取最新的一行，
+  --rebuild 重新生成紧凑的文件
+- 解码 + 归一化在进程池中完成
+"""
+
+import ast
+import json
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from glyph_catalog import GlyphCatalog
+
+
+TENSOR_DIR = "glyph_tensor"
+GLYPHS_FILENAME = "glyphs.npy"
+CODEPOINTS_FILENAME = "codepoints.npy"
+ROWS_FILENAME = "rows.jsonl"
+
+DEFAULT_SIZE = 64
+DEFAULT_MARGIN = 4      # 归一化后字形四周的留白（像素）
+INK_THRESHOLD = 250     # 小于该灰度值的像素视为笔画（用于裁剪）
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_SIZE = 128
+
+
+# ============================================================================
+# 可追加的 .npy 文件
+# ============================================================================
+
+def _npy_header(dtype, shape) -> bytes:
+    """固定长度的 .npy v1.0 头（shape 变化时可以原地改写）"""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (np.dtype(dtype).str, tuple(shape))
+    body = header.encode('latin1')
+    padding = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - len(body) - 1
+    if padding < 0:
+        raise ValueError(f"npy header too long: {header}")
+    return NPY_MAGIC + struct.pack('<H', NPY_HEADER_SIZE - len(NPY_MAGIC) - 2) + body + b' ' * padding + b'\n'
+
+
+def _read_npy_header(path: Path) -> Tuple[np.dtype, Tuple[int, ...]]:
+    with open(path, 'rb') as f:
+        prefix = f.read(len(NPY_MAGIC) + 2)
+        if prefix[:len(NPY_MAGIC)] != NPY_MAGIC:
+            raise ValueError(f"Not an appendable npy file: {path}")
+        (length,) = struct.unpack('<H', prefix[len(NPY_MAGIC):])
+        if length + len(prefix) != NPY_HEADER_SIZE:
+            raise ValueError(f"Unexpected npy header size in {path}")
+        header = ast.literal_eval(f.read(length).decode('latin1'))
+    return np.dtype(header['descr']), tuple(header['shape'])
+
+
+class AppendableNpy:
+    """按行追加的 .npy 文件（第一维可增长）"""
+
+    def __init__(self, path, dtype, row_shape: Sequence[int] = ()):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.row_bytes = int(np.prod(self.row_shape, dtype=np.int64)) * self.dtype.itemsize
+
+        if self.path.exists():
+            dtype, shape = _read_npy_header(self.path)
+            if dtype != self.dtype or shape[1:] != self.row_shape:
+                raise ValueError(f"{self.path}: {dtype} {shape[1:]} != {self.dtype} {self.row_shape}")
+            self.count = shape[0]
+        else:
+            self.count = 0
+            with open(self.path, 'wb') as f:
+                f.write(_npy_header(self.dtype, (0,) + self.row_shape))
+
+        self._file = open(self.path, 'r+b')
+        # 上次中断时多写的数据
+        self._file.truncate(NPY_HEADER_SIZE + self.count * self.row_bytes)
+        self._file.seek(0, os.SEEK_END)
+
+    def append(self, rows: np.ndarray):
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        if rows.shape[1:] != self.row_shape:
+            raise ValueError(f"row shape {rows.shape[1:]} != {self.row_shape}")
+        self._file.write(rows.tobytes())
+        self.count += len(rows)
+
+    def truncate(self, count: int):
+        """丢弃 count 之后的行（与其他文件对齐）"""
+        self.count = min(self.count, count)
+        self._file.truncate(NPY_HEADER_SIZE + self.count * self.row_bytes)
+        self.commit()
+
+    def commit(self):
+        """写入数据后更新头中的行数"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, (self.count,) + self.row_shape))
+        self._file.flush()
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
+
+
+# ============================================================================
+# 解码 + 归一化（进程池）
+# ============================================================================
+
+def normalize_glyph(path, size: int = DEFAULT_SIZE, margin: int = DEFAULT_MARGIN, crop: bool = True) -> np.ndarray:
+    """
+    读取图片并归一化为 size x size 白底灰度图
+
+    透明区域按白色处理；crop=True 时先裁剪到笔画边界，再等比缩放居中，
+    不同来源的图片留白不同，裁剪后同一个字的不同变体大小一致
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.load()
+        if 'A' in img.getbands() or 'transparency' in img.info:
+            rgba = img.convert('RGBA')
+            background = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+            background.alpha_composite(rgba)
+            gray = background.convert('L')
+        else:
+            gray = img.convert('L')
+
+    if crop:
+        ink = np.asarray(gray) < INK_THRESHOLD
+        rows, cols = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+        if len(rows):
+            gray = gray.crop((int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1))
+
+    inner = max(1, size - 2 * margin)
+    scale = inner / max(gray.size)
+    resized = gray.resize((max(1, round(gray.size[0] * scale)), max(1, round(gray.size[1] * scale))),
+                          Image.Resampling.LANCZOS)
+    canvas = Image.new('L', (size, size), 255)
+    canvas.paste(resized, ((size - resized.size[0]) // 2, (size - resized.size[1]) // 2))
+    return np.asarray(canvas, dtype=np.uint8)
+
+
+def normalize_batch(job: Tuple[List[str], int, int, bool]) -> Tuple[bytes, List[Optional[str]]]:
+    """
+    归一化一批图片（在子进程中运行）
+
+    Returns:
+        (成功的图片按顺序拼接的字节, 每张图片的错误信息（成功为 None）)
+    """
+    paths, size, margin, crop = job
+    pixels, errors = [], []
+    for path in paths:
+        try:
+            pixels.append(normalize_glyph(path, size, margin, crop))
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    data = np.stack(pixels).tobytes() if pixels else b''
+    return data, errors
+
+
+# ============================================================================
+# 读取
+# ============================================================================
+
+class GlyphTensor:
+    """只读字形张量（memmap，O(1) 按行访问）"""
+
+    def __init__(self, tensor_dir):
+        self.tensor_dir = Path(tensor_dir)
+        self.images = np.load(self.tensor_dir / GLYPHS_FILENAME, mmap_mode='r')
+        count = len(self.images)
+        self.codepoints = np.load(self.tensor_dir / CODEPOINTS_FILENAME, mmap_mode='r')[:count]
+
+        self.rows: List[Dict] = []
+        with open(self.tensor_dir / ROWS_FILENAME, 'r', encoding='utf-8') as f:
+            for line in f:
+                if len(self.rows) >= count:
+                    break
+                self.rows.append(json.loads(line))
+
+        # (汉字, 变体ID) -> 最新的行；汉字 -> 行列表
+        self.latest: Dict[Tuple[str, str], int] = {}
+        for i, row in enumerate(self.rows):
+            self.latest[(row['char'], row['variant_id'])] = i
+        self._by_char: Dict[str, List[int]] = {}
+        for (char, _), i in self.latest.items():
+            self._by_char.setdefault(char, []).append(i)
+
+    @property
+    def size(self) -> int:
+        return self.images.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, i) -> np.ndarray:
+        return self.images[i]
+
+    def __contains__(self, char: str) -> bool:
+        return char in self._by_char
+
+    def rows_for(self, char: str) -> List[int]:
+        """汉字的全部变体所在的行（每个变体只取最新一行）"""
+        return list(self._by_char.get(char, []))
+
+    def get(self, char: str, variant_id: Optional[str] = None) -> Optional[np.ndarray]:
+        """汉字的某个变体（默认第一个）"""
+        if variant_id is not None:
+            i = self.latest.get((char, variant_id))
+        else:
+            rows = self._by_char.get(char)
+            i = rows[0] if rows else None
+        return None if i is None else self.images[i]
+
+    def active_rows(self) -> np.ndarray:
+        """每个 (汉字, 变体) 最新的行号（不含被新内容替换的旧行）"""
+        return np.array(sorted(self.latest.values()), dtype=np.int64)
+
+    def iter_rows(self) -> Iterator[Tuple[int, Dict]]:
+        for i in self.active_rows():
+            yield int(i), self.rows[i]
+
+
+# ============================================================================
+# 导出
+# ============================================================================
+
+class GlyphTensorExporter:
+    """字形目录 -> 字形张量（增量追加）"""
+
+    def __init__(self,
+                 data_dir: str = "./collected_characters",
+                 output_dir: Optional[str] = None,
+                 size: int = DEFAULT_SIZE,
+                 margin: int = DEFAULT_MARGIN,
+                 crop: bool = True,
+                 workers: Optional[int] = None,
+                 batch_size: int = 256):
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir) if output_dir else self.data_dir / TENSOR_DIR
+        self.size = size
+        self.margin = margin
+        self.crop = crop
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.catalog = GlyphCatalog(self.data_dir)
+
+    def _existing(self) -> Dict[Tuple[str, str], str]:
+        """已导出的 (汉字, 变体ID) -> sha256"""
+        rows_file = self.output_dir / ROWS_FILENAME
+        glyphs_file = self.output_dir / GLYPHS_FILENAME
+        if not glyphs_file.exists() or not rows_file.exists():
+            return {}
+        _, shape = _read_npy_header(glyphs_file)
+        if shape[1:] != (self.size, self.size):
+            raise ValueError(f"{glyphs_file} has size {shape[1:]}, use --rebuild to change to {self.size}")
+
+        existing = {}
+        with open(rows_file, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                if i >= shape[0]:
+                    break
+                row = json.loads(line)
+                existing[(row['char'], row['variant_id'])] = row.get('sha256')
+        return existing
+
+    def pending(self, existing: Dict[Tuple[str, str], str]) -> List[Dict]:
+        """未导出或内容已变化的变体"""
+        pending = []
+        for char, variant_id, variant in self.catalog.iter_variants():
+            if not variant.get('filename') or not self.catalog.path_for(variant).exists():
+                continue
+            if existing.get((char, variant_id), '') == variant.get('sha256'):
+                continue
+            pending.append({'char': char, 'variant_id': variant_id, 'sha256': variant.get('sha256'),
+                            'path': str(self.catalog.path_for(variant))})
+        # 同一个字的变体相邻，按码位排序
+        pending.sort(key=lambda r: (ord(r['char']), r['variant_id']))
+        return pending
+
+    def run(self, rebuild: bool = False) -> Dict:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if rebuild:
+            for name in (GLYPHS_FILENAME, CODEPOINTS_FILENAME, ROWS_FILENAME):
+                (self.output_dir / name).unlink(missing_ok=True)
+
+        existing = self._existing()
+        pending = self.pending(existing)
+
+        print("=" * 70)
+        print("🧮 字形张量导出")
+        print("=" * 70)
+        print(f"📁 数据目录: {self.data_dir}")
+        print(f"💾 输出目录: {self.output_dir}")
+        print(f"📐 尺寸: {self.size}x{self.size}  裁剪: {'是' if self.crop else '否'}  进程数: {self.workers}")
+        print(f"📊 已导出: {len(existing)}  待导出: {len(pending)}")
+        print()
+
+        stats = {'existing': len(existing), 'appended': 0, 'errors': 0}
+        glyphs = AppendableNpy(self.output_dir / GLYPHS_FILENAME, np.uint8, (self.size, self.size))
+        codepoints = AppendableNpy(self.output_dir / CODEPOINTS_FILENAME, np.uint32)
+
+        # rows.jsonl 与 glyphs.npy 对齐（截掉上次中断时多写的行）
+        rows_file = self.output_dir / ROWS_FILENAME
+        kept = []
+        if rows_file.exists():
+            with open(rows_file, 'r', encoding='utf-8') as f:
+                kept = [line for _, line in zip(range(glyphs.count), f)]
+        if codepoints.count > glyphs.count:
+            codepoints.truncate(glyphs.count)
+        if len(kept) != glyphs.count or codepoints.count != glyphs.count:
+            glyphs.close()
+            codepoints.close()
+            raise ValueError(f"{self.output_dir} is inconsistent, use --rebuild")
+        with open(rows_file, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+
+        started = time.perf_counter()
+        jobs = [([r['path'] for r in pending[i:i + self.batch_size]], self.size, self.margin, self.crop)
+                for i in range(0, len(pending), self.batch_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor, \
+                    open(rows_file, 'a', encoding='utf-8') as rows_out:
+                for batch_index, (data, errors) in enumerate(executor.map(normalize_batch, jobs)):
+                    batch = pending[batch_index * self.batch_size:(batch_index + 1) * self.batch_size]
+                    ok = [r for r, error in zip(batch, errors) if error is None]
+                    for record, error in zip(batch, errors):
+                        if error is not None:
+                            stats['errors'] += 1
+                            print(f"❌ {record['char']} {record['variant_id']}: {error}")
+                    if not ok:
+                        continue
+
+                    glyphs.append(np.frombuffer(data, dtype=np.uint8).reshape(-1, self.size, self.size))
+                    codepoints.append(np.array([ord(r['char']) for r in ok], dtype=np.uint32))
+                    for record in ok:
+                        rows_out.write(json.dumps({'char': record['char'], 'variant_id': record['variant_id'],
+                                                   'sha256': record['sha256']}, ensure_ascii=False) + '\n')
+                    rows_out.flush()
+                    stats['appended'] += len(ok)
+
+                    # glyphs.npy 的头最后更新（提交点）
+                    codepoints.commit()
+                    glyphs.commit()
+                    if stats['appended'] % (self.batch_size * 16) < len(ok):
+                        print(f"  进度: {stats['appended']}/{len(pending)}")
+        finally:
+            glyphs.close()
+            codepoints.close()
+        elapsed = time.perf_counter() - started
+
+        stats['rows'] = stats['existing'] + stats['appended']
+        stats['seconds'] = round(elapsed, 3)
+        stats['glyphs_per_second'] = round(stats['appended'] / elapsed, 1) if elapsed else 0.0
+        stats['bytes'] = (self.output_dir / GLYPHS_FILENAME).stat().st_size
+
+        print()
+        print("=" * 70)
+        print("🎉 导出完成！")
+        print("=" * 70)
+        print(f"   新增: {stats['appended']}  失败: {stats['errors']}  总行数: {glyphs.count}")
+        print(f"   文件: {stats['bytes'] / 1024 / 1024:.1f} MB  "
+              f"用时: {elapsed:.2f}s ({stats['glyphs_per_second']:.0f} 字/秒)")
+        print("=" * 70)
+        return stats
+
+
+def benchmark(data_dir: str, tensor_dir: Optional[str] = None, count: int = 2000, size: int = DEFAULT_SIZE):
+    """每次解码 PNG / 从 memmap 读取"""
+    tensor_dir = Path(tensor_dir) if tensor_dir else Path(data_dir) / TENSOR_DIR
+    tensor = GlyphTensor(tensor_dir)
+    catalog = GlyphCatalog(data_dir)
+    paths = [catalog.path_for(catalog.get_variant(row['char'], row['variant_id']))
+             for _, row in tensor.iter_rows()][:count]
+
+    print("=" * 70)
+    print("⏱️  字形读取基准测试")
+    print("=" * 70)
+
+    started = time.perf_counter()
+    for path in paths:
+        normalize_glyph(path, size)
+    decode = len(paths) / (time.perf_counter() - started)
+    print(f"   解码 PNG + 归一化   {decode:>12.0f} 字/秒")
+
+    rows = np.random.default_rng(0).integers(0, len(tensor), len(paths) * 50)
+    started = time.perf_counter()
+    for i in rows:
+        np.asarray(tensor[i])
+    mmap = len(rows) / (time.perf_counter() - started)
+    print(f"   memmap 随机读取     {mmap:>12.0f} 字/秒  ({mmap / decode:.0f}x)")
+    print("=" * 70)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='导出 NumPy memmap 字形张量')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--output', '-o', help='输出目录（默认 <数据目录>/glyph_tensor）')
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE, help='归一化尺寸')
+    parser.add_argument('--margin', type=int, default=DEFAULT_MARGIN, help='留白（像素）')
+    parser.add_argument('--no-crop', action='store_true', help='不裁剪到笔画边界，整张图缩放')
+    parser.add_argument('--workers', '-j', type=int, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--rebuild', action='store_true', help='删除已有文件重新导出')
+    parser.add_argument('--benchmark', action='store_true', help='对比解码 PNG 和 memmap 读取')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.data_dir, args.output, size=args.size)
+        return
+
+    exporter = GlyphTensorExporter(args.data_dir, args.output, args.size, args.margin,
+                                   not args.no_crop, args.workers)
+    exporter.run(rebuild=args.rebuild)
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 导出（首次全部解码，之后只追加新变体）
+python3 glyph_tensor.py
+python3 glyph_tensor.py --size 96 --rebuild
+
+# 基准测试
+python3 glyph_tensor.py --benchmark
+
+# 在代码中使用
+import numpy as np
+images = np.load('collected_characters/glyph_tensor/glyphs.npy', mmap_mode='r')   # (N, 64, 64) uint8
+codepoints = np.load('collected_characters/glyph_tensor/codepoints.npy', mmap_mode='r')[:len(images)]
+
+from glyph_tensor import GlyphTensor
+tensor = GlyphTensor('collected_characters/glyph_tensor')
+water = tensor.get('水')
+"""
@@ -1,20 +1,204 @@
 #!/usr/bin/env python3
 """
 图片匹配工具 - 使用简单的方式建立图片和汉字的映射
-基于文件修改时间和采集顺序
+基于请求/响应日志的时间戳和采集顺序
+
+匹配方式: 把请求事件和图片事件分别按时间排序建立索引，
+每张图片用二分查找匹配时间最近的汉字请求（默认只匹配图片之前的请求，且在容差内），
+总复杂度 O(n log n)；日志逐个流式读取，不会把全部 JSON 载入内存
 """
 
 import json
+import os
+from bisect import bisect_right
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
+from typing import Iterator, List, NamedTuple, Optional
+
+from flow_utils import decode_cn_char
+
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+
+class RequestEvent(NamedTuple):
+    time: float
+    seq: int
+    url: str
+    cn_char_param: str
+    cn_char: str
+
+
+class ImageEvent(NamedTuple):
+    time: float
+    seq: int
+    path: str
+
+
+def _seq_from_name(name: str) -> int:
+    """request_171130_006.json / image_171130_006.png -> 6"""
+    try:
+        return int(Path(name).stem.rsplit('_', 1)[-1])
+    except ValueError:
+        return -1
+
+
+def _event_time(data: dict, path: str) -> float:
+    """日志中的 ISO 时间戳，缺失时使用文件修改时间"""
+    try:
+        return datetime.fromisoformat(data['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return os.stat(path).st_mtime
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def iter_request_events(log_dir: Path) -> Iterator[RequestEvent]:
+    """逐个读取 request_*.json，只产出汉字查询请求（api=queryDict 或带 cnChar 参数）"""
+    with os.scandir(log_dir) as entries:
+        for entry in entries:
+            if not (entry.name.startswith('request_') and entry.name.endswith('.json')):
+                continue
+            data = _read_json(entry.path)
+            if data is None:
+                continue
+
+            params = data.get('query_params') or {}
+            cn_char_param = params.get('cnChar', '')
+            if not cn_char_param and params.get('api') != 'queryDict':
+                continue
+
+            yield RequestEvent(
+                time=_event_time(data, entry.path),
+                seq=_seq_from_name(entry.name),
+                url=data.get('url', ''),
+                cn_char_param=cn_char_param,
+                cn_char=(data.get('decoded_params') or {}).get('cnChar_decoded')
+                or decode_cn_char(cn_char_param)
+            )
+
+
+def iter_image_events(log_dir: Path) -> Iterator[ImageEvent]:
+    """
+    图片事件: 优先使用 response_*.json 中记录的保存时间（image_saved），
+    没有响应日志的图片使用文件修改时间
+    """
+    seen = set()
+    with os.scandir(log_dir) as entries:
+        for entry in entries:
+            if not (entry.name.startswith('response_') and entry.name.endswith('.json')):
+                continue
+            data = _read_json(entry.path)
+            if not data or not data.get('image_saved'):
+                continue
+            name = Path(data['image_saved']).name
+            path = log_dir / name
+            if not path.exists():
+                continue
+            seen.add(name)
+            yield ImageEvent(_event_time(data, entry.path), _seq_from_name(name), str(path))
+
+    with os.scandir(log_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('image_') and entry.name.endswith(IMAGE_SUFFIXES) \
+                    and entry.name not in seen:
+                yield ImageEvent(entry.stat().st_mtime, _seq_from_name(entry.name), entry.path)
+
+
+def iter_capture_events(log_dir: Path):
+    """
+    从 JSONL 抓包日志（DEBUG_CAPTURE_LOG=1）读取事件，产出 RequestEvent / ImageEvent
+
+    图片事件的路径指向内容寻址存储 debug_logs/objects/ 中的文件
+    """
+    from capture_log import iter_capture_records
+    from content_store import ContentStore
+
+    store = ContentStore(log_dir / "objects", create=False)  # 只读，不创建目录
+    for record in iter_capture_records(log_dir / "capture", kinds={'request', 'response'}):
+        try:
+            time_ = datetime.fromisoformat(record['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        if record['kind'] == 'request':
+            params = record.get('query_params') or {}
+            cn_char_param = params.get('cnChar', '')
+            if not cn_char_param and params.get('api') != 'queryDict':
+                continue
+            yield RequestEvent(time_, record['seq'], record.get('url', ''), cn_char_param,
+                               (record.get('decoded_params') or {}).get('cnChar_decoded')
+                               or decode_cn_char(cn_char_param))
+        elif record.get('body_sha256'):
+            yield ImageEvent(time_, record['seq'], str(store.path_for(record['body_sha256'])))
+
+
+def nearest_join(images: List[ImageEvent],
+                 requests: List[RequestEvent],
+                 tolerance: float = 5.0,
+                 direction: str = 'backward') -> List[dict]:
+    """
+    时间最近邻连接
+
+    Args:
+        images: 图片事件
+        requests: 按 (time, seq) 排序的请求事件
+        tolerance: 最大时间差（秒）
+        direction: 'backward' 只匹配图片之前的请求（响应总在请求之后），
+                   'nearest' 匹配前后最近的请求
+
+    Returns:
+        匹配结果列表（未匹配的图片不包含在内）
+    """
+    times = [r.time for r in requests]
+    matches = []
+
+    for image in images:
+        pos = bisect_right(times, image.time)
+        candidates = []
+        if pos > 0:
+            candidates.append(requests[pos - 1])
+        if direction == 'nearest' and pos < len(requests):
+            candidates.append(requests[pos])
+
+        best = None
+        for request in candidates:
+            delta = abs(image.time - request.time)
+            if delta <= tolerance and (best is None or delta < best[0]):
+                best = (delta, request)
+        if best is None:
+            continue
+
+        delta, request = best
+        matches.append({
+            'image': Path(image.path).name,
+            'request_url': request.url,
+            'cn_char_param': request.cn_char_param,
+            'cn_char': request.cn_char,
+            'timestamp': datetime.fromtimestamp(image.time).isoformat(),
+            'request_timestamp': datetime.fromtimestamp(request.time).isoformat(),
+            'delta_seconds': round(image.time - request.time, 3),
+            'image_seq': image.seq,
+            'request_seq': request.seq
+        })
+
+    return matches
+
 
 class ImageMatcher:
     """图片匹配器"""
 
-    def __init__(self):
+    def __init__(self, tolerance: float = 5.0, direction: str = 'backward'):
         self.chars_dir = Path("./collected_characters")
         self.debug_logs_dir = Path("./debug_logs")
+        self.tolerance = tolerance
+        self.direction = direction
 
     def match_by_timestamp(self):
         """通过时间戳匹配图片和请求"""
@@ -22,78 +206,45 @@ class ImageMatcher:
         print("🔗 根据时间戳匹配图片和请求")
         print("=" * 70)
 
-        # 读取所有图片文件
-        images = {}
-        for img_file in self.chars_dir.glob("*.png"):
-            mtime = img_file.stat().st_mtime
-            images[img_file.name] = {
-                'path': img_file,
-                'timestamp': mtime,
-                'datetime': datetime.fromtimestamp(mtime)
-            }
-
-        print(f"📊 collected_characters/: {len(images)} 张图片")
-
-        # 读取debug_logs中的图片
-        debug_images = {}
-        if self.debug_logs_dir.exists():
-            for img_file in self.debug_logs_dir.glob("image_*.png"):
-                mtime = img_file.stat().st_mtime
-                debug_images[img_file.name] = {
-                    'path': img_file,
-                    'timestamp': mtime,
-                    'datetime': datetime.fromtimestamp(mtime)
-                }
-
-            print(f"📊 debug_logs/: {len(debug_images)} 张图片")
-
-            # 读取对应的请求日志
-            request_logs = {}
-            for req_file in self.debug_logs_dir.glob("request_*.json"):
-                try:
-                    with open(req_file, 'r', encoding='utf-8') as f:
-                        req_data = json.load(f)
-                        request_logs[req_file.stem] = req_data
-                except:
-                    pass
-
-            print(f"📊 request logs: {len(request_logs)}")
-
-            # 匹配逻辑：根据时间戳和序号
-            matches = []
-            for img_name, img_info in sorted(debug_images.items(), key=lambda x: x[1]['timestamp']):
-                # 从文件名提取序号 (image_171130_006.png -> 006)
-                parts = img_name.replace('image_', '').replace('.png', '').split('_')
-                if len(parts) >= 2:
-                    seq = parts[1]
-
-                    # 查找对应的请求
-                    req_key = f"request_{parts[0]}_{seq}"
-                    if req_key in request_logs:
-                        req = request_logs[req_key]
-                        matches.append({
-                            'image': img_name,
-                            'request_url': req.get('url', ''),
-                            'cn_char_param': req.get('query_params', {}).get('cnChar', ''),
-                            'timestamp': img_info['datetime'].isoformat()
-                        })
-
-            print(f"\n✅ 成功匹配: {len(matches)} 个")
-
-            # 保存匹配结果
-            if matches:
-                match_file = self.chars_dir / "image_request_mapping.json"
-                with open(match_file, 'w', encoding='utf-8') as f:
-                    json.dump(matches, f, indent=2, ensure_ascii=False)
-
-                print(f"💾 保存到: {match_file}")
-
-                # 显示前几个匹配
-                print("\n📋 匹配示例:")
-                for match in matches[:5]:
-                    print(f"   {match['image']} <- {match['request_url']}")
+        if not self.debug_logs_dir.exists():
+            print(f"⚠️  未找到日志目录: {self.debug_logs_dir}")
+            print("=" * 70)
+            return []
+
+        requests = list(iter_request_events(self.debug_logs_dir))
+        images = list(iter_image_events(self.debug_logs_dir))
+        if (self.debug_logs_dir / "capture").exists():
+            for event in iter_capture_events(self.debug_logs_dir):
+                (requests if isinstance(event, RequestEvent) else images).append(event)
+        requests.sort()
+        images.sort()
+
+        print(f"📊 debug_logs/: {len(images)} 张图片")
+        print(f"📊 汉字请求: {len(requests)}")
+        print(f"🎯 时间容差: {self.tolerance}s ({self.direction})")
+
+        matches = nearest_join(images, requests, self.tolerance, self.direction)
+
+        print(f"\n✅ 成功匹配: {len(matches)} 个")
+        print(f"⚠️  未匹配: {len(images) - len(matches)} 个")
+
+        # 保存匹配结果
+        if matches:
+            self.chars_dir.mkdir(exist_ok=True)
+            match_file = self.chars_dir / "image_request_mapping.json"
+            with open(match_file, 'w', encoding='utf-8') as f:
+                json.dump(matches, f, indent=2, ensure_ascii=False)
+
+            print(f"💾 保存到: {match_file}")
+
+            # 显示前几个匹配
+            print("\n📋 匹配示例:")
+            for match in matches[:5]:
+                print(f"   {match['image']} <- {match['cn_char'] or match['request_url']} "
+                      f"(Δ{match['delta_seconds']}s)")
 
         print("=" * 70)
+        return matches
 
     def suggest_manual_labeling(self):
         """生成手动标注模板"""
@@ -128,7 +279,15 @@ class ImageMatcher:
 
 
 def main():
-    matcher = ImageMatcher()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='匹配 debug_logs 中的图片和汉字请求')
+    parser.add_argument('--tolerance', type=float, default=5.0, help='最大时间差（秒）')
+    parser.add_argument('--direction', choices=['backward', 'nearest'], default='backward',
+                        help='backward: 只匹配图片之前的请求; nearest: 前后最近')
+    args = parser.parse_args()
+
+    matcher = ImageMatcher(args.tolerance, args.direction)
     matcher.match_by_timestamp()
     matcher.suggest_manual_labeling()
 
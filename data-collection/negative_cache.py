@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+负缓存 - 记录查询无结果的汉字
+重复运行时在 TTL 到期前跳过已知无结果的字符，减少无效请求
+"""
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+# 失败原因代码
+REASON_NO_URL = 'no_url'              # 响应正常，但没有找到图片 URL
+REASON_HTTP_ERROR = 'http_error'      # 请求失败 / 非 200 状态码
+REASON_DECODE_ERROR = 'decode_error'  # 响应无法解析（JSON / base64 / 图片数据）
+
+# 各原因的默认 TTL（秒）
+# no_url 基本是服务端没有数据，缓存较久；http_error 多为临时故障，很快重试
+DEFAULT_TTLS = {
+    REASON_NO_URL: 7 * 24 * 3600,
+    REASON_HTTP_ERROR: 3600,
+    REASON_DECODE_ERROR: 24 * 3600,
+}
+
+
+class NegativeCache:
+    """持久化负缓存（JSON 文件，按字符索引）"""
+
+    def __init__(self, cache_file: Path, ttls: Optional[Dict[str, float]] = None):
+        """
+        初始化负缓存
+
+        Args:
+            cache_file: 缓存文件路径
+            ttls: 各原因的 TTL（秒），未指定的使用 DEFAULT_TTLS
+        """
+        self.cache_file = Path(cache_file)
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self.entries: Dict[str, Dict] = {}
+        self._dirty = False
+
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                print(f"⚠️  负缓存文件损坏，已忽略: {self.cache_file}")
+                self.entries = {}
+
+    def record(self, char: str, reason: str, detail: str = ""):
+        """
+        记录一次失败
+
+        同一字符连续失败时 TTL 按次数加倍（最多 8 倍），避免反复查询
+        """
+        if reason not in self.ttls:
+            raise ValueError(f"Unknown negative cache reason: {reason}")
+
+        previous = self.entries.get(char)
+        attempts = previous['attempts'] + 1 if previous and previous['reason'] == reason else 1
+        ttl = self.ttls[reason] * min(2 ** (attempts - 1), 8)
+        now = time.time()
+
+        self.entries[char] = {
+            'reason': reason,
+            'detail': detail[:200],
+            'attempts': attempts,
+            'first_seen': previous['first_seen'] if previous else datetime.now().isoformat(),
+            'last_seen': datetime.now().isoformat(),
+            'expires_at': now + ttl
+        }
+        self._dirty = True
+
+    def is_cached(self, char: str, now: Optional[float] = None) -> bool:
+        """字符是否在负缓存中且未过期"""
+        entry = self.entries.get(char)
+        if entry is None:
+            return False
+        return entry['expires_at'] > (now or time.time())
+
+    def reason(self, char: str) -> Optional[str]:
+        """返回未过期条目的失败原因"""
+        if self.is_cached(char):
+            return self.entries[char]['reason']
+        return None
+
+    def discard(self, char: str):
+        """移除字符（采集成功后调用）"""
+        if self.entries.pop(char, None) is not None:
+            self._dirty = True
+
+    def filter(self, chars: Iterable[str]) -> List[str]:
+        """过滤掉负缓存中未过期的字符"""
+        now = time.time()
+        return [c for c in chars if not self.is_cached(c, now)]
+
+    def purge_expired(self) -> int:
+        """删除已过期条目，返回删除数量"""
+        now = time.time()
+        expired = [c for c, e in self.entries.items() if e['expires_at'] <= now]
+        for char in expired:
+            del self.entries[char]
+        if expired:
+            self._dirty = True
+        return len(expired)
+
+    def summary(self) -> Dict[str, int]:
+        """按原因统计未过期条目"""
+        now = time.time()
+        counts = {reason: 0 for reason in self.ttls}
+        for entry in self.entries.values():
+            if entry['expires_at'] > now:
+                counts[entry['reason']] = counts.get(entry['reason'], 0) + 1
+        return counts
+
+    def save(self):
+        """写回缓存文件（无变化时跳过）"""
+        if not self._dirty:
+            return
+
+        self.purge_expired()
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        tmp_file.replace(self.cache_file)
+        self._dirty = False
+
+
+def main():
+    """查看 / 清理负缓存"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看或清理负缓存')
+    parser.add_argument('--file', default='./collected_characters/negative_cache.json',
+                        help='负缓存文件')
+    parser.add_argument('--clear', action='store_true', help='清空全部条目')
+    parser.add_argument('--forget', nargs='*', default=[], help='移除指定字符')
+    args = parser.parse_args()
+
+    cache = NegativeCache(Path(args.file))
+
+    if args.clear:
+        cache.entries = {}
+        cache._dirty = True
+    for char in args.forget:
+        cache.discard(char)
+
+    purged = cache.purge_expired()
+    cache.save()
+
+    print("=" * 70)
+    print("🚫 负缓存")
+    print("=" * 70)
+    print(f"📁 文件: {cache.cache_file}")
+    print(f"🧹 已清理过期条目: {purged}")
+    for reason, count in cache.summary().items():
+        print(f"   {reason}: {count}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 查看负缓存统计
+python3 negative_cache.py
+
+# 强制重新查询某些字符
+python3 negative_cache.py --forget 水 火
+
+# 清空负缓存
+python3 negative_cache.py --clear
+
+# 采集时忽略负缓存
+CLOUDBRUSH_IGNORE_NEGATIVE_CACHE=1 python3 api_collector.py
+"""
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+感知哈希去重
+找出 debug_logs/、collected_characters/ 和重复下载中"看起来相同但字节不同"的图片
+
+- dHash / pHash 在 NumPy 中按批次向量化计算（多进程解码）
+- 多索引汉明查找（分段哈希表），聚类复杂度远低于两两比较
+- 生成聚类报告；--apply 时保留每个聚类中最好的一份，其余移动到 duplicates/
+"""
+
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from glyph_catalog import GlyphCatalog
+
+
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif'}
+SKIP_DIRS = {'duplicates', 'atlases'}
+DUPLICATES_DIR = "duplicates"
+REPORT_FILENAME = "dedup_report.json"
+
+HASH_SIZE = 8           # 8x8 = 64 bit
+PHASH_IMAGE_SIZE = 32   # pHash 在 32x32 上做 DCT
+BATCH_SIZE = 256
+
+
+# ============================================================================
+# 哈希计算（向量化）
+# ============================================================================
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """正交 DCT-II 矩阵"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_IMAGE_SIZE)
+
+
+def _pack_bits(bits: np.ndarray) -> List[int]:
+    """(n, 64) 布尔矩阵 -> n 个 64 位整数"""
+    packed = np.packbits(bits.reshape(len(bits), -1), axis=1)
+    return [int(v) for v in packed.view('>u8').ravel()]
+
+
+def dhash_batch(pixels: np.ndarray) -> List[int]:
+    """差值哈希: pixels 形状 (n, 8, 9)，比较相邻列"""
+    return _pack_bits(pixels[:, :, 1:] > pixels[:, :, :-1])
+
+
+def phash_batch(pixels: np.ndarray) -> List[int]:
+    """DCT 哈希: pixels 形状 (n, 32, 32)，取左上 8x8 低频系数与中位数比较（忽略直流分量）"""
+    coeffs = _DCT @ pixels @ _DCT.T
+    low = coeffs[:, :HASH_SIZE, :HASH_SIZE].reshape(len(pixels), -1)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return _pack_bits(low > median)
+
+
+def _load_gray(path: str):
+    """读取为白底灰度图（透明区域按白色处理）"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.load()
+        if 'A' in img.getbands() or 'transparency' in img.info:
+            rgba = img.convert('RGBA')
+            background = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+            background.alpha_composite(rgba)
+            gray = background.convert('L')
+        else:
+            gray = img.convert('L')
+        return gray, img.size
+
+
+def hash_batch(paths: Sequence[str]) -> List[Dict]:
+    """解码一批图片并计算 dHash/pHash（在子进程中运行）"""
+    from PIL import Image
+
+    records, dpix, ppix = [], [], []
+    for path in paths:
+        try:
+            gray, (width, height) = _load_gray(path)
+        except Exception as e:
+            records.append({'path': path, 'error': str(e)})
+            continue
+        dpix.append(np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS),
+                               dtype=np.float32))
+        ppix.append(np.asarray(gray.resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.Resampling.LANCZOS),
+                               dtype=np.float32))
+        records.append({'path': path, 'width': width, 'height': height,
+                        'size': os.path.getsize(path), 'error': None})
+
+    if dpix:
+        dhashes = dhash_batch(np.stack(dpix))
+        phashes = phash_batch(np.stack(ppix))
+        ok = (r for r in records if r['error'] is None)
+        for record, dh, ph in zip(ok, dhashes, phashes):
+            record['dhash'] = dh
+            record['phash'] = ph
+
+    return records
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+# ============================================================================
+# 多索引汉明查找（Multi-Index Hashing）
+# ============================================================================
+
+class MultiIndexHamming:
+    """
+    64 位哈希拆成 4 段 16 位，每段一张哈希表
+
+    鸽巢原理: 汉明距离 <= r 时，至少有一段的距离 <= r // 4，
+    因此只需在每段中枚举距离 <= r // 4 的键，候选数量远小于全量，再逐个确认
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self, radius: int):
+        self.radius = radius
+        self.tables = [dict() for _ in range(self.CHUNKS)]
+        self.values: List[int] = []
+
+        # 段内需要枚举的翻转掩码（距离 <= r // 4）
+        self.probe_masks = [0]
+        for _ in range(radius // self.CHUNKS):
+            self.probe_masks = sorted({m | (1 << b) for m in self.probe_masks
+                                       for b in range(self.CHUNK_BITS)} | set(self.probe_masks))
+
+    def _chunks(self, value: int) -> List[int]:
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(value >> (i * self.CHUNK_BITS)) & mask for i in range(self.CHUNKS)]
+
+    def add(self, value: int) -> int:
+        index = len(self.values)
+        self.values.append(value)
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            table.setdefault(chunk, []).append(index)
+        return index
+
+    def query(self, value: int) -> List[Tuple[int, int]]:
+        """返回距离 <= radius 的 [(距离, 下标), ...]"""
+        candidates = set()
+        for table, chunk in zip(self.tables, self._chunks(value)):
+            for mask in self.probe_masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+
+        found = []
+        for index in candidates:
+            distance = hamming(value, self.values[index])
+            if distance <= self.radius:
+                found.append((distance, index))
+        return found
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def cluster_hashes(records: List[Dict], phash_threshold: int = 6,
+                   dhash_threshold: int = 10) -> List[List[int]]:
+    """
+    按 pHash 聚类（dHash 二次确认，减少误判）
+
+    Returns:
+        聚类列表，每个聚类为 records 下标列表（只包含大小 >= 2 的聚类）
+    """
+    hash_index = MultiIndexHamming(phash_threshold)
+    for record in records:
+        hash_index.add(record['phash'])
+
+    uf = _UnionFind(len(records))
+    for index, record in enumerate(records):
+        for _, other in hash_index.query(record['phash']):
+            if other > index and hamming(record['dhash'], records[other]['dhash']) <= dhash_threshold:
+                uf.union(index, other)
+
+    groups: Dict[int, List[int]] = {}
+    for index in range(len(records)):
+        groups.setdefault(uf.find(index), []).append(index)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+# ============================================================================
+# 去重流程
+# ============================================================================
+
+class PerceptualDeduplicator:
+    """感知哈希去重器"""
+
+    def __init__(self,
+                 data_dir: str = "./collected_characters",
+                 extra_dirs: Iterable[str] = ("./debug_logs",),
+                 phash_threshold: int = 6,
+                 dhash_threshold: int = 10,
+                 workers: Optional[int] = None):
+        self.data_dir = Path(data_dir)
+        self.scan_dirs = [self.data_dir] + [Path(d) for d in extra_dirs]
+        self.phash_threshold = phash_threshold
+        self.dhash_threshold = dhash_threshold
+        self.workers = workers or os.cpu_count() or 1
+        self.catalog = GlyphCatalog(self.data_dir)
+
+        # 登记在目录中的文件: 路径 -> (字符, 变体ID, 是否 primary)
+        self.catalogued = {}
+        for char, variant_id, variant in self.catalog.iter_variants():
+            is_primary = self.catalog.characters[char]['primary'] == variant_id
+            self.catalogued[str(self.catalog.path_for(variant).resolve())] = (char, variant_id, is_primary)
+
+    def collect_files(self) -> List[str]:
+        files = set()
+        for directory in self.scan_dirs:
+            if not directory.exists():
+                continue
+            for path in directory.rglob('*'):
+                if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+                    continue
+                if SKIP_DIRS & set(path.relative_to(directory).parts[:-1]):
+                    continue
+                files.add(str(path.resolve()))
+        return sorted(files)
+
+    def compute_hashes(self, files: List[str]) -> Tuple[List[Dict], List[Dict]]:
+        batches = [files[i:i + BATCH_SIZE] for i in range(0, len(files), BATCH_SIZE)]
+        records, errors = [], []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for batch in tqdm(executor.map(hash_batch, batches), total=len(batches), desc="哈希进度"):
+                for record in batch:
+                    (errors if record['error'] else records).append(record)
+        return records, errors
+
+    def _rank(self, record: Dict) -> Tuple:
+        """保留优先级: primary 变体 > 已登记 > 分辨率高 > 文件小"""
+        info = self.catalogued.get(record['path'])
+        return (
+            bool(info and info[2]),
+            info is not None,
+            record['width'] * record['height'],
+            -record['size']
+        )
+
+    def run(self, apply: bool = False) -> Dict:
+        files = self.collect_files()
+
+        print("=" * 70)
+        print("🧬 感知哈希去重")
+        print("=" * 70)
+        print(f"📁 扫描目录: {', '.join(str(d) for d in self.scan_dirs)}")
+        print(f"📊 图片数: {len(files)}  进程数: {self.workers}")
+        print(f"🎯 阈值: pHash <= {self.phash_threshold}, dHash <= {self.dhash_threshold}")
+        print()
+
+        records, errors = self.compute_hashes(files)
+        clusters = cluster_hashes(records, self.phash_threshold, self.dhash_threshold)
+
+        report_clusters = []
+        moved = 0
+        for members in sorted(clusters, key=len, reverse=True):
+            ranked = sorted((records[i] for i in members), key=self._rank, reverse=True)
+            keeper = ranked[0]
+
+            cluster = {'keep': keeper['path'], 'members': []}
+            for record in ranked:
+                info = self.catalogued.get(record['path'])
+                entry = {
+                    'path': record['path'],
+                    'phash': f"{record['phash']:016x}",
+                    'dhash': f"{record['dhash']:016x}",
+                    'distance': hamming(record['phash'], keeper['phash']),
+                    'width': record['width'],
+                    'height': record['height'],
+                    'size': record['size'],
+                    'char': info[0] if info else None,
+                    'variant_id': info[1] if info else None,
+                    'action': 'keep' if record is keeper else 'duplicate'
+                }
+                # 目录中登记的变体（不同字体的合法变体）只报告，不移动
+                if record is not keeper and info is not None:
+                    entry['action'] = 'catalogued'
+                elif record is not keeper and apply:
+                    entry['moved_to'] = str(self._move_duplicate(Path(record['path'])))
+                    moved += 1
+                cluster['members'].append(entry)
+            report_clusters.append(cluster)
+
+        duplicates = sum(1 for c in report_clusters for m in c['members'] if m['action'] == 'duplicate')
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'applied': apply,
+            'images': len(files),
+            'hashed': len(records),
+            'errors': len(errors),
+            'clusters': len(report_clusters),
+            'duplicates': duplicates,
+            'moved': moved,
+            'phash_threshold': self.phash_threshold,
+            'dhash_threshold': self.dhash_threshold,
+            'cluster_list': report_clusters,
+            'error_files': [{'path': r['path'], 'error': r['error']} for r in errors][:50]
+        }
+
+        report_file = self.data_dir / REPORT_FILENAME
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print()
+        print("=" * 70)
+        print("🎉 去重完成！" if apply else "🎉 分析完成！")
+        print("=" * 70)
+        print(f"   已哈希: {len(records)}  错误: {len(errors)}")
+        print(f"   聚类数: {len(report_clusters)}  可去除重复: {duplicates}")
+        if apply:
+            print(f"   已移动: {moved} -> {self.data_dir / DUPLICATES_DIR}")
+        print(f"   报告文件: {report_file}")
+        print("=" * 70)
+        return report
+
+    def _move_duplicate(self, path: Path) -> Path:
+        """移动到 duplicates/（保留来源目录结构，可随时恢复）"""
+        for directory in self.scan_dirs:
+            try:
+                relative = path.relative_to(directory.resolve())
+                target = self.data_dir / DUPLICATES_DIR / directory.resolve().name / relative
+                break
+            except ValueError:
+                continue
+        else:
+            target = self.data_dir / DUPLICATES_DIR / path.name
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(path), str(target))
+        return target
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='感知哈希去重')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--extra-dirs', nargs='*', default=['./debug_logs'], help='额外扫描的目录')
+    parser.add_argument('--phash-threshold', type=int, default=6, help='pHash 汉明距离阈值')
+    parser.add_argument('--dhash-threshold', type=int, default=10, help='dHash 汉明距离阈值')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--apply', action='store_true', help='移动重复文件到 duplicates/')
+    args = parser.parse_args()
+
+    deduplicator = PerceptualDeduplicator(args.data_dir, args.extra_dirs,
+                                          args.phash_threshold, args.dhash_threshold, args.workers)
+    deduplicator.run(apply=args.apply)
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 安装依赖
+pip install pillow numpy tqdm
+
+# 分析重复（只生成报告）
+python3 phash_dedup.py
+
+# 执行去重：每个聚类保留最好的一份，其余移动到 collected_characters/duplicates/
+python3 phash_dedup.py --apply
+
+# 更严格的阈值
+python3 phash_dedup.py --phash-threshold 4 --dhash-threshold 6
+
+说明:
+=====
+- 保留优先级: primary 变体 > 目录中登记的变体 > 分辨率高 > 文件小
+- 目录中登记的其他变体只在报告中标记为 catalogued，不会被移动
+- 报告: collected_characters/dedup_report.json
+"""
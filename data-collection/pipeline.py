@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+"""
+数据处理流水线：下载 → OCR → 优化 → 上传
+代替手动依次运行 download_from_urls.py / ocr_recognizer.py / png_optimizer.py /
+derivatives.py / upload-data.py，每个脚本都重新扫描整个目录
+
+- 各阶段是独立的线程组，通过有界队列连接，图片下载完就进入后续阶段，多个阶段并行
+- CPU 密集的优化阶段把任务交给进程池
+- 每个阶段记录处理过的输入指纹（pipeline_state.json），只处理上游状态变化的条目：
+    download  URL 未下载过
+    ocr       未归属图片的 sha256 没有识别结果
+    optimize  变体 sha256 与上次优化后的 sha256 不同
+    upload    变体 sha256 + 衍生文件与上次上传时不同
+
+数据流:
+    url_index.sqlite3 / URL 文本文件
+        → download（已知汉字直接存入字形目录；未知的存到 unknown/）
+        → ocr（识别 unknown/ 中的图片并存入字形目录）
+        → optimize（PNG 无损压缩 + WebP/AVIF 衍生文件）
+        → upload（wrangler / S3，结束后更新 KV 映射）
+"""
+
+import hashlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from tqdm import tqdm
+
+from derivatives import DEFAULT_SIZES, available_formats, generate_variant_derivatives
+from glyph_catalog import GlyphCatalog, variant_id_from_url
+from png_optimizer import optimize_png
+from rate_controller import AdaptiveRateController
+
+
+STATE_FILENAME = "pipeline_state.json"
+UNKNOWN_DIRNAME = "unknown"
+STAGES = ('download', 'ocr', 'optimize', 'upload')
+
+_STOP = object()
+
+
+class WorkItem(NamedTuple):
+    """流水线中的一个图片；char 为 None 表示还不知道对应的汉字"""
+    char: Optional[str]
+    variant_id: str
+    url: str = ""
+    path: Optional[str] = None
+
+
+# ============================================================================
+# 状态
+# ============================================================================
+
+class PipelineState:
+    """各阶段已处理的输入指纹（线程安全，JSON 持久化）"""
+
+    def __init__(self, state_file: Path):
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, str]] = {stage: {} for stage in STAGES}
+
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.stages.update(json.load(f).get('stages', {}))
+            except (json.JSONDecodeError, OSError):
+                print(f"⚠️  流水线状态文件损坏，将重新处理全部条目: {self.state_file}")
+
+    def get(self, stage: str, key: str) -> Optional[str]:
+        return self.stages[stage].get(key)
+
+    def set(self, stage: str, key: str, fingerprint: str):
+        with self._lock:
+            self.stages[stage][key] = fingerprint
+
+    def is_current(self, stage: str, key: str, fingerprint: str) -> bool:
+        return self.stages[stage].get(key) == fingerprint
+
+    def save(self):
+        with self._lock:
+            payload = {'updated_at': datetime.now().isoformat(), 'stages': self.stages}
+            tmp_file = self.state_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            tmp_file.replace(self.state_file)
+
+
+def variant_key(char: str, variant_id: str) -> str:
+    return f"{char}/{variant_id}"
+
+
+def upload_fingerprint(variant: Dict) -> str:
+    """原图 sha256 + 衍生文件列表（格式或尺寸变化时也需要重新上传）"""
+    derivatives = sorted((d['key'], d['bytes']) for d in variant.get('derivatives', []))
+    return hashlib.sha1(repr((variant.get('sha256'), derivatives)).encode()).hexdigest()
+
+
+# ============================================================================
+# 阶段
+# ============================================================================
+
+class Stage:
+    """
+    一个流水线阶段：workers 个线程从 inbox 取条目，处理结果放入 outbox
+
+    func 返回 None 表示条目到此为止（跳过 / 失败 / 不需要下游处理）
+    inbox 中的 _STOP 会在本阶段全部线程间传递，最后一个线程退出时再传给下游
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int, inbox: queue.Queue,
+                 outbox: Optional[queue.Queue], position: int = 0):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stats = {'processed': 0, 'passed': 0, 'errors': 0, 'busy_seconds': 0.0}
+        self._lock = threading.Lock()
+        self._alive = workers
+        self._threads: List[threading.Thread] = []
+        self._progress = tqdm(desc=f"{name:<9}", unit="项", position=position, leave=True)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def is_alive(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        self._progress.close()
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                self.inbox.put(_STOP)  # 交给本阶段的其他线程
+                break
+
+            started = time.perf_counter()
+            try:
+                result = self.func(item)
+                error = False
+            except Exception as e:
+                tqdm.write(f"❌ [{self.name}] {item.char or '?'} {item.variant_id}: {e}")
+                result, error = None, True
+
+            with self._lock:
+                self.stats['processed'] += 1
+                self.stats['errors'] += error
+                self.stats['busy_seconds'] += time.perf_counter() - started
+                if result is not None:
+                    self.stats['passed'] += 1
+                self._progress.update(1)
+
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result)
+
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last and self.outbox is not None:
+            self.outbox.put(_STOP)
+
+
+# ============================================================================
+# 流水线
+# ============================================================================
+
+class Pipeline:
+    """下载 → OCR → 优化 → 上传"""
+
+    def __init__(self,
+                 data_dir: str = "./collected_characters",
+                 index_db: Optional[str] = "./url_index.sqlite3",
+                 url_files: Iterable[str] = (),
+                 upload: str = "none",
+                 bucket: Optional[str] = None,
+                 formats: Optional[List[str]] = None,
+                 max_rate: float = 5.0,
+                 workers: Optional[Dict[str, int]] = None,
+                 queue_size: int = 256):
+        """
+        初始化流水线
+
+        Args:
+            data_dir: 数据目录（字形目录所在位置）
+            index_db: URL 索引（url_index.py），None 或不存在时只使用 url_files
+            url_files: 额外的 URL 文本文件（不知道对应汉字，下载后进入 OCR）
+            upload: 上传方式 'none' / 'wrangler' / 's3'
+            bucket: S3 bucket（upload='s3' 时使用，默认读取 R2_BUCKET）
+            formats: 衍生格式，默认使用全部可用格式；空列表表示不生成
+            max_rate: 下载速率上限（请求/秒）
+            workers: 各阶段线程数
+            queue_size: 阶段间队列长度（下游慢时上游等待，内存占用有上限）
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.unknown_dir = self.data_dir / UNKNOWN_DIRNAME
+        self.index_db = Path(index_db) if index_db else None
+        self.url_files = [Path(p) for p in url_files]
+        self.upload = upload
+        self.bucket = bucket or os.getenv('R2_BUCKET', 'handwriting-characters')
+        self.formats = available_formats() if formats is None else \
+            [f for f in formats if f in available_formats()]
+        self.workers = {'download': 4, 'ocr': 1, 'optimize': os.cpu_count() or 1, 'upload': 4}
+        self.workers.update(workers or {})
+        self.queue_size = queue_size
+
+        self.catalog = GlyphCatalog(self.data_dir)
+        self.state = PipelineState(self.data_dir / STATE_FILENAME)
+        self._catalog_lock = threading.RLock()
+        self._local = threading.local()
+        self.rate_controller = AdaptiveRateController(max_rate=max_rate)
+        self.url_index = None
+
+        self._ocr = None
+        self._uploader = None
+        self._uploaded_any = False
+
+    # ------------------------------------------------------------------
+    # 各阶段的处理函数
+    # ------------------------------------------------------------------
+
+    def _session(self):
+        import requests
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    @staticmethod
+    def download_key(item: WorkItem) -> str:
+        # 同一个 URL 可能属于多个汉字，每个汉字各保存一份
+        return f"{item.char or ''}|{item.url}"
+
+    def needs_download(self, item: WorkItem) -> bool:
+        if self.state.get('download', self.download_key(item)) is not None:
+            return False
+        if item.char is not None:
+            with self._catalog_lock:
+                variant = self.catalog.get_variant(item.char, item.variant_id)
+            if variant and self.catalog.path_for(variant).exists():
+                return False  # 采集脚本已经保存过
+        return True
+
+    def download(self, item: WorkItem) -> Optional[WorkItem]:
+        import requests
+
+        if not self.needs_download(item):
+            return None
+
+        self.rate_controller.wait()
+        try:
+            response = self._session().get(item.url, timeout=15)
+        except requests.exceptions.RequestException as e:
+            self.rate_controller.record_error(type(e).__name__)
+            raise
+        if self.rate_controller.record_response(response.status_code, response.headers) or \
+                response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+        data = response.content
+        self.state.set('download', self.download_key(item), hashlib.sha256(data).hexdigest())
+
+        if item.char is None:
+            self.unknown_dir.mkdir(exist_ok=True)
+            path = self.unknown_dir / f"{item.variant_id}.png"
+            path.write_bytes(data)
+            return item._replace(path=str(path))
+
+        with self._catalog_lock:
+            variant, _ = self.catalog.add_variant(item.char, data, url=item.url,
+                                                  variant_id=item.variant_id, source='pipeline')
+        return item._replace(path=str(self.catalog.path_for(variant)))
+
+    def _load_ocr(self):
+        if self._ocr is None:
+            try:
+                import pytesseract
+                from ocr_recognizer import CharacterRecognizer
+                pytesseract.get_tesseract_version()
+                self._ocr = CharacterRecognizer(self.unknown_dir, self.unknown_dir).recognize_character
+            except Exception:
+                # 不缓存识别结果，安装后重新运行即可识别
+                tqdm.write("⚠️  未安装 pytesseract / tesseract，跳过 OCR（见 ocr_recognizer.py）")
+                self._ocr = False
+        return self._ocr
+
+    def ocr(self, item: WorkItem) -> Optional[WorkItem]:
+        if item.char is not None:
+            return item  # 已知汉字，直接交给下游
+
+        data = Path(item.path).read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        char = self.state.get('ocr', sha256)
+        if char is None:
+            recognize = self._load_ocr()
+            if not recognize:
+                return None
+            result = recognize(item.path)
+            char = result[0] if result else ''
+            self.state.set('ocr', sha256, char)
+        if not char:
+            return None
+
+        with self._catalog_lock:
+            variant, _ = self.catalog.add_variant(char, data, url=item.url,
+                                                  variant_id=item.variant_id, source='ocr')
+        if self.url_index is not None and item.url:
+            self.url_index.add(item.url, char=char, variant_id=item.variant_id, source='ocr')
+        Path(item.path).unlink()
+        return item._replace(char=char, path=str(self.catalog.path_for(variant)))
+
+    def optimize(self, item: WorkItem) -> Optional[WorkItem]:
+        key = variant_key(item.char, item.variant_id)
+        with self._catalog_lock:
+            variant = dict(self.catalog.get_variant(item.char, item.variant_id) or {})
+        if not variant or self.state.is_current('optimize', key, variant.get('sha256')):
+            return item
+
+        result = self._pool.submit(optimize_png, item.path).result()
+        if result['error']:
+            raise RuntimeError(result['error'])
+        fields = {'size_before': variant.get('size_before', result['before'])}
+        if result['written']:
+            fields.update(size=result['after'], sha256=result['sha256'],
+                          optimized_at=datetime.now().isoformat(), optimize_method=result['method'])
+            variant.update(fields)
+
+        if self.formats and variant.get('derivatives_source') != variant.get('sha256'):
+            job = (str(self.data_dir), item.char, item.variant_id, variant['filename'],
+                   DEFAULT_SIZES, tuple(self.formats))
+            derived = self._pool.submit(generate_variant_derivatives, job).result()
+            if derived['error']:
+                raise RuntimeError(derived['error'])
+            fields.update(derivatives=derived['derivatives'], derivatives_source=variant.get('sha256'))
+
+        with self._catalog_lock:
+            self.catalog.update_variant(item.char, item.variant_id, **fields)
+        self.state.set('optimize', key, variant.get('sha256'))
+        return item
+
+    def _put_object(self, key: str, path: Path) -> bool:
+        if self.upload == 'wrangler':
+            from derivatives import content_type_for
+
+            cmd = ['wrangler', 'r2', 'object', 'put', f'{self.bucket}/{key}',
+                   '--file', str(path), '--content-type', content_type_for(path)]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            if result.returncode != 0:
+                raise RuntimeError(f"wrangler: {result.stderr.strip()[:200]}")
+            return True
+        return self._uploader.upload_file(str(path), self.bucket, key)
+
+    def upload_item(self, item: WorkItem) -> Optional[WorkItem]:
+        key = variant_key(item.char, item.variant_id)
+        with self._catalog_lock:
+            variant = dict(self.catalog.get_variant(item.char, item.variant_id) or {})
+        if not variant:
+            return None
+        fingerprint = upload_fingerprint(variant)
+        if self.state.is_current('upload', key, fingerprint):
+            return None
+
+        ok = self._put_object(f"chars/{variant['filename']}", self.catalog.path_for(variant))
+        for derivative in variant.get('derivatives', []):
+            ok = self._put_object(derivative['key'], self.data_dir / derivative['filename']) and ok
+        if not ok:
+            raise RuntimeError("upload failed")
+
+        self.state.set('upload', key, fingerprint)
+        self._uploaded_any = True
+        return item
+
+    # ------------------------------------------------------------------
+    # 初始条目
+    # ------------------------------------------------------------------
+
+    def _download_items(self) -> Iterable[WorkItem]:
+        seen = set()
+
+        def make(url: str, char: Optional[str]) -> WorkItem:
+            return WorkItem(char, variant_id_from_url(url)[0], url)
+
+        if self.url_index is not None:
+            for char, urls in self.url_index.char_urls().items():
+                for url in urls:
+                    seen.add(url)
+                    yield make(url, char)
+            for url in self.url_index.unattributed_urls():
+                seen.add(url)
+                yield make(url, None)
+
+        for path in self.url_files:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    url = line.strip()
+                    if url and url not in seen:
+                        seen.add(url)
+                        yield make(url, None)
+
+    def seed(self, inboxes: Dict[str, queue.Queue]) -> Dict[str, int]:
+        """
+        把需要处理的条目放入最早需要处理它的阶段
+
+        已在字形目录中的变体按指纹判断从 optimize 还是 upload 开始；
+        unknown/ 中残留的图片重新进入 OCR
+        """
+        counts = {stage: 0 for stage in STAGES}
+
+        for item in self._download_items():
+            if self.needs_download(item):
+                inboxes['download'].put(item)
+                counts['download'] += 1
+
+        if self.unknown_dir.exists():
+            for path in sorted(self.unknown_dir.glob('*.png')):
+                inboxes['ocr'].put(WorkItem(None, path.stem, path=str(path)))
+                counts['ocr'] += 1
+
+        with self._catalog_lock:
+            variants = [(c, v, dict(info)) for c, v, info in self.catalog.iter_variants()]
+        for char, variant_id, variant in variants:
+            path = self.catalog.path_for(variant)
+            if not path.exists():
+                continue
+            item = WorkItem(char, variant_id, variant.get('url', ''), str(path))
+            key = variant_key(char, variant_id)
+            if not self.state.is_current('optimize', key, variant.get('sha256')):
+                inboxes['optimize'].put(item)
+                counts['optimize'] += 1
+            elif 'upload' in inboxes and \
+                    not self.state.is_current('upload', key, upload_fingerprint(variant)):
+                inboxes['upload'].put(item)
+                counts['upload'] += 1
+        return counts
+
+    # ------------------------------------------------------------------
+    # 运行
+    # ------------------------------------------------------------------
+
+    def _save(self):
+        with self._catalog_lock:
+            self.catalog.save()
+        self.state.save()
+
+    def _upload_mapping_to_kv(self):
+        mapping_file = self.data_dir / "char_mapping_upload.json"
+        with open(mapping_file, 'w', encoding='utf-8') as f:
+            json.dump(self.catalog.to_legacy_mapping(), f, ensure_ascii=False, indent=2)
+        cmd = ['wrangler', 'kv:key', 'put', '--binding=CHAR_MAPPING', 'char_mapping', '--path', str(mapping_file)]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        if result.returncode == 0:
+            print(f"✅ 字符映射已上传到 KV (共 {len(self.catalog)} 个字符)")
+        else:
+            print(f"❌ KV上传失败: {result.stderr}")
+
+    def run(self, save_interval: float = 30.0) -> Dict:
+        stage_names = [s for s in STAGES if s != 'upload' or self.upload != 'none']
+
+        print("=" * 70)
+        print("🏭 数据处理流水线")
+        print("=" * 70)
+        print(f"📁 数据目录: {self.data_dir}")
+        print(f"🔗 阶段: {' → '.join(stage_names)}")
+        print(f"🧵 线程数: {', '.join(f'{s}={self.workers[s]}' for s in stage_names)}")
+        print(f"🎨 衍生格式: {', '.join(self.formats) or '(不生成)'}")
+        if self.upload != 'none':
+            print(f"📤 上传: {self.upload} → {self.bucket}")
+        print()
+
+        if self.index_db is not None and self.index_db.exists():
+            from url_index import UrlIndex
+            self.url_index = UrlIndex(self.index_db)
+        if self.upload == 's3':
+            sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'data-upload'))
+            from upload_to_cloud import CharacterImageUploader
+            self._uploader = CharacterImageUploader(os.getenv('UPLOAD_PROVIDER', 'r2'))
+
+        funcs = {'download': self.download, 'ocr': self.ocr,
+                 'optimize': self.optimize, 'upload': self.upload_item}
+        inboxes = {name: queue.Queue(maxsize=self.queue_size) for name in stage_names}
+        stages = []
+        for i, name in enumerate(stage_names):
+            outbox = inboxes[stage_names[i + 1]] if i + 1 < len(stage_names) else None
+            stages.append(Stage(name, funcs[name], self.workers[name], inboxes[name], outbox, position=i))
+
+        started = last_save = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers['optimize']) as self._pool:
+            for stage in stages:
+                stage.start()
+
+            # 队列有界，初始条目在线程启动后由单独的线程放入
+            seeded: Dict[str, int] = {}
+
+            def seed_all():
+                seeded.update(self.seed(inboxes))
+                inboxes[stage_names[0]].put(_STOP)
+
+            threading.Thread(target=seed_all, daemon=True).start()
+
+            try:
+                while any(stage.is_alive() for stage in stages):
+                    time.sleep(0.2)
+                    if time.perf_counter() - last_save >= save_interval:
+                        self._save()
+                        last_save = time.perf_counter()
+            except KeyboardInterrupt:
+                print("\n⚠️  已中断，保存进度...")
+                self._save()
+                raise
+
+            for stage in stages:
+                stage.join()
+        elapsed = time.perf_counter() - started
+
+        self._save()
+        if self.url_index is not None:
+            self.url_index.close()
+        if self.upload == 'wrangler' and self._uploaded_any:
+            self._upload_mapping_to_kv()
+
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'data_dir': str(self.data_dir),
+            'seconds': round(elapsed, 2),
+            'seeded': seeded,
+            'stages': {stage.name: dict(stage.stats, workers=stage.workers,
+                                        busy_seconds=round(stage.stats['busy_seconds'], 2))
+                       for stage in stages},
+            'rate_limit': self.rate_controller.metrics()
+        }
+        report_file = self.data_dir / "pipeline_report.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print()
+        print("=" * 70)
+        print("🎉 流水线完成！")
+        print("=" * 70)
+        for stage in stages:
+            s = stage.stats
+            print(f"   {stage.name:<9} 初始 {seeded.get(stage.name, 0):>6}  处理 {s['processed']:>6}  "
+                  f"通过 {s['passed']:>6}  失败 {s['errors']:>4}  忙碌 {s['busy_seconds']:.1f}s")
+        print(f"   用时: {elapsed:.1f}s")
+        print(f"   报告文件: {report_file}")
+        print("=" * 70)
+        return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='数据处理流水线：下载 → OCR → 优化 → 上传')
+    parser.add_argument('--data-dir', '-d', default='./collected_characters', help='数据目录')
+    parser.add_argument('--index', default='./url_index.sqlite3', help='URL 索引（url_index.py）')
+    parser.add_argument('--urls', action='append', default=[], help='额外的 URL 文本文件（可多次指定）')
+    parser.add_argument('--upload', choices=['none', 'wrangler', 's3'], default='none', help='上传方式')
+    parser.add_argument('--bucket', help='R2/S3 bucket（默认 R2_BUCKET 或 handwriting-characters）')
+    parser.add_argument('--formats', help='衍生格式，逗号分隔（默认全部可用格式，"" 表示不生成）')
+    parser.add_argument('--max-rate', type=float, default=5.0, help='下载速率上限（请求/秒）')
+    for stage in STAGES:
+        parser.add_argument(f'--{stage}-workers', type=int, help=f'{stage} 阶段线程数')
+    args = parser.parse_args()
+
+    workers = {stage: getattr(args, f'{stage}_workers') for stage in STAGES
+               if getattr(args, f'{stage}_workers')}
+    formats = None if args.formats is None else [f for f in args.formats.split(',') if f]
+
+    pipeline = Pipeline(args.data_dir, args.index, args.urls, args.upload, args.bucket,
+                        formats, args.max_rate, workers)
+    pipeline.run()
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 抓包 / 导入 URL 后一键处理（不上传）
+python3 url_index.py import auto_extracted_urls.txt
+python3 pipeline.py
+
+# 处理并上传到 Cloudflare R2（wrangler），结束后更新 KV 映射
+python3 pipeline.py --upload wrangler
+
+# 上传到 S3 兼容存储（读取 R2_ENDPOINT / R2_ACCESS_KEY_ID 等环境变量，见 data-upload/）
+R2_BUCKET=handwriting-characters python3 pipeline.py --upload s3
+
+# 只处理 URL 文件（不知道对应汉字的图片下载后进入 OCR）
+python3 pipeline.py --index "" --urls extracted_urls.txt
+
+# 不生成衍生格式，优化阶段 8 个进程
+python3 pipeline.py --formats "" --optimize-workers 8
+
+再次运行时只处理有变化的条目（新 URL、新识别的图片、内容变化的变体）。
+删除 collected_characters/pipeline_state.json 可强制全部重新处理。
+
+输出:
+=====
+- collected_characters/{unicode}_{汉字}/{变体ID}.png 及衍生文件
+- collected_characters/unknown/（OCR 未能识别的图片）
+- collected_characters/pipeline_state.json（各阶段指纹）
+- collected_characters/pipeline_report.json（各阶段统计）
+"""
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+PNG 无损压缩优化
+多进程批量重新编码采集到的 PNG，减少 R2 存储和 CDN 流量
+
+每个文件尝试以下候选编码，解码后与原图逐像素比对，只保留完全一致且更小的结果:
+- 模式缩减: RGBA(全不透明) -> RGB，RGB(灰度) -> L
+- 调色板: 颜色数 <= 256 时转为 P 模式（颜色 <= 16/4/2 时使用 4/2/1 bit）
+- zlib 最高压缩级别 + Pillow 自适应行过滤 (optimize=True)
+- 去除元数据（tEXt/iTXt/zTXt、时间、ICC、EXIF）
+"""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tqdm import tqdm
+
+from atlas_builder import ATLAS_DIR
+from glyph_catalog import GlyphCatalog
+
+
+def _palette_bits(color_count: int) -> int:
+    if color_count <= 2:
+        return 1
+    if color_count <= 4:
+        return 2
+    if color_count <= 16:
+        return 4
+    return 8
+
+
+def _encode(img, **params) -> bytes:
+    """编码为 PNG，不携带任何元数据"""
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True, icc_profile=None, **params)
+    return buffer.getvalue()
+
+
+def _candidates(img):
+    """生成无损候选图像 (描述, 图像, 额外保存参数)"""
+    from PIL import Image
+
+    mode = img.mode
+    if mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+        img = img.convert('RGBA')
+        mode = 'RGBA'
+
+    yield 'reencode', img, {}
+
+    if mode == 'RGBA' and img.getchannel('A').getextrema() == (255, 255):
+        img = img.convert('RGB')
+        mode = 'RGB'
+        yield 'rgba->rgb', img, {}
+
+    if mode == 'RGB':
+        r, g, b = img.split()
+        if r.tobytes() == g.tobytes() == b.tobytes():
+            img = r
+            mode = 'L'
+            yield 'rgb->l', img, {}
+
+    if mode in ('RGB', 'RGBA', 'L', 'LA'):
+        colors = img.getcolors(256)
+        if colors is not None:
+            source = img if mode in ('RGB', 'RGBA') else img.convert('RGBA')
+            try:
+                palette_img = source.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE)
+            except (ValueError, OSError):
+                palette_img = None
+            if palette_img is not None:
+                yield 'palette', palette_img, {'bits': _palette_bits(len(colors))}
+
+
+def optimize_png(path: str, dry_run: bool = False) -> Dict:
+    """
+    无损优化单个 PNG（在子进程中运行）
+
+    Returns:
+        {'path', 'before', 'after', 'written', 'method', 'sha256', 'error'}
+    """
+    from PIL import Image
+
+    result = {'path': path, 'before': 0, 'after': 0, 'written': False,
+              'method': None, 'sha256': None, 'error': None}
+    try:
+        original = Path(path).read_bytes()
+        result['before'] = result['after'] = len(original)
+
+        with Image.open(io.BytesIO(original)) as img:
+            if img.format != 'PNG':
+                result['error'] = f"not a PNG ({img.format})"
+                return result
+            img.load()
+            reference = img.convert('RGBA').tobytes()
+
+            best = None
+            for method, candidate, params in _candidates(img):
+                encoded = _encode(candidate, **params)
+                if best is not None and len(encoded) >= len(best[1]):
+                    continue
+                with Image.open(io.BytesIO(encoded)) as check:
+                    if check.convert('RGBA').tobytes() != reference:
+                        continue
+                best = (method, encoded)
+
+        if best is None or len(best[1]) >= len(original):
+            return result
+
+        method, encoded = best
+        result.update(after=len(encoded), method=method,
+                      sha256=hashlib.sha256(encoded).hexdigest())
+
+        if not dry_run:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+            result['written'] = True
+
+    except Exception as e:
+        result['error'] = str(e)
+
+    return result
+
+
+class PNGOptimizer:
+    """批量 PNG 优化器"""
+
+    def __init__(self, data_dir: str = "./collected_characters", workers: Optional[int] = None):
+        self.data_dir = Path(data_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.catalog = GlyphCatalog(self.data_dir)
+
+    def collect_files(self) -> List[Path]:
+        """
+        目录中登记的变体 + 数据目录下的其他 PNG
+
+        跳过派生输出：图集（atlases/，文件名含内容哈希，作为不可变 R2 key 长期缓存，
+        重写后哈希与文件名不符）和 derivatives.py 生成的缩略图（大小已记录在目录中）。
+        这些文件由各自的生成器从优化后的原图重新生成。
+        """
+        derived = set()
+        files = set()
+        for _, _, variant in self.catalog.iter_variants():
+            files.add(self.catalog.path_for(variant).resolve())
+            derived.update((self.data_dir / d['filename']).resolve()
+                           for d in variant.get('derivatives', []))
+
+        atlas_dir = (self.data_dir / ATLAS_DIR).resolve()
+        for p in self.data_dir.rglob('*.png'):
+            p = p.resolve()
+            if p not in derived and atlas_dir not in p.parents:
+                files.add(p)
+        return sorted(p for p in files if p.exists())
+
+    def run(self, dry_run: bool = False) -> Dict:
+        files = self.collect_files()
+
+        print("=" * 70)
+        print("🗜️  PNG 无损压缩优化")
+        print("=" * 70)
+        print(f"📁 数据目录: {self.data_dir}")
+        print(f"📊 文件数: {len(files)}  进程数: {self.workers}")
+        if dry_run:
+            print("🔍 试运行模式：不写入文件")
+        print()
+
+        results = []
+        chunksize = max(1, len(files) // (self.workers * 8))
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            jobs = executor.map(optimize_png, [str(p) for p in files],
+                                [dry_run] * len(files), chunksize=chunksize)
+            for result in tqdm(jobs, total=len(files), desc="优化进度"):
+                results.append(result)
+
+        if not dry_run:
+            self._update_catalog(results)
+        return self._report(results, dry_run)
+
+    def _update_catalog(self, results: List[Dict]):
+        """在目录中记录优化前后的大小"""
+        by_path = {r['path']: r for r in results}
+        now = datetime.now().isoformat()
+
+        for char, variant_id, variant in list(self.catalog.iter_variants()):
+            result = by_path.get(str(self.catalog.path_for(variant).resolve()))
+            if result is None or result['error']:
+                continue
+
+            fields = {'size_before': variant.get('size_before', result['before'])}
+            if result['written']:
+                fields.update(size=result['after'], sha256=result['sha256'],
+                              optimized_at=now, optimize_method=result['method'])
+            self.catalog.update_variant(char, variant_id, **fields)
+
+        self.catalog.save()
+
+    def _report(self, results: List[Dict], dry_run: bool) -> Dict:
+        before = sum(r['before'] for r in results if not r['error'])
+        after = sum(r['after'] for r in results if not r['error'])
+        improved = [r for r in results if r['method']]
+        errors = [r for r in results if r['error']]
+
+        methods = {}
+        for r in improved:
+            methods[r['method']] = methods.get(r['method'], 0) + 1
+
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'dry_run': dry_run,
+            'files': len(results),
+            'improved': len(improved),
+            'rewritten': sum(1 for r in results if r['written']),
+            'errors': len(errors),
+            'bytes_before': before,
+            'bytes_after': after,
+            'bytes_saved': before - after,
+            'saved_ratio': round((before - after) / before, 4) if before else 0.0,
+            'methods': methods,
+            'error_files': [{'path': r['path'], 'error': r['error']} for r in errors][:50]
+        }
+
+        report_file = self.data_dir / "optimization_report.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print()
+        print("=" * 70)
+        print("🎉 优化完成！" if not dry_run else "🎉 试运行完成！")
+        print("=" * 70)
+        print(f"   文件总数: {report['files']}")
+        print(f"   可缩小: {report['improved']}  已重写: {report['rewritten']}  错误: {report['errors']}")
+        print(f"   优化前: {before / 1024:.1f} KB")
+        print(f"   优化后: {after / 1024:.1f} KB")
+        print(f"   节省: {report['bytes_saved'] / 1024:.1f} KB ({report['saved_ratio'] * 100:.1f}%)")
+        if methods:
+            print(f"   方式: {', '.join(f'{k}={v}' for k, v in sorted(methods.items()))}")
+        print(f"   报告文件: {report_file}")
+        print("=" * 70)
+
+        return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='PNG 无损压缩优化')
+    parser.add_argument('--data-dir', default='./collected_characters', help='数据目录')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--dry-run', action='store_true', help='只统计可节省的大小，不写入文件')
+    args = parser.parse_args()
+
+    PNGOptimizer(args.data_dir, args.workers).run(dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 安装依赖
+pip install pillow tqdm
+
+# 先试运行，查看可节省的空间
+python3 png_optimizer.py --dry-run
+
+# 执行优化（只重写变小的文件）
+python3 png_optimizer.py -j 8
+
+优化后:
+=======
+- glyph_catalog.json 中每个变体记录 size_before / size / optimized_at
+- 汇总结果写入 collected_characters/optimization_report.json
+- 再运行上传脚本即可
+"""
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+自适应限速控制器 (AIMD)
+根据服务器响应动态调整请求速率，供基于 API 的采集器共用
+
+- 成功响应: 连续成功若干次后，速率加性增加（缓慢提速，不超过上限）
+- 429 / 5xx: 速率乘性减少，并遵守 Retry-After
+- 当前速率和退避事件以指标形式导出
+"""
+
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+
+# 需要退避的状态码
+THROTTLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveRateController:
+    """AIMD 自适应限速控制器（线程安全）"""
+
+    def __init__(self,
+                 initial_rate: float = 2.0,
+                 min_rate: float = 0.1,
+                 max_rate: float = 5.0,
+                 increase_step: float = 0.2,
+                 decrease_factor: float = 0.5,
+                 success_window: int = 5,
+                 max_retry_after: float = 300.0):
+        """
+        初始化控制器
+
+        Args:
+            initial_rate: 初始速率（请求/秒）
+            min_rate: 最低速率（请求/秒）
+            max_rate: 速率上限（请求/秒）
+            increase_step: 每次加性提速的步长（请求/秒）
+            decrease_factor: 退避时的乘性系数（0~1）
+            success_window: 连续成功多少次后提速一次
+            max_retry_after: Retry-After 的最大等待时间（秒），防止异常值卡死
+        """
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be in (0, 1): {decrease_factor}")
+        if not 0 < min_rate <= max_rate:
+            raise ValueError(f"Invalid rate bounds: min={min_rate}, max={max_rate}")
+
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.success_window = success_window
+        self.max_retry_after = max_retry_after
+
+        self._lock = threading.Lock()
+        self.rate = self._clamp(initial_rate)
+        self._next_slot = time.monotonic()
+        self._success_streak = 0
+
+        # 指标
+        self.metrics_data = {
+            'requests': 0,
+            'successes': 0,
+            'throttled': 0,
+            'errors': 0,
+            'backoff_events': 0,
+            'rate_increases': 0,
+            'retry_after_honored': 0,
+            'total_wait_seconds': 0.0,
+            'min_rate_seen': self.rate,
+            'max_rate_seen': self.rate,
+            'last_backoff': None,
+        }
+
+    def _clamp(self, rate: float) -> float:
+        return max(self.min_rate, min(self.max_rate, rate))
+
+    def set_rate(self, rate: float):
+        """手动设置当前速率（会被限制在 [min_rate, max_rate] 内）"""
+        with self._lock:
+            self.rate = self._clamp(rate)
+
+    def wait(self):
+        """阻塞直到下一个可用的请求时间片"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1.0 / self.rate
+            delay = slot - now
+            if delay > 0:
+                self.metrics_data['total_wait_seconds'] += delay
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_response(self, status_code: int, headers: Optional[Dict] = None) -> bool:
+        """
+        根据响应调整速率
+
+        Args:
+            status_code: HTTP 状态码
+            headers: 响应头（用于读取 Retry-After）
+
+        Returns:
+            需要退避（调用方应稍后重试）时返回 True
+        """
+        with self._lock:
+            self.metrics_data['requests'] += 1
+
+            if status_code in THROTTLE_STATUS_CODES:
+                self.metrics_data['throttled'] += 1
+                retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+                self._backoff(f"HTTP {status_code}", retry_after)
+                return True
+
+            self.metrics_data['successes'] += 1
+            self._success_streak += 1
+            if self._success_streak >= self.success_window:
+                self._success_streak = 0
+                if self.rate < self.max_rate:
+                    self.rate = self._clamp(self.rate + self.increase_step)
+                    self.metrics_data['rate_increases'] += 1
+                    self.metrics_data['max_rate_seen'] = max(self.metrics_data['max_rate_seen'], self.rate)
+            return False
+
+    def record_error(self, reason: str = "connection error"):
+        """记录网络异常（超时、连接失败等），按退避处理"""
+        with self._lock:
+            self.metrics_data['requests'] += 1
+            self.metrics_data['errors'] += 1
+            self._backoff(reason, None)
+
+    def _backoff(self, reason: str, retry_after: Optional[float]):
+        """乘性降速；有 Retry-After 时推迟下一个时间片（调用方需持有锁）"""
+        self._success_streak = 0
+        self.rate = self._clamp(self.rate * self.decrease_factor)
+        self.metrics_data['backoff_events'] += 1
+        self.metrics_data['min_rate_seen'] = min(self.metrics_data['min_rate_seen'], self.rate)
+
+        if retry_after is not None:
+            retry_after = min(retry_after, self.max_retry_after)
+            self._next_slot = max(self._next_slot, time.monotonic() + retry_after)
+            self.metrics_data['retry_after_honored'] += 1
+
+        self.metrics_data['last_backoff'] = {
+            'reason': reason,
+            'retry_after': retry_after,
+            'new_rate': round(self.rate, 3),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def metrics(self) -> Dict:
+        """导出当前指标"""
+        with self._lock:
+            data = dict(self.metrics_data)
+            data['current_rate'] = round(self.rate, 3)
+            data['min_rate_seen'] = round(data['min_rate_seen'], 3)
+            data['max_rate_seen'] = round(data['max_rate_seen'], 3)
+            data['total_wait_seconds'] = round(data['total_wait_seconds'], 2)
+            return data
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析返回 None"""
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# ============================================================================
+# 本地模拟服务器（用于验证退避行为）
+# ============================================================================
+
+def run_demo(total_requests: int = 60, server_limit: float = 3.0):
+    """
+    启动一个本地限流服务器，用控制器对其发起请求
+
+    服务器在任意 1 秒窗口内超过 server_limit 个请求时返回 429 + Retry-After，
+    每第 20 个请求固定返回一次 503，用于观察控制器的退避和恢复过程
+    """
+    import requests
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from collections import deque
+
+    hits = deque()
+    hits_lock = threading.Lock()
+    counter = {'n': 0}
+
+    class ThrottlingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            now = time.monotonic()
+            with hits_lock:
+                counter['n'] += 1
+                while hits and now - hits[0] > 1.0:
+                    hits.popleft()
+                hits.append(now)
+                over_limit = len(hits) > server_limit
+                flaky = counter['n'] % 20 == 0
+
+            if over_limit:
+                self.send_response(429)
+                self.send_header('Retry-After', '1')
+            elif flaky:
+                self.send_response(503)
+            else:
+                self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print("=" * 70)
+    print("🧪 自适应限速演示")
+    print("=" * 70)
+    print(f"📡 模拟服务器: {url} (上限 {server_limit} 请求/秒)")
+    print()
+
+    controller = AdaptiveRateController(initial_rate=1.0, max_rate=10.0, success_window=3)
+    session = requests.Session()
+    start = time.monotonic()
+
+    for i in range(1, total_requests + 1):
+        controller.wait()
+        response = session.get(url, timeout=5)
+        backed_off = controller.record_response(response.status_code, response.headers)
+        marker = "⏬" if backed_off else "✅"
+        print(f"{marker} #{i:03d} HTTP {response.status_code}  速率: {controller.rate:.2f}/s")
+
+    server.shutdown()
+    elapsed = time.monotonic() - start
+
+    print()
+    print("=" * 70)
+    print(f"📊 用时 {elapsed:.1f}s，实际吞吐 {total_requests / elapsed:.2f} 请求/秒")
+    for key, value in controller.metrics().items():
+        print(f"   {key}: {value}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='自适应限速控制器演示')
+    parser.add_argument('--requests', type=int, default=60, help='演示请求数')
+    parser.add_argument('--server-limit', type=float, default=3.0, help='模拟服务器限速（请求/秒）')
+    args = parser.parse_args()
+
+    run_demo(args.requests, args.server_limit)
+
+
+"""
+使用方法:
+=========
+# 运行本地限流演示
+python3 rate_controller.py --requests 60 --server-limit 3
+
+# 在采集器中使用
+from rate_controller import AdaptiveRateController
+
+controller = AdaptiveRateController(initial_rate=2.0, max_rate=5.0)
+controller.wait()                     # 请求前等待时间片
+response = session.get(url)
+controller.record_response(response.status_code, response.headers)
+print(controller.metrics())           # 导出指标
+"""
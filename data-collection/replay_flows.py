@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+离线回放抓包文件
+读取 mitmproxy 保存的 .flow 文件（mitmproxy -w traffic.flow）或浏览器导出的 HAR 文件，
+按顺序调用采集脚本的 request / response / done 钩子，无需重新在手机上浏览
+
+- 修改提取逻辑后可直接重新处理历史抓包
+- 多个文件并行处理（每个文件一个进程，输出到各自的目录）
+- 输出吞吐量统计，可作为采集脚本的性能基准
+"""
+
+import base64
+import contextlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+FLOW_SUFFIXES = {'.flow', '.mitm', '.dump'}
+HAR_SUFFIXES = {'.har'}
+
+# HAR 中的内容已解码，回放时去掉这些头，避免重复解码
+_SKIP_HAR_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+# ============================================================================
+# 读取抓包
+# ============================================================================
+
+def iter_mitmproxy_flows(path: Path) -> Iterator:
+    """读取 mitmproxy 流文件，只返回 HTTP 流"""
+    from mitmproxy import http, io
+
+    with open(path, 'rb') as f:
+        for flow in io.FlowReader(f).stream():
+            if isinstance(flow, http.HTTPFlow):
+                yield flow
+
+
+def _har_headers(entries: List[Dict]) -> List[Tuple[bytes, bytes]]:
+    return [
+        (h['name'].encode(), h['value'].encode())
+        for h in entries
+        if not h['name'].startswith(':') and h['name'].lower() not in _SKIP_HAR_HEADERS
+    ]
+
+
+def _har_content(content: Dict) -> bytes:
+    text = content.get('text') or ''
+    if content.get('encoding') == 'base64':
+        return base64.b64decode(text)
+    return text.encode('utf-8')
+
+
+def har_entry_to_flow(entry: Dict):
+    """把一条 HAR 记录转换为 HTTPFlow"""
+    from urllib.parse import urlsplit
+    from mitmproxy import connection, http
+
+    req = entry['request']
+    started = entry.get('startedDateTime')
+    try:
+        timestamp = datetime.fromisoformat(started.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        timestamp = time.time()
+
+    parts = urlsplit(req['url'])
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+
+    flow = http.HTTPFlow(
+        connection.Client(peername=("127.0.0.1", 0), sockname=("127.0.0.1", 0), timestamp_start=timestamp),
+        connection.Server(address=(parts.hostname, port))
+    )
+    flow.request = http.Request.make(
+        req['method'], req['url'],
+        (req.get('postData') or {}).get('text', '').encode('utf-8'),
+        _har_headers(req.get('headers', []))
+    )
+    flow.request.timestamp_start = timestamp
+
+    resp = entry.get('response') or {}
+    if resp.get('status'):
+        flow.response = http.Response.make(
+            resp['status'],
+            _har_content(resp.get('content') or {}),
+            _har_headers(resp.get('headers', []))
+        )
+        flow.response.timestamp_start = timestamp
+    return flow
+
+
+def iter_har_flows(path: Path) -> Iterator:
+    with open(path, 'r', encoding='utf-8') as f:
+        har = json.load(f)
+    for entry in har['log']['entries']:
+        yield har_entry_to_flow(entry)
+
+
+def iter_flows(path: Path) -> Iterator:
+    if path.suffix.lower() in HAR_SUFFIXES:
+        return iter_har_flows(path)
+    return iter_mitmproxy_flows(path)
+
+
+# ============================================================================
+# 回放
+# ============================================================================
+
+def load_addons(script: Path) -> List:
+    """像 mitmproxy -s 一样加载脚本并返回其中的 addons 列表"""
+    sys.path.insert(0, str(script.parent))
+    spec = importlib.util.spec_from_file_location(f"replay_{script.stem}_{os.getpid()}", script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return list(getattr(module, 'addons', []))
+
+
+def replay_file(job: Tuple[str, str, str]) -> Dict:
+    """
+    回放单个抓包文件（在子进程中运行）
+
+    脚本中的路径都是相对路径（./collected_characters 等），
+    因此先切换到该文件的输出目录再加载脚本，各文件的输出互不干扰
+
+    Args:
+        job: (抓包文件, 采集脚本, 输出目录)，均为绝对路径（进程会被复用，工作目录不固定）
+    """
+    flow_path, script, out_dir = (Path(p) for p in job)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # 脚本会读取的字频表
+    chars_file = script.parent / "common_3500_chars.txt"
+    if chars_file.exists() and not (out_dir / chars_file.name).exists():
+        shutil.copy(chars_file, out_dir / chars_file.name)
+
+    result = {'file': str(flow_path), 'output_dir': str(out_dir), 'flows': 0, 'responses': 0,
+              'bytes': 0, 'hook_errors': 0, 'seconds': 0.0, 'error': None}
+
+    os.chdir(out_dir)
+    with open(out_dir / "replay.log", 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            addons = load_addons(script)
+            started = time.perf_counter()
+
+            for flow in iter_flows(flow_path):
+                result['flows'] += 1
+                result['bytes'] += len(flow.request.raw_content or b'')
+                for addon in addons:
+                    if hasattr(addon, 'request'):
+                        try:
+                            addon.request(flow)
+                        except Exception as e:
+                            result['hook_errors'] += 1
+                            print(f"❌ request hook: {flow.request.pretty_url}: {e}")
+
+                if flow.response is None:
+                    continue
+                result['responses'] += 1
+                result['bytes'] += len(flow.response.raw_content or b'')
+                for addon in addons:
+                    if hasattr(addon, 'response'):
+                        try:
+                            addon.response(flow)
+                        except Exception as e:
+                            result['hook_errors'] += 1
+                            print(f"❌ response hook: {flow.request.pretty_url}: {e}")
+
+            for addon in addons:
+                if hasattr(addon, 'done'):
+                    addon.done()
+
+            result['seconds'] = time.perf_counter() - started
+        except Exception as e:
+            result['error'] = str(e)
+
+    return result
+
+
+def collect_inputs(paths: List[str]) -> List[Path]:
+    files = []
+    for item in paths:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(p for p in sorted(path.rglob('*'))
+                         if p.suffix.lower() in FLOW_SUFFIXES | HAR_SUFFIXES)
+        elif path.exists():
+            files.append(path)
+        else:
+            print(f"⚠️  文件不存在: {path}")
+    return files
+
+
+def run_replay(inputs: List[str], script: str, output_dir: str = "./replay_output",
+               workers: Optional[int] = None) -> Dict:
+    files = collect_inputs(inputs)
+    output_dir = Path(output_dir)
+    workers = workers or min(len(files), os.cpu_count() or 1) or 1
+
+    print("=" * 70)
+    print("⏪ 离线回放抓包")
+    print("=" * 70)
+    print(f"📜 采集脚本: {script}")
+    print(f"📁 抓包文件: {len(files)}  进程数: {workers}")
+    print(f"💾 输出目录: {output_dir}/<文件名>/")
+    print()
+
+    # 同名文件加序号，避免输出目录冲突
+    jobs, used = [], set()
+    for path in files:
+        name, n = path.stem, 1
+        while name in used:
+            n += 1
+            name = f"{path.stem}_{n}"
+        used.add(name)
+        jobs.append((str(path.resolve()), str(Path(script).resolve()), str((output_dir / name).resolve())))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(replay_file, jobs))
+    wall = time.perf_counter() - started
+
+    for r in results:
+        if r['error']:
+            print(f"❌ {Path(r['file']).name}: {r['error']}")
+            continue
+        rate = r['flows'] / r['seconds'] if r['seconds'] else 0.0
+        print(f"✅ {Path(r['file']).name}: {r['flows']} 流, {r['bytes'] / 1024 / 1024:.1f} MB, "
+              f"{r['seconds']:.2f}s ({rate:.0f} 流/秒), 钩子错误 {r['hook_errors']}")
+
+    total_flows = sum(r['flows'] for r in results)
+    total_bytes = sum(r['bytes'] for r in results)
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'script': str(script),
+        'workers': workers,
+        'files': len(results),
+        'flows': total_flows,
+        'bytes': total_bytes,
+        'wall_seconds': round(wall, 3),
+        'flows_per_second': round(total_flows / wall, 1) if wall else 0.0,
+        'mb_per_second': round(total_bytes / 1024 / 1024 / wall, 2) if wall else 0.0,
+        'results': results
+    }
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    report_file = output_dir / "replay_report.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print("=" * 70)
+    print("🎉 回放完成！")
+    print("=" * 70)
+    print(f"   流总数: {total_flows}  数据量: {total_bytes / 1024 / 1024:.1f} MB")
+    print(f"   用时: {wall:.2f}s  吞吐: {report['flows_per_second']} 流/秒, {report['mb_per_second']} MB/秒")
+    print(f"   报告文件: {report_file}")
+    print("=" * 70)
+    return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='离线回放 mitmproxy 流文件 / HAR 文件')
+    parser.add_argument('inputs', nargs='+', help='抓包文件或目录（.flow / .har）')
+    parser.add_argument('--script', '-s', default='enhanced_collector.py', help='采集脚本（mitmproxy addon）')
+    parser.add_argument('--output-dir', '-o', default='./replay_output', help='输出目录')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='进程数（默认 CPU 核数）')
+    args = parser.parse_args()
+
+    run_replay(args.inputs, args.script, args.output_dir, args.workers)
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+使用方法:
+=========
+# 抓包时保存流文件
+mitmproxy -s enhanced_collector.py -p 8080 -w traffic.flow
+
+# 修改提取逻辑后，离线重新处理
+python3 replay_flows.py traffic.flow -s enhanced_collector.py
+
+# 批量回放目录中的全部抓包（包括 HAR），8 个进程
+python3 replay_flows.py captures/ -s smart_collector.py -j 8
+
+# 回放到调试采集器（抓包日志模式）
+DEBUG_CAPTURE_LOG=1 python3 replay_flows.py traffic.flow -s debug_collector.py
+
+输出:
+=====
+- replay_output/<抓包文件名>/collected_characters/ 等（脚本的输出）
+- replay_output/<抓包文件名>/replay.log（脚本的打印输出）
+- replay_output/replay_report.json（吞吐量统计）
+"""
@@ -10,6 +10,8 @@ from datetime import datetime
 import hashlib
 import json
 
+from flow_utils import FlowFilter
+
 class SimpleImageCollector:
     """简单图片采集器 - 只保存PNG图片"""
 
@@ -17,6 +19,7 @@ class SimpleImageCollector:
         self.output_dir = Path("./collected_characters")
         self.output_dir.mkdir(exist_ok=True)
         self.image_count = 0
+        self.flow_filter = FlowFilter()
 
         # 记录图片元数据
         self.metadata = {}
@@ -40,7 +43,7 @@ class SimpleImageCollector:
 
     def response(self, flow: http.HTTPFlow) -> None:
         """拦截并保存图片响应"""
-        if "sfapi.fanglige.com" not in flow.request.host:
+        if not self.flow_filter.match(flow):
             return
 
         content_type = flow.response.headers.get("content-type", "")
@@ -134,6 +137,7 @@ class SimpleImageCollector:
         print("🎉 采集完成！")
         print("=" * 70)
         print(f"📊 总计采集: {self.image_count} 张图片")
+        print(f"🚦 流量: {self.flow_filter.summary()}")
         print(f"📁 保存位置: {self.output_dir}")
         print(f"📝 元数据文件: {self.metadata_file}")
         print("\n💡 下一步:")
@@ -9,49 +9,58 @@ from pathlib import Path
 import json
 import time
 
+from flow_utils import FlowFilter, QueryCorrelator, API_PATH, IMAGE_PATH, flow_cn_char, path_startswith
+from url_index import UrlIndex, url_key
+
 class SmartCollector:
     """智能采集器"""
 
     def __init__(self):
         self.output_dir = Path("./collected_characters")
         self.output_dir.mkdir(exist_ok=True)
+        self.flow_filter = FlowFilter(path_prefixes=(IMAGE_PATH, API_PATH))
 
+        # URL 索引（URL -> 汉字）；文本文件继续追加新 URL，兼容 auto_download_loop.sh 等脚本
         self.url_file = Path("./auto_extracted_urls.txt")
-        self.collected_urls = self.load_urls()
+        self.url_index = UrlIndex("./url_index.sqlite3", legacy_text=self.url_file)
+        self.correlator = QueryCorrelator()
 
         print("=" * 70)
         print("  智能采集器已启动")
         print("=" * 70)
         print(f"📁 输出目录: {self.output_dir}")
-        print(f"📝 URL 记录: {self.url_file}")
-        print(f"📊 已收集: {len(self.collected_urls)} 个 URL")
+        print(f"📝 URL 索引: {self.url_index.db_path}（并追加到 {self.url_file}）")
+        print(f"📊 已收集: {len(self.url_index)} 个 URL")
         print()
         print("开始监听...")
         print()
 
-    def load_urls(self) -> set:
-        """加载已收集的 URL"""
-        if self.url_file.exists():
-            with open(self.url_file, 'r') as f:
-                return set(line.strip() for line in f if line.strip())
-        return set()
-
-    def save_url(self, url: str):
-        """保存 URL"""
-        if url not in self.collected_urls:
+    def save_url(self, url: str, char: str = None, seen_at: float = None):
+        """保存 URL（已知汉字时同时记录归属）"""
+        if self.url_index.add(url, char=char, source='proxy', seen_at=seen_at):
             with open(self.url_file, 'a') as f:
                 f.write(url + '\n')
-            self.collected_urls.add(url)
+        elif url_key(url) is None:
+            print(f"⚠️  无法解析的 URL（已保存到索引 unparsed_urls 表）: {url}")
 
     def request(self, flow: http.HTTPFlow) -> None:
         """拦截请求"""
-
-        url = flow.request.pretty_url
-
-        # 检测图片 URL
-        if 'sfapi.fanglige.com/svg_png/' in url and url.endswith('.png'):
-            print(f"🎯 发现图片: {url}")
-            self.save_url(url)
+        if not self.flow_filter.match(flow):
+            return
+
+        # 记录汉字查询，随后的图片归属到该汉字
+        if path_startswith(flow, API_PATH):
+            char = flow_cn_char(flow)
+            if char:
+                self.correlator.record(flow, char)
+            return
+
+        # 检测图片 URL（只对目标图片构造完整 URL）
+        if path_startswith(flow, IMAGE_PATH) and flow.request.data.path.endswith(b'.png'):
+            url = flow.request.pretty_url
+            char = self.correlator.attribute(flow)
+            print(f"🎯 发现图片: {url}" + (f" → {char}" if char else ""))
+            self.save_url(url, char, flow.request.timestamp_start)
 
             # 保存图片信息
             parts = url.split('/')
@@ -62,10 +71,12 @@ class SmartCollector:
 
     def response(self, flow: http.HTTPFlow) -> None:
         """拦截响应"""
+        if not self.flow_filter.match(flow, count=False):
+            return
 
         # 检测 API 响应
-        if 'sfapi.fanglige.com/class/action.php' in flow.request.pretty_url:
-            if 'queryDict' in flow.request.pretty_url:
+        if path_startswith(flow, API_PATH):
+            if b'queryDict' in flow.request.data.path:
                 # 记录查询
                 print(f"📡 API 查询: {flow.request.pretty_url}")
 
@@ -73,5 +84,12 @@ class SmartCollector:
                 # 这里我们主要依赖后续的图片请求
                 pass
 
+    def done(self):
+        """退出时输出统计"""
+        self.url_index.close()
+        correlation = self.correlator.stats()
+        print(f"📊 已收集 {len(self.url_index)} 个 URL（归属率 {correlation['attribution_rate'] * 100:.1f}%），"
+              f"{self.flow_filter.summary()}")
+
 # mitmproxy 插件接口
 addons = [SmartCollector()]
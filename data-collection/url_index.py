@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+图片 URL 索引 (url_index.sqlite3)
+记录每个 svg_png 图片 URL 对应的汉字、变体 ID 和首次发现时间
+
+- URL 解析为紧凑的整数键：folder << 48 | name（双射 base62，最多 8 位）
+- 全部键在启动时载入内存集合，判断 URL 是否已收集是 O(1)，不再逐行读取文本文件
+- 一个 URL 可以对应多个汉字（url_chars 表），可按汉字导出 URL 列表给下载器
+- 支持从 URL 文本文件、Charles 会话 (.chlsj)、HAR 文件批量导入；
+  会话中的图片按 QueryCorrelator 归属到同一客户端最近查询的汉字
+
+表结构:
+    urls(key INTEGER PRIMARY KEY, first_seen REAL, source TEXT)
+    url_chars(key, char, variant_id, first_seen)  主键 (key, char)，char 上有索引
+    unparsed_urls(url, char, source, first_seen)  无法编码为整数键的原始 URL，主键 (url, char)
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from flow_utils import QueryCorrelator, decode_cn_char, is_cjk
+from glyph_catalog import SVG_PNG_URL_RE, char_dir_name
+
+
+DEFAULT_DB = "./url_index.sqlite3"
+IMAGE_URL_BASE = "https://sfapi.fanglige.com/svg_png"
+
+_ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_DIGITS = {c: i for i, c in enumerate(_ALPHABET)}
+_NAME_BITS = 48
+_NAME_MAX_LEN = 8          # 62 进制 8 位的双射编码 < 2^48
+_FOLDER_MAX = 1 << 15      # 保证键是非负的 64 位整数（SQLite INTEGER）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    key INTEGER PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS url_chars (
+    key INTEGER NOT NULL,
+    char TEXT NOT NULL,
+    variant_id TEXT,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (key, char)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS url_chars_char ON url_chars(char);
+CREATE TABLE IF NOT EXISTS unparsed_urls (
+    url TEXT NOT NULL,
+    char TEXT NOT NULL DEFAULT '',
+    source TEXT,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (url, char)
+) WITHOUT ROWID;
+"""
+
+
+# ============================================================================
+# URL <-> 整数键
+# ============================================================================
+
+def parse_image_url(url: str) -> Optional[Tuple[int, str]]:
+    """提取 (folder, name)，不是 svg_png 图片 URL 时返回 None"""
+    match = SVG_PNG_URL_RE.search(url or "")
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+def encode_key(folder: int, name: str) -> int:
+    """
+    (folder, name) -> 整数键
+
+    name 使用双射 base62（没有前导零歧义，"0ab" 与 "ab" 的键不同）
+    """
+    if not 0 <= folder < _FOLDER_MAX or not 0 < len(name) <= _NAME_MAX_LEN:
+        raise ValueError(f"Image URL out of key range: {folder}/{name}")
+    value = 0
+    for c in name:
+        value = value * 62 + _DIGITS[c] + 1
+    return folder << _NAME_BITS | value
+
+
+def decode_key(key: int) -> Tuple[int, str]:
+    folder, value = key >> _NAME_BITS, key & ((1 << _NAME_BITS) - 1)
+    chars = []
+    while value:
+        value, digit = divmod(value - 1, 62)
+        chars.append(_ALPHABET[digit])
+    return folder, ''.join(reversed(chars))
+
+
+def url_key(url: str) -> Optional[int]:
+    """URL 的整数键，无法编码时返回 None"""
+    parsed = parse_image_url(url)
+    if parsed is None:
+        return None
+    try:
+        return encode_key(*parsed)
+    except ValueError:
+        return None
+
+
+def key_to_url(key: int) -> str:
+    folder, name = decode_key(key)
+    return f"{IMAGE_URL_BASE}/{folder}/{name}.png"
+
+
+def key_variant_id(key: int) -> str:
+    """与 glyph_catalog.variant_id_from_url 相同的变体 ID（59-2jsr）"""
+    folder, name = decode_key(key)
+    return f"{folder}-{name}"
+
+
+# ============================================================================
+# 索引
+# ============================================================================
+
+class UrlIndex:
+    """持久化 URL -> 汉字索引（线程安全，写入按批提交）"""
+
+    def __init__(self,
+                 db_path=DEFAULT_DB,
+                 legacy_text: Optional[Path] = None,
+                 batch_size: int = 500,
+                 flush_interval: float = 2.0):
+        """
+        打开（或创建）索引
+
+        Args:
+            db_path: SQLite 数据库路径
+            legacy_text: 旧的 URL 文本文件（auto_extracted_urls.txt），索引为空时自动导入
+            batch_size: 累积多少条写入后提交
+            flush_interval: 距上次提交超过多少秒后提交（采集时新 URL 很快落盘）
+        """
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._keys = {key for (key,) in self._conn.execute("SELECT key FROM urls")}
+        self._chars = {char for (char,) in self._conn.execute("SELECT DISTINCT char FROM url_chars")}
+
+        self._pending_urls: List[Tuple] = []
+        self._pending_chars: List[Tuple] = []
+        self._pending_unparsed: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self.invalid = 0
+
+        if legacy_text and not self._keys and Path(legacy_text).exists():
+            added, _ = self.import_text(legacy_text, source='legacy_text')
+            print(f"📥 已从 {legacy_text} 导入 {added} 个 URL 到索引")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, url: str) -> bool:
+        key = url_key(url)
+        return key is not None and key in self._keys
+
+    def has_char(self, char: str) -> bool:
+        """该汉字是否已有至少一个 URL"""
+        return char in self._chars
+
+    def add(self,
+            url: str,
+            char: Optional[str] = None,
+            variant_id: Optional[str] = None,
+            source: Optional[str] = None,
+            seen_at: Optional[float] = None) -> bool:
+        """
+        记录一个图片 URL（可附带汉字）
+
+        Returns:
+            URL 是否是新的；无法解析的 URL 返回 False 并计入 invalid，
+            原始 URL 保存在 unparsed_urls 表中，不会丢失
+        """
+        key = url_key(url)
+        seen_at = seen_at or time.time()
+        with self._lock:
+            if key is None:
+                self.invalid += 1
+                self._pending_unparsed.append((url, char or '', source, seen_at))
+                self._maybe_flush()
+                return False
+
+            is_new = key not in self._keys
+            if is_new:
+                self._keys.add(key)
+                self._pending_urls.append((key, seen_at, source))
+            if char:
+                self._chars.add(char)
+                self._pending_chars.append((key, char, variant_id or key_variant_id(key), seen_at))
+            self._maybe_flush()
+        return is_new
+
+    def _maybe_flush(self):
+        pending = len(self._pending_urls) + len(self._pending_chars) + len(self._pending_unparsed)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """提交未写入的记录"""
+        with self._lock:
+            if self._pending_urls or self._pending_chars or self._pending_unparsed:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO urls (key, first_seen, source) VALUES (?, ?, ?)",
+                        self._pending_urls)
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO url_chars (key, char, variant_id, first_seen) "
+                        "VALUES (?, ?, ?, ?)",
+                        self._pending_chars)
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO unparsed_urls (url, char, source, first_seen) "
+                        "VALUES (?, ?, ?, ?)",
+                        self._pending_unparsed)
+                self._pending_urls.clear()
+                self._pending_chars.clear()
+                self._pending_unparsed.clear()
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def chars_for(self, url: str) -> List[str]:
+        key = url_key(url)
+        if key is None:
+            return []
+        self.flush()
+        rows = self._conn.execute(
+            "SELECT char FROM url_chars WHERE key = ? ORDER BY first_seen", (key,))
+        return [char for (char,) in rows]
+
+    def urls_for(self, char: str) -> List[str]:
+        self.flush()
+        rows = self._conn.execute(
+            "SELECT key FROM url_chars WHERE char = ? ORDER BY first_seen, key", (char,))
+        return [key_to_url(key) for (key,) in rows]
+
+    def char_urls(self) -> Dict[str, List[str]]:
+        """汉字 -> URL 列表（按首次发现时间排序）"""
+        self.flush()
+        result: Dict[str, List[str]] = {}
+        rows = self._conn.execute("SELECT char, key FROM url_chars ORDER BY char, first_seen, key")
+        for char, key in rows:
+            result.setdefault(char, []).append(key_to_url(key))
+        return result
+
+    def unattributed_urls(self) -> List[str]:
+        """还不知道对应汉字的 URL"""
+        self.flush()
+        rows = self._conn.execute(
+            "SELECT key FROM urls WHERE key NOT IN (SELECT key FROM url_chars) ORDER BY first_seen, key")
+        return [key_to_url(key) for (key,) in rows]
+
+    def unparsed_urls(self) -> List[Tuple[str, str]]:
+        """无法编码为整数键的原始 URL: [(URL, 汉字或空串)]，按首次发现时间排序"""
+        self.flush()
+        rows = self._conn.execute("SELECT url, char FROM unparsed_urls ORDER BY first_seen, url")
+        return [(url, char) for url, char in rows]
+
+    def stats(self) -> Dict:
+        self.flush()
+        attributed = self._conn.execute("SELECT COUNT(DISTINCT key) FROM url_chars").fetchone()[0]
+        by_source = dict(self._conn.execute(
+            "SELECT COALESCE(source, ''), COUNT(*) FROM urls GROUP BY source").fetchall())
+        unparsed = self._conn.execute("SELECT COUNT(DISTINCT url) FROM unparsed_urls").fetchone()[0]
+        return {
+            'urls': len(self._keys),
+            'chars': len(self._chars),
+            'attributed_urls': attributed,
+            'unattributed_urls': len(self._keys) - attributed,
+            'by_source': by_source,
+            'invalid': self.invalid,
+            'unparsed_urls': unparsed
+        }
+
+    # ------------------------------------------------------------------
+    # 批量导入
+    # ------------------------------------------------------------------
+
+    def import_text(self, path, source: str = 'text') -> Tuple[int, int]:
+        """
+        导入 URL 文本文件（每行一个 URL，也兼容 "GET /svg_png/... HTTP/1.1" 这类残缺行）
+
+        Returns:
+            (新增数, 读取行数)
+        """
+        added = lines = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                lines += 1
+                added += self.add(line, source=source)
+        self.flush()
+        return added, lines
+
+    def _import_session(self, entries: Iterable[Tuple[float, str, str, Optional[str]]],
+                        source: str, ttl: float) -> Dict:
+        """导入 (时间戳, 客户端, URL, cnChar) 序列：先记录查询，再按时间归属图片"""
+        correlator = QueryCorrelator(ttl=ttl)
+        added = images = 0
+        for timestamp, client, url, cn_char in sorted(entries, key=lambda e: e[0]):
+            if cn_char is not None:
+                decoded = decode_cn_char(cn_char)
+                if decoded and is_cjk(decoded[0]):
+                    correlator.record_at(client, timestamp, decoded[0])
+            elif parse_image_url(url):
+                images += 1
+                char = correlator.attribute_at(client, timestamp)
+                added += self.add(url, char=char, source=source, seen_at=timestamp)
+        self.flush()
+        return {'images': images, 'added': added, 'correlation': correlator.stats()}
+
+    def import_charles(self, path, ttl: float = 30.0) -> Dict:
+        """导入 Charles JSON 会话（.chlsj）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+
+        def entries():
+            for entry in session:
+                path_ = entry.get('path') or ''
+                query = entry.get('query') or ''
+                try:
+                    timestamp = datetime.fromisoformat(entry['times']['start']).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                client = (entry.get('clientAddress') or '').lstrip('/')
+                url = f"https://{entry.get('host', '')}{path_}"
+                cn_char = parse_qs(query).get('cnChar', [None])[0] if 'queryDict' in query else None
+                yield timestamp, client, url, cn_char
+
+        return self._import_session(entries(), 'charles', ttl)
+
+    def import_har(self, path, ttl: float = 30.0) -> Dict:
+        """导入 HAR 文件（浏览器 / Charles 导出）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            har = json.load(f)
+
+        def entries():
+            for entry in har['log']['entries']:
+                url = entry['request']['url']
+                try:
+                    timestamp = datetime.fromisoformat(
+                        entry['startedDateTime'].replace('Z', '+00:00')).timestamp()
+                except (KeyError, ValueError):
+                    continue
+                query = urlsplit(url).query
+                cn_char = parse_qs(query).get('cnChar', [None])[0] if 'queryDict' in query else None
+                yield timestamp, '', url, cn_char
+
+        return self._import_session(entries(), 'har', ttl)
+
+    def import_catalog(self, data_dir) -> int:
+        """从字形目录导入已下载变体的 URL -> 汉字，返回新增归属数"""
+        from glyph_catalog import GlyphCatalog
+
+        catalog = GlyphCatalog(data_dir, auto_migrate=False)
+        # 已有的 (key, 汉字) 一次载入内存，逐行查询会让每一行都提交一次
+        self.flush()
+        known = set(self._conn.execute("SELECT key, char FROM url_chars"))
+        added = 0
+        for char, variant_id, variant in catalog.iter_variants():
+            url = variant.get('url')
+            key = url_key(url) if url else None
+            if key is None:
+                continue
+            if (key, char) not in known:
+                known.add((key, char))
+                added += 1
+            self.add(url, char=char, variant_id=variant_id, source='catalog')
+        self.flush()
+        return added
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+
+    def export_char_lists(self, output_dir) -> Dict:
+        """
+        按汉字导出 URL 列表
+
+        输出:
+            {output_dir}/6c34_水.txt       每个汉字一个文件（download_from_urls.py 的输入）
+            {output_dir}/unattributed.txt  未归属的 URL
+            {output_dir}/unparsed.txt      无法解析的原始 URL（"URL<TAB>汉字"）
+            {output_dir}/char_urls.json    汉字 -> URL 列表
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        char_urls = self.char_urls()
+        for char, urls in char_urls.items():
+            with open(output_dir / f"{char_dir_name(char)}.txt", 'w', encoding='utf-8') as f:
+                f.writelines(url + '\n' for url in urls)
+
+        unattributed = self.unattributed_urls()
+        with open(output_dir / "unattributed.txt", 'w', encoding='utf-8') as f:
+            f.writelines(url + '\n' for url in unattributed)
+
+        unparsed = self.unparsed_urls()
+        with open(output_dir / "unparsed.txt", 'w', encoding='utf-8') as f:
+            f.writelines(f"{url}\t{char}".rstrip('\t') + '\n' for url, char in unparsed)
+
+        with open(output_dir / "char_urls.json", 'w', encoding='utf-8') as f:
+            json.dump(char_urls, f, indent=2, ensure_ascii=False)
+
+        return {'chars': len(char_urls), 'unattributed': len(unattributed), 'unparsed': len(unparsed)}
+
+    def export_text(self, path) -> int:
+        """导出全部 URL（旧的一行一个 URL 格式）"""
+        self.flush()
+        keys = [key for (key,) in self._conn.execute("SELECT key FROM urls ORDER BY first_seen, key")]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(key_to_url(key) + '\n' for key in keys)
+        return len(keys)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='图片 URL 索引（URL -> 汉字）')
+    parser.add_argument('--db', default=DEFAULT_DB, help='索引数据库')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_import = sub.add_parser('import', help='批量导入')
+    p_import.add_argument('files', nargs='+', help='URL 文本文件 / Charles 会话 (.chlsj) / HAR 文件')
+    p_import.add_argument('--ttl', type=float, default=30.0, help='查询与图片的最大间隔（秒）')
+    p_import.add_argument('--catalog', help='同时导入字形目录（collected_characters）')
+
+    p_export = sub.add_parser('export', help='按汉字导出 URL 列表')
+    p_export.add_argument('--output-dir', '-o', default='./url_lists', help='输出目录')
+    p_export.add_argument('--text', help='另外导出全部 URL 到文本文件')
+
+    p_lookup = sub.add_parser('lookup', help='查询 URL 或汉字')
+    p_lookup.add_argument('items', nargs='+', help='URL 或汉字')
+
+    sub.add_parser('stats', help='统计')
+
+    args = parser.parse_args()
+    index = UrlIndex(args.db)
+
+    print("=" * 70)
+    print("🗂️  图片 URL 索引")
+    print("=" * 70)
+    print(f"📁 数据库: {args.db}")
+    print()
+
+    if args.command == 'import':
+        for item in args.files:
+            path = Path(item)
+            started = time.perf_counter()
+            if path.suffix.lower() == '.chlsj':
+                result = index.import_charles(path, args.ttl)
+            elif path.suffix.lower() == '.har':
+                result = index.import_har(path, args.ttl)
+            else:
+                added, lines = index.import_text(path)
+                result = {'images': lines, 'added': added}
+            elapsed = time.perf_counter() - started
+
+            line = f"📥 {path.name}: {result['images']} 个图片 URL，新增 {result['added']} ({elapsed:.2f}s)"
+            if 'correlation' in result:
+                correlation = result['correlation']
+                line += f"，归属 {correlation['attributed']} ({correlation['attribution_rate'] * 100:.1f}%)"
+            print(line)
+        if args.catalog:
+            print(f"📥 字形目录: 新增 {index.import_catalog(args.catalog)} 个归属")
+
+    elif args.command == 'export':
+        result = index.export_char_lists(args.output_dir)
+        print(f"📤 {result['chars']} 个汉字的 URL 列表 -> {args.output_dir}/")
+        print(f"   未归属: {result['unattributed']} 个 URL -> {args.output_dir}/unattributed.txt")
+        if result['unparsed']:
+            print(f"   无法解析: {result['unparsed']} 个 URL -> {args.output_dir}/unparsed.txt")
+        if args.text:
+            print(f"📤 全部 {index.export_text(args.text)} 个 URL -> {args.text}")
+
+    elif args.command == 'lookup':
+        for item in args.items:
+            if parse_image_url(item):
+                chars = index.chars_for(item)
+                status = '✅' if item in index else '❌'
+                print(f"{status} {item}: {''.join(chars) or '(未归属)'}")
+            else:
+                for char in item:
+                    urls = index.urls_for(char)
+                    print(f"{char}: {len(urls)} 个 URL")
+                    for url in urls:
+                        print(f"   {url}")
+
+    stats = index.stats()
+    print()
+    print(f"📊 URL: {stats['urls']}  汉字: {stats['chars']}  "
+          f"已归属: {stats['attributed_urls']}  未归属: {stats['unattributed_urls']}")
+    if stats['invalid'] or stats['unparsed_urls']:
+        print(f"⚠️  无法解析的 URL: 本次 {stats['invalid']}，已保存 {stats['unparsed_urls']}（见 unparsed_urls 表）")
+    print("=" * 70)
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
+
+
+"""
+使用方法:
+=========
+# 导入已有的 URL 文件和 Charles 会话
+python3 url_index.py import auto_extracted_urls.txt extracted_urls.txt "charles json session.chlsj"
+
+# 导入已下载图片的归属
+python3 url_index.py import --catalog ./collected_characters auto_extracted_urls.txt
+
+# 按汉字导出 URL 列表，交给下载器
+python3 url_index.py export -o url_lists
+python3 download_from_urls.py url_lists/6c34_水.txt ./images/6c34_水
+
+# 查询
+python3 url_index.py lookup 永 https://sfapi.fanglige.com/svg_png/62/2omf.png
+python3 url_index.py stats
+
+# 在代码中使用
+from url_index import UrlIndex
+
+index = UrlIndex('./url_index.sqlite3')
+if url not in index:              # O(1)，内存中的整数键集合
+    index.add(url, char='永', source='proxy')
+index.close()
+"""
@@ -12,6 +12,13 @@ import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+# 按扩展名设置 Content-Type（PNG 原图 + derivatives.py 生成的 WebP/AVIF）
+CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+}
+
 class CharacterImageUploader:
     """汉字图片上传器"""
     
@@ -74,7 +81,7 @@ class CharacterImageUploader:
                 bucket,
                 key,
                 ExtraArgs={
-                    'ContentType': 'image/png',
+                    'ContentType': CONTENT_TYPES.get(Path(local_path).suffix.lower(), 'image/png'),
                     'CacheControl': 'public, max-age=31536000',  # 1年缓存
                     'ACL': 'public-read'  # 公开访问
                 }
@@ -103,7 +110,9 @@ class CharacterImageUploader:
             上传统计信息
         """
         local_path = Path(local_dir)
-        files = list(local_path.glob('*.png'))
+        # 包含多变体目录和衍生格式: 6c34_水/59-2jsr.png, 6c34_水/59-2jsr/w64.webp
+        files = sorted(p for p in local_path.rglob('*') if p.suffix.lower() in CONTENT_TYPES)
+        keys = {f: f"{prefix}{f.relative_to(local_path).as_posix()}" for f in files}
         
         print(f"📂 找到 {len(files)} 个图片文件")
         print(f"☁️  上传到: {self.provider.upper()} - {bucket}/{prefix}")
@@ -122,7 +131,7 @@ class CharacterImageUploader:
                     self.upload_file,
                     str(f),
                     bucket,
-                    f"{prefix}{f.name}"
+                    keys[f]
                 ): f for f in files
             }
             
@@ -134,12 +143,15 @@ class CharacterImageUploader:
                     if future.result():
                         stats['success'] += 1
                         
-                        # 生成访问URL
-                        url = self._get_public_url(bucket, f"{prefix}{file.name}")
-                        stats['urls'].append({
-                            'char': file.stem.split('_')[-1] if '_' in file.stem else '',
-                            'url': url
-                        })
+                        # 生成访问URL（只记录顶层 PNG：旧版 6c34_水.png 或变体目录 6c34_水/xxx.png）
+                        relative = file.relative_to(local_path)
+                        if file.suffix.lower() == '.png' and len(relative.parts) <= 2:
+                            name = relative.parts[0] if len(relative.parts) == 2 else file.stem
+                            url = self._get_public_url(bucket, keys[file])
+                            stats['urls'].append({
+                                'char': name.split('_')[-1] if '_' in name else '',
+                                'url': url
+                            })
                     else:
                         stats['failed'] += 1
                     
@@ -0,0 +1,681 @@
+#!/usr/bin/env python3
+"""
+搜索 API 压测工具
+
+按真实的查询组合向 /api/search 发请求，统计延迟分布、吞吐量和错误率:
+- single:  单个常用字（按字频 Zipf 分布，热点字集中）
+- phrase:  2~8 字的常用词组
+- long:    20~100 字的长句（夹带中文标点）
+- unknown: 生僻字 / 扩展 A（通常未采集，返回占位信息）
+- noise:   英文、数字、符号、emoji 等非汉字内容
+
+目标可以是任意部署（Worker / wrangler dev / reference_server.py），
+--local 时自动启动本地参考服务器，无需网络即可运行。
+
+结果可以用 --output 保存为 JSON，再用 --compare 与之前的结果对比。
+只依赖标准库（asyncio 实现的 HTTP/1.1 keep-alive 客户端）。
+"""
+
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'data-collection'))
+
+from reference_server import is_chinese_code_unit
+
+
+RESULTS_SCHEMA = 1
+DEFAULT_MIX = {'single': 40, 'phrase': 30, 'long': 10, 'unknown': 10, 'noise': 10}
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+PUNCTUATION = '，。、；：？！“”（）《》'
+NOISE_WORDS = ['hello', 'test', 'api', 'search', 'abc', 'Python', 'worker', 'null', 'undefined', '42',
+               '2024', '3.14', '%', '&', '+', '?', '=', '#', '<script>', 'SELECT *', '😀', '👍', '🌏',
+               'café', 'ñ', 'Ω', 'ありがとう', '한국어', '　', '  ']
+
+
+# ============================================================================
+# 查询组合
+# ============================================================================
+
+def _zipf_weights(count: int, exponent: float = 1.0) -> List[float]:
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class QueryMix:
+    """按权重生成查询（同一个种子生成的序列相同）"""
+
+    def __init__(self, mix: Dict[str, float] = None, seed: int = 0, accept_ratio: float = 0.5,
+                 sizes=(32, 64, 128, 256)):
+        """
+        Args:
+            mix: {类别: 权重}，类别为 single / phrase / long / unknown / noise
+            seed: 随机种子
+            accept_ratio: 带 Accept: image/avif,image/webp 和 size 参数的请求比例
+            sizes: size 参数的取值
+        """
+        from char_tiers import common_chars
+
+        self.mix = dict(mix or DEFAULT_MIX)
+        unknown_kinds = set(self.mix) - set(DEFAULT_MIX)
+        if unknown_kinds:
+            raise ValueError(f"未知的查询类别: {', '.join(sorted(unknown_kinds))}")
+
+        self.rng = random.Random(seed)
+        self.accept_ratio = accept_ratio
+        self.sizes = list(sizes)
+
+        self.common = common_chars(max_tier=1)
+        if not self.common:
+            raise RuntimeError("没有可用的常用字表（char_tiers/ 或 common_3500_chars.txt）")
+        self._common_weights = _zipf_weights(len(self.common))
+
+        # 生僻字：基本区中不在三级字表里的字 + 扩展 A
+        listed = set(common_chars(max_tier=3))
+        self.rare = [chr(c) for c in range(0x4e00, 0xa000) if chr(c) not in listed]
+        self.rare += [chr(c) for c in range(0x3400, 0x4dc0)]
+
+        self._kinds = list(self.mix)
+        self._kind_weights = list(accumulate(self.mix[k] for k in self._kinds))
+
+    def _common_chars(self, count: int) -> str:
+        return ''.join(self.rng.choices(self.common, cum_weights=self._common_weights, k=count))
+
+    def _query(self, kind: str) -> str:
+        rng = self.rng
+        if kind == 'single':
+            return self._common_chars(1)
+        if kind == 'phrase':
+            return self._common_chars(rng.randint(2, 8))
+        if kind == 'long':
+            parts = []
+            remaining = rng.randint(20, 100)
+            while remaining > 0:
+                clause = min(remaining, rng.randint(4, 15))
+                parts.append(self._common_chars(clause) + rng.choice(PUNCTUATION))
+                remaining -= clause
+            return ''.join(parts)
+        if kind == 'unknown':
+            query = ''.join(rng.choice(self.rare) for _ in range(rng.randint(1, 4)))
+            return query + self._common_chars(1) if rng.random() < 0.3 else query
+        # noise: 纯非汉字，偶尔混入一个汉字
+        query = ' '.join(rng.choice(NOISE_WORDS) for _ in range(rng.randint(1, 4)))
+        return query + self._common_chars(1) if rng.random() < 0.2 else query
+
+    def next(self) -> Tuple[str, str, Dict[str, str]]:
+        """
+        生成一个请求
+
+        Returns:
+            (类别, 请求路径, 请求头)
+        """
+        kind = self.rng.choices(self._kinds, cum_weights=self._kind_weights)[0]
+        path = '/api/search?q=' + quote(self._query(kind), safe='')
+        headers = {}
+        if self.rng.random() < self.accept_ratio:
+            headers['Accept'] = 'image/avif,image/webp,*/*'
+            path += f"&size={self.rng.choice(self.sizes)}"
+        return kind, path, headers
+
+    def plan(self, count: int) -> List[Tuple[str, str, Dict[str, str]]]:
+        return [self.next() for _ in range(count)]
+
+
+def load_query_file(path) -> List[Tuple[str, str, Dict[str, str]]]:
+    """从文件读取查询（每行一个，例如从访问日志中提取），类别记为 file"""
+    plan = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            query = line.rstrip('\n')
+            if query:
+                plan.append(('file', '/api/search?q=' + quote(query, safe=''), {}))
+    return plan
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'single=40,phrase=30' -> {'single': 40.0, 'phrase': 30.0}"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+def expected_count(query: str) -> int:
+    """Worker 对该查询返回的结果数（BMP 内的汉字个数）"""
+    return sum(1 for c in query if ord(c) <= 0xffff and is_chinese_code_unit(ord(c)))
+
+
+# ============================================================================
+# 延迟直方图
+# ============================================================================
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图（相邻桶相差 1%），可合并、可序列化"""
+
+    GROWTH = 1.01
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets: Counter = Counter()  # 桶下标 -> 次数，桶上界为 GROWTH ** (下标 + 1) 微秒
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log(micros) / self._LOG_GROWTH)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram"):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """第 p 百分位的延迟（秒），取所在桶的上界并限制在 [min, max] 内"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self.GROWTH ** (index + 1) / 1e6, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {'count': 0}
+        result = {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3),
+            'min_ms': round(self.min * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+        for p in PERCENTILES:
+            result[f"p{p:g}_ms"] = round(self.percentile(p) * 1000, 3)
+        return result
+
+    def to_buckets(self) -> List[List[float]]:
+        """[[桶上界 ms, 次数], ...]"""
+        return [[round(self.GROWTH ** (index + 1) / 1000, 4), self.buckets[index]] for index in sorted(self.buckets)]
+
+
+# ============================================================================
+# HTTP 客户端
+# ============================================================================
+
+class HttpConnection:
+    """asyncio 上的 HTTP/1.1 keep-alive 连接（支持 Content-Length / chunked / 读到关闭）"""
+
+    def __init__(self, host: str, port: int, use_ssl: bool, host_header: str):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self.host_header = host_header
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl, server_hostname=self.host if self.ssl else None)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, path: str, headers: Dict[str, str]) -> Tuple[int, bytes]:
+        """
+        发送 GET 请求
+
+        Returns:
+            (状态码, 响应体)
+        """
+        if self.writer is None:
+            await self._connect()
+
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host_header}", "User-Agent: handwriting-load-test"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+        status = int(status_line.split(' ', 2)[1])
+        response_headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in response_headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readuntil(b'\r\n')  # 不支持 trailer
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            body = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await self.reader.read()
+            self.close()
+            return status, body
+
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, body
+
+
+# ============================================================================
+# 压测
+# ============================================================================
+
+class LoadTestResult:
+    """压测统计（总体 + 按查询类别）"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.by_kind: Dict[str, LatencyHistogram] = {}
+        self.kind_errors: Counter = Counter()
+        self.status_counts: Counter = Counter()
+        self.errors: Counter = Counter()  # 错误类型 -> 次数
+        self.bytes_received = 0
+        self.duration = 0.0
+
+    def record(self, kind: str, seconds: float, status: Optional[int], size: int, error: Optional[str]):
+        self.latency.record(seconds)
+        self.by_kind.setdefault(kind, LatencyHistogram()).record(seconds)
+        self.status_counts[str(status) if status is not None else 'none'] += 1
+        self.bytes_received += size
+        if error:
+            self.errors[error] += 1
+            self.kind_errors[kind] += 1
+
+    @property
+    def requests(self) -> int:
+        return self.latency.count
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    def to_dict(self) -> Dict:
+        requests = self.requests
+        return {
+            'summary': {
+                'requests': requests,
+                'errors': self.error_count,
+                'error_rate': round(self.error_count / requests, 6) if requests else 0.0,
+                'duration_s': round(self.duration, 3),
+                'throughput_rps': round(requests / self.duration, 2) if self.duration else 0.0,
+                'bytes_received': self.bytes_received,
+                'latency': self.latency.summary(),
+            },
+            'status_counts': dict(sorted(self.status_counts.items())),
+            'errors': dict(self.errors),
+            'by_kind': {
+                kind: {**histogram.summary(), 'errors': self.kind_errors[kind]}
+                for kind, histogram in sorted(self.by_kind.items())
+            },
+            'histogram_ms': self.latency.to_buckets(),
+        }
+
+
+class LoadTester:
+    """固定并发的闭环压测：每个并发连接发完一个请求立即发下一个"""
+
+    def __init__(self, base_url: str, plan: List[Tuple[str, str, Dict[str, str]]], concurrency: int = 16,
+                 timeout: float = 10.0, verify: bool = False):
+        """
+        Args:
+            base_url: 目标地址（http://127.0.0.1:8787 / https://xxx.workers.dev）
+            plan: 请求列表 [(类别, 路径, 请求头)]，按顺序循环使用
+            concurrency: 并发连接数
+            timeout: 单个请求超时（秒）
+            verify: 校验搜索响应（success 且 count 与查询中的汉字数一致）
+        """
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"不支持的地址: {base_url}")
+        self.use_ssl = url.scheme == 'https'
+        self.host = url.hostname
+        self.port = url.port or (443 if self.use_ssl else 80)
+        self.host_header = url.netloc
+        self.prefix = url.path.rstrip('/')
+
+        self.plan = plan
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.verify = verify
+        self._next = 0
+
+    def _take(self) -> Tuple[str, str, Dict[str, str]]:
+        item = self.plan[self._next % len(self.plan)]
+        self._next += 1
+        return item
+
+    def _check(self, path: str, status: int, body: bytes) -> Optional[str]:
+        """返回错误类型，正常时返回 None"""
+        if not 200 <= status < 300:
+            return f"http_{status}"
+        if self.verify:
+            query = parse_qs(urlsplit(path).query)['q'][0]
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return 'invalid_json'
+            if not data.get('success') or data.get('count') != expected_count(query):
+                return 'unexpected_result'
+        return None
+
+    async def _worker(self, result: LoadTestResult, deadline: float, remaining: List[int]):
+        connection = HttpConnection(self.host, self.port, self.use_ssl, self.host_header)
+        try:
+            while remaining[0] > 0 and time.perf_counter() < deadline:
+                remaining[0] -= 1
+                kind, path, headers = self._take()
+                status, body, error = None, b'', None
+                started = time.perf_counter()
+                try:
+                    status, body = await asyncio.wait_for(
+                        connection.request(self.prefix + path, headers), self.timeout)
+                except asyncio.TimeoutError:
+                    error = 'timeout'
+                except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+                    error = type(e).__name__
+                elapsed = time.perf_counter() - started
+
+                if error:
+                    connection.close()  # 出错后重新建立连接
+                else:
+                    error = self._check(path, status, body)
+                if result is not None:
+                    result.record(kind, elapsed, status, len(body), error)
+        finally:
+            connection.close()
+
+    async def run(self, requests: Optional[int] = None, duration: Optional[float] = None,
+                  warmup: int = 0) -> LoadTestResult:
+        """
+        执行压测
+
+        Args:
+            requests: 总请求数（不含预热）
+            duration: 持续时间（秒），与 requests 同时给出时先到者结束
+            warmup: 预热请求数（不计入统计）
+
+        Returns:
+            LoadTestResult
+        """
+        if warmup:
+            warmup_remaining = [warmup]
+            await asyncio.gather(*(self._worker(None, math.inf, warmup_remaining)
+                                   for _ in range(min(self.concurrency, warmup))))
+
+        result = LoadTestResult()
+        remaining = [requests if requests else math.inf]
+        started = time.perf_counter()
+        deadline = started + duration if duration else math.inf
+        await asyncio.gather(*(self._worker(result, deadline, remaining) for _ in range(self.concurrency)))
+        result.duration = time.perf_counter() - started
+        return result
+
+
+# ============================================================================
+# 本地目标（参考服务器）
+# ============================================================================
+
+def synthetic_mapping(chars: List[str], domain_prefix: str = 'chars') -> Dict[str, Dict]:
+    """为常用字生成带衍生格式的映射（没有真实数据时用作本地目标）"""
+    mapping = {}
+    for char in chars:
+        base = f"{ord(char):04x}_{char}"
+        mapping[char] = {
+            'filename': f"{base}.png",
+            'unicode': f"U+{ord(char):04X}",
+            'size': 4000 + ord(char) % 2000,
+            'timestamp': '2024-01-01T00:00:00',
+            'derivatives': [
+                {'format': fmt, 'label': label, 'width': width,
+                 'bytes': (width * width // ratio) + ord(char) % 97,
+                 'key': f"{domain_prefix}/derivatives/{base}/{label}.{fmt}"}
+                for fmt, ratio in (('webp', 12), ('avif', 16))
+                for label, width in (('full', 256), ('128', 128), ('64', 64))
+            ],
+        }
+    return mapping
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalTarget:
+    """在子进程中启动 reference_server.py（不限速），结束时关闭"""
+
+    def __init__(self, mapping_file=None, data_dir=None):
+        self.mapping_file = mapping_file
+        self.data_dir = data_dir
+        self.process: Optional[subprocess.Popen] = None
+        self._tmp_file = None
+        self.base_url = None
+
+    def __enter__(self) -> "LocalTarget":
+        if not self.mapping_file and not self.data_dir:
+            from char_tiers import common_chars
+            self._tmp_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8')
+            json.dump(synthetic_mapping(common_chars(max_tier=1)), self._tmp_file, ensure_ascii=False)
+            self._tmp_file.close()
+            self.mapping_file = self._tmp_file.name
+
+        port = _free_port()
+        source = ['--mapping', str(self.mapping_file)] if self.mapping_file else ['--data-dir', str(self.data_dir)]
+        self.process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve().parent / 'reference_server.py'),
+             *source, '--port', str(port), '--rate-limit', '0'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.base_url = f"http://127.0.0.1:{port}"
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"参考服务器启动失败: {self.process.stderr.read().decode('utf-8', 'replace')}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError("参考服务器启动超时")
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        if self._tmp_file is not None:
+            os.unlink(self._tmp_file.name)
+
+
+# ============================================================================
+# 报告
+# ============================================================================
+
+def print_report(report: Dict):
+    summary = report['summary']
+    latency = summary['latency']
+    print("=" * 70)
+    print(f"📊 压测结果: {report['target']}")
+    print("=" * 70)
+    print(f"   请求: {summary['requests']}  并发: {report['config']['concurrency']}  "
+          f"用时: {summary['duration_s']:.2f}s")
+    print(f"   吞吐: {summary['throughput_rps']:.1f} req/s  "
+          f"接收: {summary['bytes_received'] / 1024 / 1024:.1f} MB")
+    print(f"   错误: {summary['errors']} ({summary['error_rate'] * 100:.2f}%)  状态码: {report['status_counts']}")
+    if report['errors']:
+        print(f"   错误类型: {report['errors']}")
+    if latency.get('count'):
+        print(f"   延迟: p50 {latency['p50_ms']:.2f} ms  p95 {latency['p95_ms']:.2f} ms  "
+              f"p99 {latency['p99_ms']:.2f} ms  max {latency['max_ms']:.2f} ms")
+    print()
+    print(f"   {'类别':<10}{'请求':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'错误':>8}")
+    for kind, stats in report['by_kind'].items():
+        print(f"   {kind:<12}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{stats['errors']:>8}")
+    print("=" * 70)
+
+
+def print_comparison(report: Dict, baseline: Dict):
+    """与之前保存的结果对比（延迟和错误率越低越好，吞吐越高越好）"""
+    rows = [('throughput_rps', 'req/s', report['summary']['throughput_rps'], baseline['summary']['throughput_rps']),
+            ('error_rate', '', report['summary']['error_rate'], baseline['summary']['error_rate'])]
+    for p in ('p50_ms', 'p95_ms', 'p99_ms'):
+        rows.append((p, 'ms', report['summary']['latency'].get(p, 0), baseline['summary']['latency'].get(p, 0)))
+
+    print(f"🔍 与基线对比: {baseline.get('target')} ({baseline.get('started_at')})")
+    print(f"   {'指标':<16}{'基线':>12}{'本次':>12}{'变化':>10}")
+    for name, unit, current, previous in rows:
+        change = f"{(current - previous) / previous * 100:+.1f}%" if previous else '-'
+        print(f"   {name:<18}{previous:>12.3f}{current:>12.3f}{change:>10}")
+    print("=" * 70)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='搜索 API 压测')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='目标地址，例如 http://localhost:8787 或 https://xxx.workers.dev')
+    target.add_argument('--local', action='store_true', help='启动本地参考服务器作为目标（离线）')
+    parser.add_argument('--mapping', help='--local 使用的映射文件（默认用常用字生成）')
+    parser.add_argument('--data-dir', help='--local 使用的数据目录')
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help='并发连接数（默认 16）')
+    parser.add_argument('-n', '--requests', type=int, help='总请求数（默认 2000，指定 --duration 时不限）')
+    parser.add_argument('-d', '--duration', type=float, help='持续时间（秒）')
+    parser.add_argument('--warmup', type=int, default=100, help='预热请求数（默认 100）')
+    parser.add_argument('--mix', default=','.join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help='查询组合权重（默认 %(default)s）')
+    parser.add_argument('--queries', help='从文件读取查询（每行一个），代替 --mix')
+    parser.add_argument('--accept-ratio', type=float, default=0.5,
+                        help='带 Accept: image/avif,image/webp 和 size 参数的比例（默认 0.5）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（相同种子生成相同的查询序列）')
+    parser.add_argument('--timeout', type=float, default=10.0, help='单个请求超时（秒）')
+    parser.add_argument('--verify', action='store_true', help='校验响应内容（结果数与查询中的汉字数一致）')
+    parser.add_argument('--output', help='保存 JSON 结果')
+    parser.add_argument('--compare', help='与之前保存的 JSON 结果对比')
+    args = parser.parse_args()
+
+    requests = args.requests or (None if args.duration else 2000)
+    if args.queries:
+        plan = load_query_file(args.queries)
+        mix = None
+    else:
+        mix = parse_mix(args.mix)
+        plan = QueryMix(mix, seed=args.seed, accept_ratio=args.accept_ratio).plan(
+            min(requests or 100000, 100000) + args.warmup)
+
+    with (LocalTarget(args.mapping, args.data_dir) if args.local else nullcontext()) as local:
+        base_url = local.base_url if args.local else args.url
+        print(f"🚀 压测 {base_url}（并发 {args.concurrency}，"
+              f"{f'{requests} 个请求' if requests else f'{args.duration:g} 秒'}）...")
+        tester = LoadTester(base_url, plan, args.concurrency, args.timeout, args.verify)
+        started_at = datetime.now().isoformat()
+        result = asyncio.run(tester.run(requests, args.duration, args.warmup))
+
+    report = {
+        'schema_version': RESULTS_SCHEMA,
+        'target': 'local reference_server.py' if args.local else base_url,
+        'started_at': started_at,
+        'config': {
+            'concurrency': args.concurrency,
+            'requests': requests,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'mix': mix,
+            'queries': args.queries,
+            'accept_ratio': args.accept_ratio,
+            'seed': args.seed,
+            'verify': args.verify,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        **result.to_dict(),
+    }
+
+    print_report(report)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(report, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+📖 使用说明
+===========
+
+1. 离线压测本地参考服务器（映射默认用常用字生成）
+   cd handwriting-api-worker
+   python3 load_test.py --local -n 5000 -c 32 --output baseline.json
+
+   # 使用真实数据
+   python3 load_test.py --local --data-dir ../data-collection/collected_characters -d 30
+
+2. 压测任意部署
+   python3 load_test.py --url http://localhost:8787 -d 60 -c 64
+   python3 load_test.py --url https://handwriting-api.workers.dev -n 2000 -c 8 --verify
+
+   # 注意: Worker 对每个 IP 限速 100 次/分钟，压测线上服务时会大量返回 429
+
+3. 调整查询组合 / 重放日志中的查询
+   python3 load_test.py --local --mix single=80,noise=20
+   python3 load_test.py --url http://localhost:8787 --queries queries.txt
+
+4. 与之前的结果对比
+   python3 load_test.py --local -n 5000 --compare baseline.json --output current.json
+
+📝 结果 JSON
+===========
+summary        请求数、错误率、吞吐量、延迟百分位（p50/p90/p95/p99/p99.9）
+status_counts  各状态码次数（none 表示连接错误 / 超时）
+by_kind        按查询类别的延迟和错误
+histogram_ms   延迟直方图 [[桶上界 ms, 次数], ...]（相邻桶相差 1%）
+"""
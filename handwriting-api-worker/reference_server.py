@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+"""
+搜索 API 的 Python 参考实现（本地 / 内网镜像）
+
+与 Cloudflare Worker (src/index.js) 行为一致:
+- /api/search、/api/stats、/api/health、/ 以及 OPTIONS 预检
+- 返回的 JSON 与 Worker 逐字节相同（JSON.stringify(data, null, 2) 格式，timestamp 除外）
+- 每个 IP（CF-Connecting-IP 头，缺省为 unknown）每分钟 100 次的速率限制，可用 --rate-limit 0 关闭
+
+与 Worker 每次请求从 KV 读取整个映射不同，这里启动时把映射加载为按码位索引的内存字典，
+每个字的结果 JSON 片段预先渲染好，请求时只需按 Accept / size 选择衍生格式并拼接。
+
+映射来源:
+- --mapping: char_url_mapping.json / char_mapping_upload.json（与上传到 KV 的内容相同）
+- --data-dir: 数据目录，优先读取 glyph_catalog.json（导出为与 KV 相同的 v1 映射）
+
+只依赖标准库（asyncio），支持 HTTP/1.1 keep-alive。
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import sys
+import time
+from decimal import Decimal
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'data-collection'))
+
+
+API_VERSION = '1.0.0'
+DEFAULT_PUBLIC_DOMAIN = 'handwriting-characters.r2.dev'
+DEFAULT_PORT = 8787  # 与 wrangler dev 相同
+WORKER_SOURCE = Path(__file__).resolve().parent / 'src' / 'index.js'
+
+RATE_LIMIT_PER_MINUTE = 100
+RATE_LIMIT_TTL = 60
+
+CORS_HEADERS = [
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type'),
+    ('Access-Control-Max-Age', '86400'),
+]
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+
+
+# ============================================================================
+# JavaScript 语义（JSON.stringify / String() / 真值 / 比较）
+# ============================================================================
+
+class _Undefined:
+    """JS undefined：对象属性缺失；JSON.stringify 时跳过该键"""
+
+    def __repr__(self):
+        return 'undefined'
+
+
+UNDEFINED = _Undefined()
+
+_SURROGATE_RE = re.compile('[\ud800-\udfff]')
+_ARRAY_INDEX_RE = re.compile(r'(0|[1-9][0-9]*)$')
+_JS_WHITESPACE = ' \t\n\v\f\r\u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006' \
+                 '\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff'
+_PARSE_INT_RE = re.compile(r'[+-]?[0-9]+')
+_NUMERIC_STRING_RE = re.compile(r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?$')
+
+
+def js_get(obj, key):
+    """obj.key：null / undefined 上取属性抛 TypeError，非对象返回 undefined"""
+    if obj is None or obj is UNDEFINED:
+        raise TypeError(f"Cannot read properties of {obj!r} (reading '{key}')")
+    if isinstance(obj, dict):
+        return obj.get(key, UNDEFINED)
+    return UNDEFINED
+
+
+def js_truthy(value) -> bool:
+    if value is None or value is UNDEFINED or value is False:
+        return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value == value and value != 0
+    if isinstance(value, str):
+        return value != ''
+    return True  # 对象和数组（包括空的）都是真值
+
+
+def js_number_to_string(value) -> str:
+    """Number.prototype.toString()"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        if -2 ** 53 < value < 2 ** 53:
+            return str(value)
+        try:
+            value = float(value)
+        except OverflowError:
+            return 'Infinity' if value > 0 else '-Infinity'
+    if value != value:
+        return 'NaN'
+    if math.isinf(value):
+        return 'Infinity' if value > 0 else '-Infinity'
+    if value == 0:
+        return '0'
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+
+    # repr 是最短往返表示，与 JS 的有效数字一致，只有格式不同（大整数同样补零，而不是精确值）
+    _, digit_tuple, exponent = Decimal(repr(abs(value))).normalize().as_tuple()
+    digits = ''.join(map(str, digit_tuple))
+    k, n = len(digits), exponent + len(digits)
+    if k <= n <= 21:
+        text = digits + '0' * (n - k)
+    elif 0 < n <= 21:
+        text = digits[:n] + '.' + digits[n:]
+    elif -6 < n <= 0:
+        text = '0.' + '0' * -n + digits
+    else:
+        text = digits[0] + ('.' + digits[1:] if k > 1 else '') + f"e{'+' if n > 0 else '-'}{abs(n - 1)}"
+    return ('-' if value < 0 else '') + text
+
+
+def js_to_string(value) -> str:
+    """String(value)，用于模板字符串"""
+    if value is UNDEFINED:
+        return 'undefined'
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return js_number_to_string(value)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ','.join('' if item is None or item is UNDEFINED else js_to_string(item) for item in value)
+    return '[object Object]'
+
+
+def js_to_number(value) -> float:
+    """关系比较时的 ToNumber（对象和数组按 NaN 处理）"""
+    if value is None:
+        return 0.0
+    if isinstance(value, (bool, int, float)):
+        try:
+            return float(value)
+        except OverflowError:
+            return math.inf if value > 0 else -math.inf
+    if isinstance(value, str):
+        text = value.strip(_JS_WHITESPACE)
+        if not text:
+            return 0.0
+        if _NUMERIC_STRING_RE.match(text):
+            return float(text)
+        if text in ('Infinity', '+Infinity', '-Infinity'):
+            return -math.inf if text[0] == '-' else math.inf
+        for prefix, base in (('0x', 16), ('0o', 8), ('0b', 2)):
+            if text[:2].lower() == prefix:
+                try:
+                    return float(int(text[2:], base))
+                except ValueError:
+                    return math.nan
+    return math.nan
+
+
+def js_less_than(a, b) -> bool:
+    """a < b：两个字符串按 UTF-16 码元比较，否则按数值比较（NaN 为 false）"""
+    if isinstance(a, str) and isinstance(b, str):
+        return a.encode('utf-16-be', 'surrogatepass') < b.encode('utf-16-be', 'surrogatepass')
+    return js_to_number(a) < js_to_number(b)
+
+
+def js_parse_int(text: Optional[str]) -> int:
+    """parseInt(text, 10) || 0"""
+    if text is None:
+        return 0
+    match = _PARSE_INT_RE.match(text.lstrip(_JS_WHITESPACE))
+    return int(match.group()) if match else 0
+
+
+def js_json_string(text: str) -> str:
+    """JSON.stringify(string)：不转义非 ASCII，单独的代理项转义为 \\uXXXX"""
+    encoded = json.dumps(text, ensure_ascii=False)
+    return _SURROGATE_RE.sub(lambda m: f"\\u{ord(m.group()):04x}", encoded)
+
+
+def _js_keys(obj: Dict) -> List[str]:
+    """对象键顺序：数组下标形式的键按数值升序在前，其余按插入顺序"""
+    index_keys = [k for k in obj if _ARRAY_INDEX_RE.match(k) and int(k) < 2 ** 32 - 1]
+    if not index_keys:
+        return list(obj)
+    index_set = set(index_keys)
+    return sorted(index_keys, key=int) + [k for k in obj if k not in index_set]
+
+
+def js_members(obj: Dict, depth: int) -> List[str]:
+    """对象在 depth 层的成员行（'    "key": value'），跳过 undefined"""
+    indent = '  ' * (depth + 1)
+    return [
+        f"{indent}{js_json_string(key)}: {js_stringify(obj[key], depth + 1)}"
+        for key in _js_keys(obj) if obj[key] is not UNDEFINED
+    ]
+
+
+def js_stringify(value, depth: int = 0) -> str:
+    """JSON.stringify(value, null, 2)；depth 为嵌套层级（决定缩进）"""
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, (int, float)):
+        text = js_number_to_string(value)
+        return 'null' if text in ('NaN', 'Infinity', '-Infinity') else text
+    if isinstance(value, str):
+        return js_json_string(value)
+    closing = '  ' * depth
+    if isinstance(value, list):
+        if not value:
+            return '[]'
+        indent = '  ' * (depth + 1)
+        items = ['null' if item is UNDEFINED else js_stringify(item, depth + 1) for item in value]
+        return '[\n' + indent + f",\n{indent}".join(items) + '\n' + closing + ']'
+    members = js_members(value, depth)
+    if not members:
+        return '{}'
+    return '{\n' + ',\n'.join(members) + '\n' + closing + '}'
+
+
+def iso_timestamp(now: Optional[float] = None) -> str:
+    """new Date().toISOString()"""
+    millis = int((time.time() if now is None else now) * 1000)
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(millis // 1000)) + f".{millis % 1000:03d}Z"
+
+
+# ============================================================================
+# 内存索引
+# ============================================================================
+
+def is_chinese_code_unit(code: int) -> bool:
+    """
+    Worker 的 isChineseChar：取 charCodeAt(0)，扩展 B 等 BMP 以外的字得到的是代理项，
+    因此实际上只有基本区和扩展 A 会被处理（这里保持一致）
+    """
+    return 0x4e00 <= code <= 0x9fff or 0x3400 <= code <= 0x4dbf or 0x20000 <= code <= 0x2a6df
+
+
+# 结果数组中每个字的对象位于第 2 层：成员缩进 6 格，闭合括号缩进 4 格
+_ITEM_DEPTH = 2
+_ITEM_CLOSE = '\n' + '  ' * _ITEM_DEPTH + '}'
+_IMAGE_PREFIX = '  ' * (_ITEM_DEPTH + 1) + '"image": '
+
+
+class _Entry:
+    """一个字预先渲染好的结果片段"""
+    __slots__ = ('static', 'head', 'derivatives', 'atlas', 'error')
+
+    def __init__(self, static=None, head=None, derivatives=None, atlas=None, error=None):
+        self.static = static            # 与请求参数无关时的完整片段
+        self.head = head                # char ~ derivatives 的成员行
+        self.derivatives = derivatives  # [(format, label, width, bytes, 片段)]
+        self.atlas = atlas              # (PNG 成员行, WebP 成员行)
+        self.error = error              # Worker 处理该字时会抛出的异常
+
+
+def pick_derivative(derivatives: List[Tuple], accept: str, size: int) -> Optional[Tuple]:
+    """与 Worker 的 pickDerivative 相同的选择规则"""
+    accepts_webp = 'image/webp' in accept
+    accepts_avif = 'image/avif' in accept
+    supported = [
+        d for d in derivatives
+        if (d[0] == 'webp' and accepts_webp) or (d[0] == 'avif' and accepts_avif)
+    ]
+    if not supported:
+        return None
+
+    full = [d for d in supported if d[1] == 'full']
+    candidates = [d for d in supported if js_to_number(d[2]) >= size] if size > 0 else full
+    if not candidates:
+        candidates = full
+    if not candidates:
+        return None
+
+    best = candidates[0]
+    for d in candidates[1:]:
+        if js_less_than(d[3], best[3]):
+            best = d
+    return best
+
+
+class MappingIndex:
+    """按码位索引的字符映射（启动时加载，只读）"""
+
+    def __init__(self, mapping: Dict, public_domain: Optional[str] = None):
+        """
+        Args:
+            mapping: 与 KV 中 char_mapping 相同的映射 {汉字: 条目}
+            public_domain: R2 公开域名（Worker 的 R2_PUBLIC_DOMAIN）
+        """
+        self.domain = public_domain or DEFAULT_PUBLIC_DOMAIN
+        self.total_characters = len(mapping)
+        self._entries: Dict[int, _Entry] = {}
+        self._missing: Dict[int, _Entry] = {}
+
+        for char, data in mapping.items():
+            # 多字符的键和 BMP 以外的字永远不会被 Worker 查到
+            if len(char) == 1 and ord(char) <= 0xffff and is_chinese_code_unit(ord(char)) and js_truthy(data):
+                self._entries[ord(char)] = self._build_entry(char, data)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _asset_url(self, key) -> str:
+        return f"https://{self.domain}/{js_to_string(key)}"
+
+    def _build_entry(self, char: str, data) -> _Entry:
+        code = ord(char)
+        url = js_get(data, 'url')
+        unicode = js_get(data, 'unicode')
+        result = {
+            'char': char,
+            'url': url if js_truthy(url) else f"https://{self.domain}/chars/{code:04x}_{char}.png",
+            'unicode': unicode if js_truthy(unicode) else f"U+{code:04X}",
+            'filename': js_get(data, 'filename'),
+            'metadata': {
+                'size': js_get(data, 'size'),
+                'timestamp': js_get(data, 'timestamp'),
+            },
+        }
+
+        derivatives = None
+        raw_derivatives = js_get(data, 'derivatives')
+        if isinstance(raw_derivatives, list) and raw_derivatives:
+            try:
+                objects = [{
+                    'format': js_get(d, 'format'),
+                    'label': js_get(d, 'label'),
+                    'width': js_get(d, 'width'),
+                    'bytes': js_get(d, 'bytes'),
+                    'url': self._asset_url(js_get(d, 'key')),
+                } for d in raw_derivatives]
+            except TypeError as e:
+                return _Entry(error=e)
+            result['derivatives'] = objects
+            derivatives = [
+                (d['format'], d['label'], d['width'], d['bytes'], js_stringify(d, _ITEM_DEPTH + 1))
+                for d in objects
+            ]
+
+        atlas = None
+        raw_atlas = js_get(data, 'atlas')
+        if js_truthy(raw_atlas):
+            keys = js_get(raw_atlas, 'keys')
+            keys = keys if js_truthy(keys) else {}
+            webp_key = js_get(keys, 'webp')
+            atlas = tuple(
+                js_members({'atlas': {
+                    'id': js_get(raw_atlas, 'id'),
+                    'url': self._asset_url(webp_key if js_truthy(webp_key) and accepts_webp
+                                           else js_get(keys, 'png')),
+                    'width': js_get(raw_atlas, 'width'),
+                    'height': js_get(raw_atlas, 'height'),
+                    'x': js_get(raw_atlas, 'x'),
+                    'y': js_get(raw_atlas, 'y'),
+                    'w': js_get(raw_atlas, 'w'),
+                    'h': js_get(raw_atlas, 'h'),
+                }}, _ITEM_DEPTH)[0]
+                for accepts_webp in (False, True)
+            )
+
+        head = ',\n'.join(js_members(result, _ITEM_DEPTH))
+        if derivatives is None and atlas is None:
+            return _Entry(static='{\n' + head + _ITEM_CLOSE)
+        return _Entry(head=head, derivatives=derivatives, atlas=atlas)
+
+    def _missing_entry(self, code: int) -> _Entry:
+        entry = self._missing.get(code)
+        if entry is None:
+            entry = _Entry(static=js_stringify({
+                'char': chr(code),
+                'url': None,
+                'unicode': f"U+{code:04X}",
+                'available': False,
+                'message': 'Character not yet collected'
+            }, _ITEM_DEPTH))
+            self._missing[code] = entry
+        return entry
+
+    def search(self, query: str, accept: str = '', size: int = 0) -> List[str]:
+        """
+        查询中每个汉字的结果片段（非汉字跳过，未采集的字返回占位信息）
+
+        Raises:
+            TypeError: 映射条目在 Worker 中会导致异常（Worker 返回 500）
+        """
+        items = []
+        for char in query:
+            code = ord(char)
+            if code > 0xffff or not is_chinese_code_unit(code):
+                continue
+            entry = self._entries.get(code) or self._missing_entry(code)
+            if entry.static is not None:
+                items.append(entry.static)
+                continue
+            if entry.error is not None:
+                raise entry.error
+
+            parts = [entry.head]
+            if entry.derivatives:
+                best = pick_derivative(entry.derivatives, accept, size)
+                if best is not None:
+                    parts.append(_IMAGE_PREFIX + best[4])
+            if entry.atlas:
+                parts.append(entry.atlas['image/webp' in accept])
+            items.append('{\n' + ',\n'.join(parts) + _ITEM_CLOSE)
+        return items
+
+
+def render_search(query: str, items: List[str], timestamp: str) -> str:
+    """拼接 /api/search 的响应（与 JSON.stringify(data, null, 2) 相同）"""
+    if items:
+        results = '[\n    ' + ',\n    '.join(items) + '\n  ]'
+    else:
+        results = '[]'
+    return (
+        '{\n'
+        '  "success": true,\n'
+        f'  "query": {js_json_string(query)},\n'
+        f'  "results": {results},\n'
+        f'  "count": {len(items)},\n'
+        f'  "timestamp": "{timestamp}"\n'
+        '}'
+    )
+
+
+def load_mapping(mapping_file=None, data_dir=None) -> Dict:
+    """
+    加载字符映射
+
+    Args:
+        mapping_file: char_url_mapping.json 等 v1 映射文件
+        data_dir: 数据目录（有 glyph_catalog.json 时由目录导出映射）
+
+    Returns:
+        {汉字: 条目}
+    """
+    if mapping_file:
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+    else:
+        from glyph_catalog import CATALOG_FILENAME, LEGACY_MAPPING_FILENAME, GlyphCatalog
+
+        data_dir = Path(data_dir)
+        if (data_dir / CATALOG_FILENAME).exists():
+            mapping = GlyphCatalog(data_dir, auto_migrate=False).to_legacy_mapping()
+        elif (data_dir / LEGACY_MAPPING_FILENAME).exists():
+            with open(data_dir / LEGACY_MAPPING_FILENAME, 'r', encoding='utf-8') as f:
+                mapping = json.load(f)
+        else:
+            raise FileNotFoundError(f"{data_dir} 中没有 {CATALOG_FILENAME} 或 {LEGACY_MAPPING_FILENAME}")
+
+    if not isinstance(mapping, dict):
+        raise ValueError("字符映射必须是 JSON 对象 {汉字: 条目}")
+    return mapping
+
+
+def load_root_html() -> Optional[str]:
+    """从 Worker 源码中取出首页 HTML，保证与 Worker 一致"""
+    try:
+        source = WORKER_SOURCE.read_text(encoding='utf-8')
+    except OSError:
+        return None
+    match = re.search(r'const html = `(.*?)`;', source, re.S)
+    return match.group(1) if match else None
+
+
+# ============================================================================
+# 请求处理
+# ============================================================================
+
+class ReferenceApp:
+    """与 Worker fetch() 相同的路由和响应"""
+
+    def __init__(self, index: MappingIndex, rate_limit: int = RATE_LIMIT_PER_MINUTE, clock=time.time):
+        """
+        Args:
+            index: 字符映射索引
+            rate_limit: 每个 IP 每分钟的请求上限，0 表示不限制
+            clock: 时间函数（用于 timestamp 和限速过期）
+        """
+        self.index = index
+        self.rate_limit = rate_limit
+        self.clock = clock
+        self.root_html = load_root_html()
+        self._rate_counters: Dict[str, Tuple[int, float]] = {}
+
+    def handle(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """
+        处理一个请求
+
+        Args:
+            method: HTTP 方法
+            target: 请求目标（/api/search?q=...）
+            headers: 小写键的请求头
+
+        Returns:
+            (状态码, 响应头, 响应体)
+        """
+        if method == 'OPTIONS':
+            return 200, list(CORS_HEADERS), b''
+
+        url = urlsplit(target)
+        path = url.path
+        if path == '/api/search':
+            return self._search(url.query, headers)
+        if path == '/api/health':
+            return self._json({'status': 'healthy', 'timestamp': iso_timestamp(self.clock()), 'version': API_VERSION})
+        if path == '/api/stats':
+            return self._json({
+                'total_characters': self.index.total_characters,
+                'api_version': API_VERSION,
+                'endpoints': ['/api/search?q={query}', '/api/health', '/api/stats']
+            })
+        if path == '/' and self.root_html is not None:
+            return 200, [('Content-Type', 'text/html; charset=utf-8')] + CORS_HEADERS, self.root_html.encode('utf-8')
+        return 404, [('Content-Type', 'text/plain;charset=UTF-8')], b'Not Found'
+
+    @staticmethod
+    def _json(data, status: int = 200):
+        return status, [('Content-Type', JSON_CONTENT_TYPE)] + CORS_HEADERS, js_stringify(data).encode('utf-8')
+
+    def _search(self, query_string: str, headers: Dict[str, str]):
+        query = None
+        for name, value in parse_qsl(query_string, keep_blank_values=True, errors='replace'):
+            if name == 'q':
+                query = value
+                break
+        if not query:
+            return self._json({'success': False, 'error': 'Missing query parameter: q'}, 400)
+
+        if not self._check_rate_limit(headers.get('cf-connecting-ip') or 'unknown'):
+            return self._json({'success': False, 'error': 'Rate limit exceeded. Try again later.'}, 429)
+
+        size = 0
+        for name, value in parse_qsl(query_string, keep_blank_values=True, errors='replace'):
+            if name == 'size':
+                size = js_parse_int(value)
+                break
+
+        try:
+            items = self.index.search(query, headers.get('accept') or '', size)
+        except TypeError as e:
+            print(f"Search error: {e}", file=sys.stderr)
+            return self._json({'success': False, 'error': 'Internal server error'}, 500)
+
+        body = render_search(query, items, iso_timestamp(self.clock()))
+        return 200, [('Content-Type', JSON_CONTENT_TYPE)] + CORS_HEADERS, body.encode('utf-8')
+
+    def _check_rate_limit(self, ip: str) -> bool:
+        """与 Worker 相同：计数达到上限拒绝，每次计数都把过期时间重置为 60 秒后"""
+        if not self.rate_limit:
+            return True
+        now = self.clock()
+        count, expires = self._rate_counters.get(ip, (0, 0.0))
+        if expires <= now:
+            count = 0
+        if count >= self.rate_limit:
+            return False
+        self._rate_counters[ip] = (count + 1, now + RATE_LIMIT_TTL)
+        if len(self._rate_counters) > 100000:
+            self._rate_counters = {k: v for k, v in self._rate_counters.items() if v[1] > now}
+        return True
+
+
+# ============================================================================
+# HTTP/1.1 服务器（asyncio）
+# ============================================================================
+
+_NON_ASCII_RE = re.compile('[\x80-\xff]')
+
+
+def _normalize_target(raw: str) -> str:
+    """请求行中的原始非 ASCII 字节按 URL 规范百分号编码"""
+    return _NON_ASCII_RE.sub(lambda m: f"%{ord(m.group()):02X}", raw)
+
+
+class ReferenceServer:
+    """最小的 asyncio HTTP/1.1 服务器（keep-alive，忽略请求体）"""
+
+    def __init__(self, app: ReferenceApp):
+        self.app = app
+        self.requests_served = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle_connection, host, port, backlog=1024)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lines = head[:-4].decode('latin-1').split('\r\n')
+                parts = lines[0].split(' ')
+                if len(parts) != 3:
+                    writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                method, target, version = parts
+
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    name, value = name.strip().lower(), value.strip()
+                    headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    writer.write(b'HTTP/1.1 501 Not Implemented\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                status, response_headers, body = self.app.handle(method, _normalize_target(target), headers)
+                self.requests_served += 1
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = 'close' not in connection if version == 'HTTP/1.1' else 'keep-alive' in connection
+                response = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+                response += [f"{name}: {value}" for name, value in response_headers]
+                response.append(f"Content-Length: {len(body)}")
+                response.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+                writer.write(('\r\n'.join(response) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def build_app(mapping_file=None, data_dir=None, public_domain=None,
+              rate_limit: int = RATE_LIMIT_PER_MINUTE) -> ReferenceApp:
+    """加载映射并构建应用"""
+    mapping = load_mapping(mapping_file, data_dir)
+    return ReferenceApp(MappingIndex(mapping, public_domain), rate_limit=rate_limit)
+
+
+async def serve(app: ReferenceApp, host: str, port: int):
+    server = ReferenceServer(app)
+    listener = await server.start(host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='搜索 API 参考实现（与 Cloudflare Worker 输出一致）')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--mapping', help='字符映射 JSON（char_url_mapping.json / char_mapping_upload.json）')
+    source.add_argument('--data-dir', default='../data-collection/collected_characters',
+                        help='数据目录（默认: ../data-collection/collected_characters）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口（默认 {DEFAULT_PORT}）')
+    parser.add_argument('--public-domain', default=os.environ.get('R2_PUBLIC_DOMAIN'),
+                        help=f'R2 公开域名（默认 $R2_PUBLIC_DOMAIN 或 {DEFAULT_PUBLIC_DOMAIN}）')
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT_PER_MINUTE,
+                        help=f'每个 IP 每分钟请求上限，0 为不限制（默认 {RATE_LIMIT_PER_MINUTE}）')
+    parser.add_argument('--query', help='不启动服务，直接输出该查询的 /api/search 响应')
+    parser.add_argument('--accept', default='', help='配合 --query 使用的 Accept 头')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    app = build_app(args.mapping, None if args.mapping else args.data_dir, args.public_domain, args.rate_limit)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    if args.query is not None:
+        from urllib.parse import quote
+        status, _, body = app.handle('GET', f"/api/search?q={quote(args.query)}", {'accept': args.accept})
+        print(body.decode('utf-8'))
+        sys.exit(0 if status == 200 else 1)
+
+    print("=" * 70)
+    print("🖌️  搜索 API 参考服务器")
+    print("=" * 70)
+    print(f"📚 映射: {app.index.total_characters} 个条目（索引 {len(app.index)} 个汉字，{load_ms:.0f} ms）")
+    print(f"🌐 R2 域名: {app.index.domain}")
+    print(f"⚡ 速率限制: {f'{args.rate_limit} 次/分钟/IP' if args.rate_limit else '关闭'}")
+    print(f"📡 监听: http://{args.host}:{args.port}")
+    print("=" * 70)
+
+    try:
+        asyncio.run(serve(app, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+
+
+if __name__ == '__main__':
+    main()
+
+
+"""
+📖 使用说明
+===========
+
+1. 启动本地服务（默认读取 ../data-collection/collected_characters）
+   cd handwriting-api-worker
+   python3 reference_server.py
+
+   # 指定映射文件 / 关闭速率限制（压测时）
+   python3 reference_server.py --mapping ../data-collection/collected_characters/char_url_mapping.json
+   python3 reference_server.py --rate-limit 0 --port 9000
+
+2. 访问（与 Worker 相同的接口）
+   curl "http://localhost:8787/api/search?q=水火山"
+   curl -H "Accept: image/avif,image/webp" "http://localhost:8787/api/search?q=水&size=64"
+   curl http://localhost:8787/api/stats
+
+3. 不启动服务，直接查看某个查询的响应
+   python3 reference_server.py --query 水火山 --accept image/webp
+
+📝 注意事项
+===========
+1. 响应体与 Worker 逐字节相同（timestamp 字段除外），可直接 diff
+2. 映射在启动时加载，更新映射后需要重启
+3. 与 Worker 一样，扩展 B 及以后的汉字（BMP 以外）不会出现在结果中
+"""
@@ -66,8 +66,12 @@ async function handleSearch(request, env) {
     // 加载字符映射
     const charMapping = await loadCharMapping(env);
 
-    // 处理查询
-    const results = await searchCharacters(query, charMapping, env);
+    // 处理查询（根据 Accept 和 size 参数选择最小的可用格式）
+    const options = {
+      accept: request.headers.get('Accept') || '',
+      size: parseInt(url.searchParams.get('size'), 10) || 0
+    };
+    const results = await searchCharacters(query, charMapping, env, options);
 
     return jsonResponse({
       success: true,
@@ -91,7 +95,7 @@ async function handleSearch(request, env) {
 // 搜索逻辑
 // ============================================================================
 
-async function searchCharacters(query, charMapping, env) {
+async function searchCharacters(query, charMapping, env, options = {}) {
   const results = [];
   const chars = Array.from(query); // 支持Unicode
 
@@ -101,7 +105,7 @@ async function searchCharacters(query, charMapping, env) {
       const charData = charMapping[char];
 
       if (charData) {
-        results.push({
+        const result = {
           char: char,
           url: charData.url || constructImageUrl(char, env),
           unicode: charData.unicode || `U+${char.charCodeAt(0).toString(16).toUpperCase().padStart(4, '0')}`,
@@ -110,7 +114,30 @@ async function searchCharacters(query, charMapping, env) {
             size: charData.size,
             timestamp: charData.timestamp
           }
-        });
+        };
+
+        // 衍生格式（WebP/AVIF/缩略图），由 derivatives.py 生成
+        if (Array.isArray(charData.derivatives) && charData.derivatives.length > 0) {
+          result.derivatives = charData.derivatives.map(d => ({
+            format: d.format,
+            label: d.label,
+            width: d.width,
+            bytes: d.bytes,
+            url: constructAssetUrl(d.key, env)
+          }));
+
+          const best = pickDerivative(result.derivatives, options);
+          if (best) {
+            result.image = best;
+          }
+        }
+
+        // 图集坐标，由 atlas_builder.py 生成；同一短语的多个字通常落在同一张图集中
+        if (charData.atlas) {
+          result.atlas = buildAtlasInfo(charData.atlas, options, env);
+        }
+
+        results.push(result);
       } else {
         // 字符未采集，返回占位信息
         results.push({
@@ -150,6 +177,54 @@ function constructImageUrl(char, env) {
   return `https://${domain}/chars/${filename}`;
 }
 
+function constructAssetUrl(key, env) {
+  const domain = env.R2_PUBLIC_DOMAIN || 'handwriting-characters.r2.dev';
+  return `https://${domain}/${key}`;
+}
+
+function pickDerivative(derivatives, options) {
+  // 客户端支持的格式（根据 Accept 头）
+  const accept = options.accept || '';
+  const supported = derivatives.filter(d =>
+    (d.format === 'webp' && accept.includes('image/webp')) ||
+    (d.format === 'avif' && accept.includes('image/avif'))
+  );
+  if (supported.length === 0) {
+    return null;
+  }
+
+  // 满足尺寸要求的最小文件；未指定尺寸时使用原尺寸
+  const size = options.size || 0;
+  let candidates = size > 0
+    ? supported.filter(d => d.width >= size)
+    : supported.filter(d => d.label === 'full');
+  if (candidates.length === 0) {
+    candidates = supported.filter(d => d.label === 'full');
+  }
+  if (candidates.length === 0) {
+    return null;
+  }
+
+  return candidates.reduce((best, d) => (d.bytes < best.bytes ? d : best));
+}
+
+function buildAtlasInfo(atlas, options, env) {
+  const keys = atlas.keys || {};
+  const accept = options.accept || '';
+  const key = (keys.webp && accept.includes('image/webp')) ? keys.webp : keys.png;
+
+  return {
+    id: atlas.id,
+    url: constructAssetUrl(key, env),
+    width: atlas.width,
+    height: atlas.height,
+    x: atlas.x,
+    y: atlas.y,
+    w: atlas.w,
+    h: atlas.h
+  };
+}
+
 async function loadCharMapping(env) {
   // 从KV加载映射数据
   const cached = await env.CHAR_MAPPING.get('char_mapping', { type: 'json' });
@@ -284,7 +359,7 @@ function handleRoot() {
 
   <div class="endpoint">
     <h3>GET /api/search</h3>
-    <p><strong>参数:</strong> <code>q</code> - 要搜索的汉字</p>
+    <p><strong>参数:</strong> <code>q</code> - 要搜索的汉字；<code>size</code> - 可选，期望的图片宽度（像素），配合 <code>Accept: image/avif, image/webp</code> 返回最小的可用格式</p>
     <p><strong>示例:</strong></p>
     <pre>curl "https://your-worker.workers.dev/api/search?q=水火山"</pre>
     <p><strong>响应:</strong></p>
@@ -13,6 +13,14 @@ import subprocess
 from pathlib import Path
 from datetime import datetime
 
+# 衍生格式（WebP/AVIF 缩略图）的 Content-Type
+CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+    '.json': 'application/json',
+}
+
 
 class CloudflareUploader:
     """Cloudflare 数据上传器"""
@@ -23,6 +31,10 @@ class CloudflareUploader:
         self.upload_stats = {
             'images_uploaded': 0,
             'images_failed': 0,
+            'derivatives_uploaded': 0,
+            'derivatives_failed': 0,
+            'atlases_uploaded': 0,
+            'atlases_failed': 0,
             'kv_updated': False,
             'start_time': datetime.now().isoformat()
         }
@@ -103,41 +115,86 @@ class CloudflareUploader:
             # R2 路径: chars/unicode_汉字.png
             r2_key = f"chars/{filename}"
 
-            # 使用 wrangler r2 object put 命令上传
-            try:
-                cmd = [
-                    'wrangler', 'r2', 'object', 'put',
-                    f'handwriting-characters/{r2_key}',
-                    '--file', str(filepath)
-                ]
-
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-
-                if result.returncode == 0:
-                    print(f"✅ 上传: {char} -> {r2_key}")
-                    self.upload_stats['images_uploaded'] += 1
-
-                    # 更新映射中的URL
-                    info['r2_key'] = r2_key
-                else:
-                    print(f"❌ 上传失败: {char} - {result.stderr}")
-                    self.upload_stats['images_failed'] += 1
+            if self._put_r2_object(r2_key, filepath, char):
+                print(f"✅ 上传: {char} -> {r2_key}")
+                self.upload_stats['images_uploaded'] += 1
 
-            except subprocess.TimeoutExpired:
-                print(f"⏱️  上传超时: {char}")
-                self.upload_stats['images_failed'] += 1
-            except Exception as e:
-                print(f"❌ 上传错误: {char} - {str(e)}")
+                # 更新映射中的URL
+                info['r2_key'] = r2_key
+            else:
                 self.upload_stats['images_failed'] += 1
+                continue
+
+            # 衍生格式: key 由 derivatives.py 生成，与本地相对路径一致
+            for derivative in info.get('derivatives', []):
+                derivative_path = self.data_dir / derivative['key'][len('chars/'):]
+                if derivative_path.exists() and \
+                        self._put_r2_object(derivative['key'], derivative_path, char):
+                    self.upload_stats['derivatives_uploaded'] += 1
+                else:
+                    self.upload_stats['derivatives_failed'] += 1
 
         print("=" * 70)
         print(f"✅ 上传完成: {self.upload_stats['images_uploaded']} 成功, "
               f"{self.upload_stats['images_failed']} 失败")
+        if self.upload_stats['derivatives_uploaded'] or self.upload_stats['derivatives_failed']:
+            print(f"   衍生格式: {self.upload_stats['derivatives_uploaded']} 成功, "
+                  f"{self.upload_stats['derivatives_failed']} 失败")
+
+    def upload_atlases_to_r2(self):
+        """上传字形图集（atlas_builder.py 生成）和图集索引"""
+        atlas_dir = self.data_dir / "atlases"
+        index_file = atlas_dir / "atlas_index.json"
+        if not index_file.exists():
+            return
+
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        print(f"\n📤 上传图集 ({len(index['atlases'])} 张)...")
+        for atlas_id, atlas in index['atlases'].items():
+            for atlas_file in atlas['files'].values():
+                if self._put_r2_object(atlas_file['key'], self.data_dir / atlas_file['filename'], atlas_id):
+                    self.upload_stats['atlases_uploaded'] += 1
+                else:
+                    self.upload_stats['atlases_failed'] += 1
+
+        # 图集文件名带内容哈希，索引固定路径
+        if self._put_r2_object("chars/atlases/atlas_index.json", index_file, 'atlas_index'):
+            self.upload_stats['atlases_uploaded'] += 1
+        else:
+            self.upload_stats['atlases_failed'] += 1
+
+        print(f"✅ 图集上传完成: {self.upload_stats['atlases_uploaded']} 成功, "
+              f"{self.upload_stats['atlases_failed']} 失败")
+
+    def _put_r2_object(self, r2_key, filepath, char):
+        """使用 wrangler r2 object put 命令上传单个对象"""
+        content_type = CONTENT_TYPES.get(Path(filepath).suffix.lower(), 'application/octet-stream')
+        try:
+            cmd = [
+                'wrangler', 'r2', 'object', 'put',
+                f'handwriting-characters/{r2_key}',
+                '--file', str(filepath),
+                '--content-type', content_type
+            ]
+
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+
+            if result.returncode == 0:
+                return True
+            print(f"❌ 上传失败: {char} {r2_key} - {result.stderr}")
+
+        except subprocess.TimeoutExpired:
+            print(f"⏱️  上传超时: {char} {r2_key}")
+        except Exception as e:
+            print(f"❌ 上传错误: {char} {r2_key} - {str(e)}")
+        return False
 
     def upload_mapping_to_kv(self):
         """上传字符映射到 KV"""
@@ -212,8 +269,9 @@ class CloudflareUploader:
         self.load_existing_mapping()
         self.scan_images()
 
-        # 2. 上传图片到 R2
+        # 2. 上传图片和图集到 R2
         self.upload_images_to_r2()
+        self.upload_atlases_to_r2()
 
         # 3. 上传映射到 KV
         self.upload_mapping_to_kv()
@@ -270,6 +328,7 @@ def main():
         uploader.load_existing_mapping()
         uploader.scan_images()
         uploader.upload_images_to_r2()
+        uploader.upload_atlases_to_r2()
         uploader.generate_report()
     else:
         uploader.run()